@@ -4,3 +4,17 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.conf import settings
+        from django.core.signals import request_finished, request_started
+        from django.db.backends.signals import connection_created
+        from foodgram.db_connections import (check_connections,
+                                             mark_connections_used)
+
+        from .metrics import count_db_connection
+
+        connection_created.connect(count_db_connection)
+        if settings.DB_CONN_HEALTH_CHECKS:
+            request_started.connect(check_connections)
+            request_finished.connect(mark_connections_used)
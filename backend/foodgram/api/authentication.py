@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework import authentication
+
+User = get_user_model()
+
+# Отметка использования токена пишется в БД не чаще этого интервала.
+TOKEN_TOUCH_INTERVAL = timedelta(days=1)
+
+
+class TokenAuthentication(authentication.TokenAuthentication):
+    """Токен с отметкой последнего использования для purge_stale."""
+
+    def authenticate_credentials(self, key):
+        user, token = super().authenticate_credentials(key)
+        now = timezone.now()
+        if (user.token_last_used is None
+                or user.token_last_used < now - TOKEN_TOUCH_INTERVAL):
+            User.objects.filter(pk=user.pk).update(token_last_used=now)
+            user.token_last_used = now
+        return user, token
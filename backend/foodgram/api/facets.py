@@ -0,0 +1,96 @@
+"""
+Счетчики фасетов для списка рецептов (?facets=1): сколько рецептов
+с каждым тегом, у каждого автора, в избранном и в списке покупок
+текущего пользователя при тех же фильтрах.
+
+Все счетчики считает один запрос с группировкой по автору над
+отфильтрованными id рецептов, поэтому дубли строк от соединения
+с тегами в фильтре не искажают результат. Ответ кешируется по
+нормализованным значениям фильтров.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q
+from django.db.models.base import Model
+from recipes.models import FavoritesList, Recipe, ShoppingList, Tag
+
+from .metrics import observe_cache
+
+CACHE_PREFIX = 'recipe_facets'
+# Параметры, не влияющие на набор рецептов.
+IGNORED_FILTERS = ('ordering',)
+
+
+def normalize_filters(filterset):
+    normalized = {}
+    filterset.is_valid()
+    for name, value in filterset.form.cleaned_data.items():
+        if name in IGNORED_FILTERS or value in (None, '', []):
+            continue
+        if isinstance(value, Model):
+            value = value.pk
+        elif isinstance(value, (list, tuple)):
+            value = sorted(value)
+        normalized[name] = value
+    return normalized
+
+
+def cache_key(filterset, user):
+    normalized = normalize_filters(filterset)
+    # Флаги избранного и списка покупок зависят от пользователя.
+    normalized['user'] = user.pk if user.is_authenticated else None
+    digest = hashlib.md5(
+        json.dumps(normalized, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return f'{CACHE_PREFIX}:{digest}'
+
+
+def count_facets(queryset, user):
+    tags = list(Tag.objects.values_list('id', 'slug'))
+    aggregates = {'total': Count('pk')}
+    for tag_id, _ in tags:
+        aggregates[f'tag_{tag_id}'] = Count('pk', filter=Q(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'), tag_id=tag_id
+            )
+        )))
+    if user.is_authenticated:
+        aggregates['favorited'] = Count('pk', filter=Q(Exists(
+            FavoritesList.objects.filter(user=user, recipe=OuterRef('pk'))
+        )))
+        aggregates['in_cart'] = Count('pk', filter=Q(Exists(
+            ShoppingList.objects.filter(user=user, recipe=OuterRef('pk'))
+        )))
+    rows = list(
+        Recipe.objects.filter(
+            pk__in=queryset.order_by().values('pk')
+        ).order_by().values('author').annotate(**aggregates)
+    )
+    rows.sort(key=lambda row: (-row['total'], row['author']))
+    facets = {
+        'tags': {
+            slug: sum(row[f'tag_{tag_id}'] for row in rows)
+            for tag_id, slug in tags
+        },
+        'authors': {
+            row['author']: row['total']
+            for row in rows[:settings.RECIPE_FACET_AUTHORS]
+        },
+    }
+    if user.is_authenticated:
+        facets['is_favorited'] = sum(row['favorited'] for row in rows)
+        facets['is_in_shopping_cart'] = sum(row['in_cart'] for row in rows)
+    return facets
+
+
+def recipe_facets(filterset, user):
+    key = cache_key(filterset, user)
+    facets = cache.get(key)
+    observe_cache(CACHE_PREFIX, facets is not None)
+    if facets is None:
+        facets = count_facets(filterset.qs, user)
+        cache.set(key, facets, settings.RECIPE_FACETS_CACHE_TIMEOUT)
+    return facets
@@ -4,6 +4,22 @@ from recipes.models import Ingredient, Recipe
 
 User = get_user_model()
 
+# id в конце делает порядок однозначным, чтобы рецепты с равными ключами
+# не терялись и не повторялись между страницами (без ordering действует
+# Recipe.Meta.ordering, совпадающий с '-pub_date'). Для сортировок по дате,
+# популярности и времени приготовления есть индексы с теми же ключами
+# в recipes.models.Recipe (обратный порядок читается обратным проходом),
+# для name — индекс по названию.
+RECIPE_ORDERINGS = {
+    'popular': ('-popularity', '-pub_date', '-id'),
+    'pub_date': ('pub_date', 'id'),
+    '-pub_date': ('-pub_date', '-id'),
+    'cooking_time': ('cooking_time', '-pub_date', '-id'),
+    '-cooking_time': ('-cooking_time', 'pub_date', 'id'),
+    'name': ('name', 'id'),
+    '-name': ('-name', '-id'),
+}
+
 
 class IngredientFilter(filters.FilterSet):
     name = filters.CharFilter(field_name='name', lookup_expr='startswith')
@@ -16,10 +32,20 @@ class IngredientFilter(filters.FilterSet):
 class RecipeFilter(filters.FilterSet):
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
     tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    cooking_time_min = filters.NumberFilter(
+        field_name='cooking_time', lookup_expr='gte'
+    )
+    cooking_time_max = filters.NumberFilter(
+        field_name='cooking_time', lookup_expr='lte'
+    )
     is_favorited = filters.BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
+    ordering = filters.ChoiceFilter(
+        choices=[(key, key) for key in RECIPE_ORDERINGS],
+        method='get_ordering'
+    )
 
     def get_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
@@ -28,9 +54,11 @@ class RecipeFilter(filters.FilterSet):
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
-            return Recipe.objects.filter(
-                shopping_cart__user=self.request.user)
-        return Recipe.objects.all()
+            return queryset.filter(shopping_cart__user=self.request.user)
+        return queryset
+
+    def get_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
 
     class Meta:
         model = Recipe
@@ -0,0 +1,458 @@
+"""
+Нагрузочное тестирование API: синтетические данные, асинхронные
+HTTP-клиенты со смешанными сценариями и отчет с запросами в секунду
+и задержками p50/p95/p99 по каждому эндпоинту.
+
+Каждый виртуальный пользователь держит одно keep-alive соединение
+и выполняет сценарии подряд, без пауз; сценарий выбирается случайно
+с весами из mix. Запросы первых warmup секунд в отчет не попадают.
+"""
+import asyncio
+import base64
+import io
+import json
+import random
+import statistics
+from collections import Counter, defaultdict
+from urllib.parse import urlencode, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from PIL import Image
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from recipes.popularity import refresh_popularity
+from recipes.search import rebuild_index
+from recipes.snapshots import fill_snapshots
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+EMAIL = 'loadtest{}@example.com'
+PASSWORD = 'loadtest-password'
+INGREDIENT_NAME = 'нагрузка {}'
+TAGS = (
+    ('Завтрак', 'breakfast', '#E26C2D'),
+    ('Обед', 'lunch', '#49B64E'),
+    ('Ужин', 'dinner', '#8775D2'),
+)
+ORDERINGS = ('popular', 'cooking_time', '-pub_date', 'name')
+DEFAULT_MIX = {
+    'browse': 50, 'detail': 20, 'favorite': 10, 'cart': 10,
+    'download': 5, 'create': 5,
+}
+# Доля просмотров списка без токена (их обслуживает кеш ответов).
+ANONYMOUS_SHARE = 0.5
+PAGE_SIZE = 6
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+    return ordered[index]
+
+
+def image_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), (226, 108, 45)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def seed_users(count):
+    password = make_password(PASSWORD)
+    User.objects.bulk_create((
+        User(
+            email=EMAIL.format(index), username=f'loadtest{index}',
+            first_name='Нагрузка', last_name=str(index), password=password
+        ) for index in range(count)
+    ), ignore_conflicts=True)
+    users = User.objects.filter(
+        email__in=[EMAIL.format(index) for index in range(count)]
+    )
+    return [Token.objects.get_or_create(user=user)[0] for user in users]
+
+
+def seed_ingredients(count):
+    existing = Ingredient.objects.filter(
+        name__startswith=INGREDIENT_NAME.format('')
+    )
+    Ingredient.objects.bulk_create(
+        Ingredient(name=INGREDIENT_NAME.format(index), measurement_unit='г')
+        for index in range(existing.count(), count)
+    )
+    return list(existing.values_list('pk', flat=True))
+
+
+def seed_recipes(count, authors, ingredient_ids, tag_ids, rng):
+    existing = Recipe.objects.filter(author__in=authors)
+    missing = count - existing.count()
+    if missing <= 0:
+        return list(existing.values_list('pk', flat=True))
+    image = Recipe._meta.get_field('image').storage.save(
+        'recipes/images/loadtest.png', ContentFile(image_bytes())
+    )
+    last_id = Recipe.all_objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+    Recipe.objects.bulk_create((
+        Recipe(
+            author=rng.choice(authors), name=f'Рецепт {index}',
+            text='Синтетический рецепт для нагрузочного теста.',
+            cooking_time=rng.randint(1, 180), image=image
+        ) for index in range(missing)
+    ), batch_size=500)
+    created = list(Recipe.objects.filter(pk__gt=last_id).values_list(
+        'pk', flat=True
+    ))
+    IngredientRecipe.objects.bulk_create((
+        IngredientRecipe(
+            recipe_id=recipe_id, ingredient_id=ingredient_id,
+            amount=rng.randint(1, 500)
+        ) for recipe_id in created
+        for ingredient_id in rng.sample(ingredient_ids, rng.randint(3, 10))
+    ), batch_size=1000)
+    Recipe.tags.through.objects.bulk_create((
+        Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+        for recipe_id in created
+        for tag_id in rng.sample(tag_ids, rng.randint(1, len(tag_ids)))
+    ), batch_size=1000)
+    return list(existing.values_list('pk', flat=True))
+
+
+def seed(users=50, recipes=1000, ingredients=500, random_seed=1):
+    """
+    Создать синтетических пользователей с токенами, теги, ингредиенты
+    и рецепты; повторный вызов только дополняет недостающее. Вернуть
+    данные для виртуальных пользователей.
+    """
+    rng = random.Random(random_seed)
+    tokens = seed_users(users)
+    for name, slug, color in TAGS:
+        Tag.objects.get_or_create(
+            slug=slug, defaults={'name': name, 'color': color}
+        )
+    tags = list(Tag.objects.values('id', 'slug'))
+    ingredient_ids = seed_ingredients(ingredients)
+    recipe_ids = seed_recipes(
+        recipes, [token.user for token in tokens], ingredient_ids,
+        [tag['id'] for tag in tags], rng
+    )
+    call_command('rebuild_image_refs', stdout=io.StringIO())
+    fill_snapshots()
+    rebuild_index()
+    refresh_popularity(full=True)
+    return {
+        'tokens': [token.key for token in tokens],
+        'recipes': recipe_ids,
+        'ingredients': ingredient_ids,
+        'tags': tags,
+    }
+
+
+class HttpClient:
+    """Минимальный клиент HTTP/1.1 на asyncio с keep-alive."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def request(self, method, path, headers, body=b''):
+        reused = self.writer is not None
+        try:
+            return await self.exchange(method, path, headers, body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            if not reused:
+                raise
+        # Сервер мог закрыть простаивавшее соединение: повторить один раз.
+        return await self.exchange(method, path, headers, body)
+
+    async def exchange(self, method, path, headers, body):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        lines.append(f'Content-Length: {len(body)}')
+        self.writer.write(
+            ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+        )
+        await self.writer.drain()
+        status, response_headers = await self.read_head()
+        content = await self.read_body(status, response_headers)
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, content
+
+    async def read_head(self):
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        headers = {}
+        for line in filter(None, header_lines):
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return int(status_line.split()[1]), headers
+
+    async def read_body(self, status, headers):
+        if status in (204, 304):
+            return b''
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    return b''.join(chunks)
+                chunks.append(chunk[:-2])
+        if 'content-length' in headers:
+            return await self.reader.readexactly(
+                int(headers['content-length'])
+            )
+        content = await self.reader.read()
+        await self.close()
+        return content
+
+
+class Recorder:
+    """Задержки и статусы ответов по эндпоинтам в окне измерения."""
+
+    def __init__(self, measure_from):
+        self.measure_from = measure_from
+        self.timings = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def add(self, endpoint, started, elapsed, status):
+        if started < self.measure_from:
+            return
+        self.timings[endpoint].append(elapsed * 1000)
+        self.statuses[endpoint][status] += 1
+
+
+class VirtualUser:
+    def __init__(self, url, token, data, recorder, rng):
+        self.client = HttpClient(url)
+        self.token = token
+        self.data = data
+        self.recorder = recorder
+        self.rng = rng
+        self.favorites = set()
+        self.cart = set()
+
+    async def call(self, method, path, endpoint, body=None, auth=True):
+        headers = {
+            'Accept': 'application/json', 'Accept-Encoding': 'br, gzip'
+        }
+        if auth:
+            headers['Authorization'] = f'Token {self.token}'
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            status, _ = await self.client.request(
+                method, path, headers, body or b''
+            )
+        except (OSError, asyncio.IncompleteReadError):
+            status = 0
+            await self.client.close()
+        self.recorder.add(
+            f'{method} {endpoint}', started, loop.time() - started, status
+        )
+
+    def recipe(self):
+        return self.rng.choice(self.data['recipes'])
+
+    async def run(self, scenarios, weights, stop_at):
+        loop = asyncio.get_running_loop()
+        while loop.time() < stop_at:
+            scenario = self.rng.choices(scenarios, weights)[0]
+            await SCENARIOS[scenario](self)
+        await self.client.close()
+
+
+async def browse(user):
+    rng = user.rng
+    pages = max(1, len(user.data['recipes']) // PAGE_SIZE)
+    params = {'limit': PAGE_SIZE}
+    if rng.random() < 0.5:
+        params['tags'] = rng.choice(user.data['tags'])['slug']
+    if rng.random() < 0.2:
+        params['cooking_time_max'] = rng.choice((15, 30, 60))
+    # Дальние страницы листаются только без фильтров, иначе будет 404.
+    params['page'] = 1 if len(params) > 1 else rng.randint(
+        1, min(pages, 20)
+    )
+    if rng.random() < 0.3:
+        params['ordering'] = rng.choice(ORDERINGS)
+    await user.call(
+        'GET', f'/api/recipes/?{urlencode(params)}', '/api/recipes/',
+        auth=rng.random() >= ANONYMOUS_SHARE
+    )
+
+
+async def detail(user):
+    await user.call(
+        'GET', f'/api/recipes/{user.recipe()}/', '/api/recipes/{id}/'
+    )
+
+
+async def toggle(user, selected, relation):
+    """Убрать один из добавленных рецептов или добавить новый."""
+    if selected and user.rng.random() < 0.5:
+        recipe_id = user.rng.choice(sorted(selected))
+        method = 'DELETE'
+    else:
+        recipe_id = user.recipe()
+        method = 'DELETE' if recipe_id in selected else 'GET'
+    await user.call(
+        method, f'/api/recipes/{recipe_id}/{relation}/',
+        f'/api/recipes/{{id}}/{relation}/'
+    )
+    selected.symmetric_difference_update({recipe_id})
+
+
+async def favorite(user):
+    await toggle(user, user.favorites, 'favorite')
+
+
+async def cart(user):
+    await toggle(user, user.cart, 'shopping_cart')
+
+
+async def download(user):
+    await user.call(
+        'GET', '/api/recipes/download_shopping_cart/',
+        '/api/recipes/download_shopping_cart/'
+    )
+
+
+async def create(user):
+    rng = user.rng
+    body = {
+        'name': f'Нагрузочный рецепт {rng.randint(1, 10 ** 9)}',
+        'text': 'Создан нагрузочным тестом.',
+        'cooking_time': rng.randint(1, 180),
+        'tags': [rng.choice(user.data['tags'])['id']],
+        'ingredients': [
+            {'id': ingredient_id, 'amount': rng.randint(1, 500)}
+            for ingredient_id in rng.sample(user.data['ingredients'], 5)
+        ],
+        'image': user.data['image'],
+    }
+    await user.call(
+        'POST', '/api/recipes/', '/api/recipes/',
+        json.dumps(body).encode()
+    )
+
+
+SCENARIOS = {
+    'browse': browse,
+    'detail': detail,
+    'favorite': favorite,
+    'cart': cart,
+    'download': download,
+    'create': create,
+}
+
+
+def parse_mix(value):
+    """'browse=50,create=5' -> {'browse': 50, 'create': 5}."""
+    mix = {}
+    for item in filter(None, value.split(',')):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f'Неизвестный сценарий: {name}')
+        mix[name] = float(weight or 1)
+    if not mix or not any(mix.values()):
+        raise ValueError('Нужен хотя бы один сценарий с весом больше 0')
+    return mix
+
+
+async def wait_until_ready(url, timeout=60, alive=lambda: True):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        client = HttpClient(url)
+        try:
+            status, _ = await client.request('GET', '/api/tags/', {})
+            if status == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            await client.close()
+        if not alive():
+            raise TimeoutError(f'Сервер {url} завершился')
+        if loop.time() > deadline:
+            raise TimeoutError(f'Сервер {url} не ответил за {timeout} с')
+        await asyncio.sleep(0.2)
+
+
+async def run_load(url, data, concurrency, duration, warmup, mix, seed=1):
+    """Запустить concurrency виртуальных пользователей, вернуть Recorder."""
+    data = {**data, 'image': 'data:image/png;base64,' + base64.b64encode(
+        image_bytes()
+    ).decode()}
+    loop = asyncio.get_running_loop()
+    recorder = Recorder(loop.time() + warmup)
+    users = [
+        VirtualUser(
+            url, data['tokens'][index % len(data['tokens'])], data,
+            recorder, random.Random(seed + index)
+        ) for index in range(concurrency)
+    ]
+    stop_at = loop.time() + warmup + duration
+    await asyncio.gather(*(
+        user.run(list(mix), list(mix.values()), stop_at) for user in users
+    ))
+    return recorder
+
+
+def summarize(timings, statuses, duration):
+    errors = sum(
+        count for status, count in statuses.items()
+        if not 200 <= status < 400
+    )
+    return {
+        'requests': len(timings),
+        'rps': round(len(timings) / duration, 2),
+        'errors': errors,
+        'statuses': {
+            str(status): count for status, count in sorted(statuses.items())
+        },
+        'latency_ms': {
+            'mean': round(statistics.mean(timings), 2),
+            'p50': round(percentile(timings, 50), 2),
+            'p95': round(percentile(timings, 95), 2),
+            'p99': round(percentile(timings, 99), 2),
+            'max': round(max(timings), 2),
+        },
+    }
+
+
+def build_report(recorder, duration, meta):
+    endpoints = {
+        endpoint: summarize(timings, recorder.statuses[endpoint], duration)
+        for endpoint, timings in sorted(recorder.timings.items())
+    }
+    all_timings = [
+        timing for timings in recorder.timings.values() for timing in timings
+    ]
+    all_statuses = sum(recorder.statuses.values(), Counter())
+    return {
+        'meta': meta,
+        'total': (
+            summarize(all_timings, all_statuses, duration)
+            if all_timings else None
+        ),
+        'endpoints': endpoints,
+    }
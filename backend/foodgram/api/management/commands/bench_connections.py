@@ -0,0 +1,61 @@
+import statistics
+import time
+
+from api.loadtest import percentile
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить задержку запросов к API с постоянными соединениями '
+        'к БД и без них'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--path', default='/api/tags/')
+        parser.add_argument('--max-age', type=int, default=60)
+
+    def run(self, handler, environ, count):
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            response = handler(dict(environ), lambda status, headers: None)
+            b''.join(response)
+            response.close()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def handle(self, *args, **options):
+        handler = WSGIHandler()
+        factory = RequestFactory(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        environ = factory.get(options['path']).environ
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count_connection)
+        engine = settings.DATABASES['default']['ENGINE']
+        self.stdout.write(f'{engine}, {options["path"]}')
+        for max_age in (0, options['max_age']):
+            for connection in connections.all():
+                connection.close()
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+            self.run(handler, environ, 5)
+            opened.clear()
+            timings = self.run(handler, environ, options['requests'])
+            self.stdout.write(
+                f'CONN_MAX_AGE={max_age}: '
+                f'mean {statistics.mean(timings):.2f} ms, '
+                f'p50 {percentile(timings, 50):.2f} ms, '
+                f'p95 {percentile(timings, 95):.2f} ms, '
+                f'p99 {percentile(timings, 99):.2f} ms, '
+                f'подключений {len(opened)}'
+            )
+        connection_created.disconnect(count_connection)
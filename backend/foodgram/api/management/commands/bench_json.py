@@ -0,0 +1,79 @@
+import time
+from io import BytesIO
+
+from api.fast_serializers import recipe_list_rows
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import Recipe
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить стандартные JSONRenderer/JSONParser с FastJSONRenderer/'
+        'FastJSONParser на страницах списка рецептов из БД'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=6)
+        parser.add_argument('--pages', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def measure(self, func, payloads, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for payload in payloads:
+                func(payload)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best / len(payloads) * 1000 * 1000
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write('orjson не установлен, сравнивать не с чем')
+            return
+        size = options['page_size']
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True)[
+            :size * options['pages']
+        ])
+        if not recipe_ids:
+            raise CommandError('В базе нет рецептов')
+        pages = [
+            {
+                'count': len(recipe_ids),
+                'next': None,
+                'previous': None,
+                'results': recipe_list_rows(recipe_ids[start:start + size]),
+            }
+            for start in range(0, len(recipe_ids), size)
+        ]
+        standard, fast = JSONRenderer(), FastJSONRenderer()
+        bodies = [standard.render(page) for page in pages]
+        if bodies != [fast.render(page) for page in pages]:
+            raise CommandError('FastJSONRenderer дает другой JSON')
+
+        repeat = options['repeat']
+        results = (
+            ('render', standard.render, fast.render, pages),
+            (
+                'parse',
+                lambda body: JSONParser().parse(BytesIO(body)),
+                lambda body: FastJSONParser().parse(BytesIO(body)),
+                bodies,
+            ),
+        )
+        self.stdout.write(
+            f'{len(pages)} страниц по {size} рецептов, '
+            f'в среднем {sum(map(len, bodies)) // len(bodies)} байт'
+        )
+        for name, slow, quick, payloads in results:
+            slow_time = self.measure(slow, payloads, repeat)
+            fast_time = self.measure(quick, payloads, repeat)
+            self.stdout.write(
+                f'{name}: stdlib {slow_time:.1f} мкс, '
+                f'orjson {fast_time:.1f} мкс на страницу '
+                f'(x{slow_time / fast_time:.1f})'
+            )
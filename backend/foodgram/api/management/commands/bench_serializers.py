@@ -0,0 +1,93 @@
+import time
+
+from api.fast_serializers import (ingredient_rows, recipe_list_rows,
+                                  recipe_simple_rows)
+from api.serializers import (IngredientSerializer, RecipeListSerializer,
+                             RecipeSimpleSerializer)
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from recipes.models import Ingredient, Recipe
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить сериализаторы списков с быстрой сборкой из .values(): '
+        'проверить побайтное совпадение JSON и замерить время на 1000 строк'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--user', help='email пользователя для запроса')
+
+    def get_request(self, email):
+        factory = RequestFactory(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        request = Request(factory.get('/api/recipes/'))
+        request.user = (
+            User.objects.get(email=email) if email else AnonymousUser()
+        )
+        return request
+
+    def measure(self, build, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            content = JSONRenderer().render(build())
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return content, best
+
+    def handle(self, *args, **options):
+        request = self.get_request(options['user'])
+        context = {'request': request}
+        rows = options['rows']
+        ingredients = Ingredient.objects.all()[:rows]
+        recipes = Recipe.objects.all()[:rows]
+        cases = (
+            (
+                'IngredientSerializer', ingredients.count(),
+                lambda: IngredientSerializer(ingredients, many=True).data,
+                lambda: ingredient_rows(ingredients),
+            ),
+            (
+                'RecipeSimpleSerializer', recipes.count(),
+                lambda: RecipeSimpleSerializer(
+                    recipes, many=True, context=context
+                ).data,
+                lambda: recipe_simple_rows(recipes, request),
+            ),
+            (
+                'RecipeListSerializer', recipes.count(),
+                lambda: RecipeListSerializer(
+                    recipes, many=True, context=context
+                ).data,
+                lambda: recipe_list_rows(
+                    recipes.values_list('id', flat=True), request
+                ),
+            ),
+        )
+        mismatched = []
+        for name, count, serializer, fast in cases:
+            if not count:
+                self.stdout.write(f'{name}: нет данных')
+                continue
+            expected, slow_time = self.measure(serializer, options['repeat'])
+            actual, fast_time = self.measure(fast, options['repeat'])
+            if actual != expected:
+                mismatched.append(name)
+            self.stdout.write(
+                f'{name}: {count} строк, '
+                f'сериализатор {slow_time / count * 1000 * 1000:.1f} ms, '
+                f'values() {fast_time / count * 1000 * 1000:.1f} ms '
+                f'на 1000 строк, JSON '
+                f'{"совпадает" if actual == expected else "ОТЛИЧАЕТСЯ"}'
+            )
+        if mismatched:
+            raise CommandError(
+                'JSON отличается для: ' + ', '.join(mismatched)
+            )
@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+
+from api.loadtest import (DEFAULT_MIX, build_report, parse_mix, run_load, seed,
+                          wait_until_ready)
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+# Лимиты частоты рассчитаны на людей и за секунды отключили бы
+# сценарии записи; лимиты одновременных запросов остаются.
+UNTHROTTLED = {
+    'THROTTLE_RECIPE_WRITE': '1000000/min',
+    'THROTTLE_SHOPPING_CART_DOWNLOAD': '1000000/min',
+    'THROTTLE_INGREDIENTS_LIST': '1000000/min',
+}
+
+# gunicorn 20.0 нельзя запустить через python -m.
+GUNICORN = 'from gunicorn.app.wsgiapp import run; run()'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест API: поднять gunicorn на локальной БД '
+        'с синтетическими данными, прогнать смешанные сценарии и записать '
+        'отчет с запросами в секунду и p50/p95/p99 по эндпоинтам в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='длительность измерения, с'
+        )
+        parser.add_argument(
+            '--warmup', type=float, default=5,
+            help='сколько секунд в начале не учитывать'
+        )
+        parser.add_argument(
+            '--mix', default=','.join(
+                f'{name}={weight}' for name, weight in DEFAULT_MIX.items()
+            ),
+            help='веса сценариев: browse, detail, favorite, cart, '
+                 'download, create'
+        )
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument(
+            '--database', choices=('sqlite', 'configured'), default='sqlite',
+            help='sqlite — новый файл SQLite, configured — БД из настроек '
+                 '(в нее записываются синтетические данные)'
+        )
+        parser.add_argument(
+            '--sqlite-path',
+            help='файл SQLite, который сохранится между запусками'
+        )
+        parser.add_argument(
+            '--url', help='не поднимать сервер, а нагружать уже запущенный '
+                          '(данные готовятся в БД из настроек)'
+        )
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', default='load_test.json')
+        parser.add_argument(
+            '--seed-only', action='store_true', help=argparse.SUPPRESS
+        )
+
+    def server_env(self, options, workdir):
+        # Свой каталог метрик: on_starting в gunicorn.conf.py очищает его
+        # и иначе стер бы метрики запущенного рядом рабочего сервера.
+        metrics_dir = os.path.join(workdir, 'metrics')
+        os.makedirs(metrics_dir)
+        env = {
+            **os.environ, **UNTHROTTLED, 'DEBUG_VALUE': 'False',
+            'PROMETHEUS_MULTIPROC_DIR': metrics_dir,
+        }
+        if options['database'] == 'sqlite':
+            env.update({
+                'DB_ENGINE': 'django.db.backends.sqlite3',
+                'POSTGRES_DB': options['sqlite_path'] or os.path.join(
+                    workdir, 'load_test.sqlite3'
+                ),
+                'DB_REPLICAS': '',
+            })
+        return env
+
+    def manage(self, env, *args):
+        result = subprocess.run(
+            [sys.executable, 'manage.py', *args], cwd=settings.BASE_DIR,
+            env=env, capture_output=True, text=True
+        )
+        if result.returncode:
+            raise CommandError(result.stderr)
+        return result.stdout
+
+    def start_server(self, env, options, log):
+        url = f'http://127.0.0.1:{free_port()}'
+        server = subprocess.Popen([
+            sys.executable, '-c', GUNICORN, 'foodgram.wsgi:application',
+            '--config', 'gunicorn.conf.py', '--bind', url[len('http://'):],
+            '--workers', str(options['workers']),
+            '--threads', str(options['threads']),
+        ], cwd=settings.BASE_DIR, env=env, stdout=log, stderr=log)
+        return server, url
+
+    def prepare(self, env, options):
+        self.stdout.write('Подготовка БД и синтетических данных...')
+        self.manage(env, 'migrate', '--noinput', '-v', '0')
+        return json.loads(self.manage(
+            env, 'load_test', '--seed-only',
+            '--users', str(max(options['users'], options['concurrency'])),
+            '--recipes', str(options['recipes']),
+            '--seed', str(options['seed']),
+        ))
+
+    async def measure(self, url, data, mix, options, server=None):
+        await wait_until_ready(
+            url, alive=lambda: server is None or server.poll() is None
+        )
+        self.stdout.write(
+            f'Нагрузка на {url}: {options["concurrency"]} клиентов, '
+            f'{options["warmup"]:g} + {options["duration"]:g} с'
+        )
+        return await run_load(
+            url, data, options['concurrency'], options['duration'],
+            options['warmup'], mix, options['seed']
+        )
+
+    def drive(self, env, data, mix, options, workdir):
+        if options['url']:
+            return asyncio.run(
+                self.measure(options['url'], data, mix, options)
+            )
+        log_path = os.path.join(workdir, 'gunicorn.log')
+        with open(log_path, 'w') as log:
+            server, url = self.start_server(env, options, log)
+            try:
+                return asyncio.run(
+                    self.measure(url, data, mix, options, server)
+                )
+            except TimeoutError as error:
+                with open(log_path) as server_log:
+                    raise CommandError(f'{error}\n{server_log.read()}')
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+    def handle(self, *args, **options):
+        if options['seed_only']:
+            self.stdout.write(json.dumps(seed(
+                options['users'], options['recipes'],
+                random_seed=options['seed']
+            )))
+            return
+        if options['url'] and options['database'] != 'configured':
+            raise CommandError('С --url нужен --database configured')
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as error:
+            raise CommandError(error)
+        if options['database'] == 'configured':
+            self.stderr.write(self.style.WARNING(
+                'Синтетические пользователи и рецепты будут записаны в БД '
+                'из настроек и останутся в ней после теста'
+            ))
+        started = timezone.now()
+        with tempfile.TemporaryDirectory() as workdir:
+            env = self.server_env(options, workdir)
+            data = self.prepare(env, options)
+            recorder = self.drive(env, data, mix, options, workdir)
+        report = build_report(recorder, options['duration'], {
+            'started': started.isoformat(),
+            'commit': git_commit(),
+            'database': env.get('DB_ENGINE', 'django.db.backends.postgresql'),
+            'server': options['url'] or (
+                f'gunicorn --workers {options["workers"]} '
+                f'--threads {options["threads"]}'
+            ),
+            **{key: options[key] for key in (
+                'concurrency', 'duration', 'warmup', 'users', 'recipes',
+                'seed',
+            )},
+            'mix': mix,
+        })
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        self.write_summary(report)
+
+    def write_summary(self, report):
+        rows = list(report['endpoints'].items())
+        if report['total']:
+            rows.append(('Всего', report['total']))
+        for endpoint, summary in rows:
+            latency = summary['latency_ms']
+            self.stdout.write(
+                f'{endpoint}: {summary["rps"]} rps, '
+                f'p50 {latency["p50"]} ms, p95 {latency["p95"]} ms, '
+                f'p99 {latency["p99"]} ms, ошибок {summary["errors"]}'
+            )
@@ -0,0 +1,28 @@
+from api.warmup import warm_up
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогреть кеш ответов API, индекс подсказок и соединения с БД '
+        'и вывести время каждого шага'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=settings.WARM_RECIPE_PAGES,
+            help='сколько первых страниц рецептов запросить'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.RESPONSE_CACHE_ENABLED:
+            self.stdout.write(
+                'Кеш ответов выключен: нужен общий для процессов backend '
+                'кеша (CACHE_BACKEND), а не LocMemCache'
+            )
+        timings = warm_up(options['pages'])
+        for name, seconds in timings:
+            self.stdout.write(f'{name}: {seconds * 1000:.0f} мс')
+        total = sum(seconds for _, seconds in timings)
+        self.stdout.write(f'Всего: {total * 1000:.0f} мс')
@@ -0,0 +1,79 @@
+import os
+
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75,
+    1.0, 2.5, 5.0, 10.0
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_latency_seconds',
+    'Время обработки запроса',
+    ('view', 'method'),
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_COUNT = Counter(
+    'foodgram_requests_total',
+    'Количество запросов по статусу ответа',
+    ('view', 'method', 'status'),
+)
+DB_QUERY_COUNT = Histogram(
+    'foodgram_db_queries_per_request',
+    'Количество SQL-запросов на один запрос',
+    ('view', 'method'),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests_total',
+    'Обращения к кешу',
+    ('cache', 'result'),
+)
+DB_CONNECTIONS = Counter(
+    'foodgram_db_connections_total',
+    'Подключения Django к БД (в режиме пула — выдачи из пула)',
+    ('alias',),
+)
+DB_POOL_OPENED = Counter(
+    'foodgram_db_pool_opened_total',
+    'Новые физические соединения, открытые пулом',
+    ('alias',),
+)
+DB_POOL_CONNECTIONS = Gauge(
+    'foodgram_db_pool_connections',
+    'Соединения в пуле по состоянию',
+    ('alias', 'state'),
+    multiprocess_mode='livesum',
+)
+DB_POOL_WAIT = Histogram(
+    'foodgram_db_pool_wait_seconds',
+    'Ожидание свободного соединения в пуле',
+    ('alias',),
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def observe_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def count_db_connection(sender, connection, **kwargs):
+    DB_CONNECTIONS.labels(connection.alias).inc()
+
+
+def get_registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,98 @@
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from foodgram.compression import choose_encoding, compress, is_compressible
+from foodgram.db_router import pin_to_primary, primary_writes
+
+from .metrics import DB_QUERY_COUNT, REQUEST_COUNT, REQUEST_LATENCY
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        method = request.method
+        REQUEST_LATENCY.labels(view, method).observe(duration)
+        REQUEST_COUNT.labels(view, method, response.status_code).inc()
+        DB_QUERY_COUNT.labels(view, method).observe(counter.count)
+        return response
+
+
+class ReplicaPinMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = primary_writes.set(set())
+        try:
+            response = self.get_response(request)
+            writes = primary_writes.get()
+        finally:
+            primary_writes.reset(token)
+        user = getattr(request, 'user', None)
+        if writes and user is not None and user.is_authenticated:
+            pin_to_primary(user)
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Сжимать ответы больше COMPRESSION_MIN_SIZE в brotli или gzip.
+    Готовые варианты из кеша ответов берутся без повторного сжатия.
+
+    Сжимаются только ответы на GET и HEAD: ответы на запросы записи
+    (например, токен из /api/auth/token/login/) вместе с данными из
+    запроса открывали бы секрет для атаки BREACH по размеру ответа.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (response.streaming or response.has_header('Content-Encoding')
+                or response.status_code != 200
+                or request.method not in ('GET', 'HEAD')):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        content_type = response.get('Content-Type', '')
+        if not is_compressible(response.content, content_type):
+            return response
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        variants = getattr(response, 'compressed_variants', None) or {}
+        content = variants.get(encoding)
+        if content is None:
+            content = compress(response.content, encoding)
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        return response
@@ -1,8 +1,64 @@
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.http import Http404
+from foodgram.db_router import is_pinned_to_primary, replica_reads
+from recipes.models import Recipe
+from recipes.relations import add_relation, remove_relation
 from rest_framework import mixins, status, viewsets
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.relations import PrimaryKeyRelatedField
 from rest_framework.response import Response
 
+from .fast_serializers import recipe_simple_rows
+from .throttling import Overloaded, acquire_slot, release_slot
+
+
+def does_not_exist(field_name, pk_value):
+    message = PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+    return ValidationError({field_name: [message.format(pk_value=pk_value)]})
+
+
+class AdmissionControlMixin:
+    throttle_scopes = {}
+    _admitted_slot = None
+
+    def get_throttle_scope(self):
+        return self.throttle_scopes.get(self.action)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        scope = self.get_throttle_scope()
+        limit = settings.CONCURRENCY_LIMITS.get(scope)
+        if limit is None:
+            return
+        slot = acquire_slot(scope, limit, settings.CONCURRENCY_SLOT_TIMEOUT)
+        if slot is None:
+            raise Overloaded(settings.CONCURRENCY_RETRY_AFTER)
+        self._admitted_slot = slot
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self._admitted_slot is not None:
+            release_slot(self._admitted_slot)
+            self._admitted_slot = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaReadMixin:
+    replica_actions = ('list', 'retrieve')
+    _replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (self.action in self.replica_actions
+                and not is_pinned_to_primary(request.user)):
+            self._replica_token = replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self._replica_token is not None:
+            replica_reads.reset(self._replica_token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
 
 class RecipeInFavoritesAndShoppingListViewSet(mixins.CreateModelMixin,
                                               mixins.DestroyModelMixin,
@@ -12,22 +68,22 @@ class RecipeInFavoritesAndShoppingListViewSet(mixins.CreateModelMixin,
     permission_classes = (IsAuthenticated,)
 
     def create(self, request, *args, **kwargs):
-        data = request.data
-        data['recipe'] = kwargs.get('recipe_id')
-        data['user'] = request.user.id
-        serializer = self.get_serializer(data=data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
+        recipe_id = kwargs.get('recipe_id')
+        created = add_relation(
+            self.Meta.model, request.user.id, 'recipe', recipe_id
+        )
+        rows = recipe_simple_rows(Recipe.objects.filter(pk=recipe_id))
+        if not rows:
+            raise does_not_exist('recipe', recipe_id)
         return Response(
-            serializer.data, status=status.HTTP_201_CREATED, headers=headers
+            rows[0],
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
         )
 
     def destroy(self, request, *args, **kwargs):
-        user = request.user.id
-        recipe = kwargs.get('recipe_id')
-        instance = get_object_or_404(
-            self.Meta.model, user=user, recipe=recipe
-        )
-        self.perform_destroy(instance)
+        if not remove_relation(
+            self.Meta.model, request.user.id, 'recipe',
+            kwargs.get('recipe_id')
+        ):
+            raise Http404
         return Response(status=status.HTTP_204_NO_CONTENT)
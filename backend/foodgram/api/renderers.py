@@ -0,0 +1,36 @@
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if orjson else None
+)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer на orjson. Значения, которые orjson не сериализует сам
+    (Decimal, datetime, ленивые строки), передаются в JSONEncoder DRF,
+    чтобы результат совпадал со стандартным рендерером. Без orjson,
+    с отступами или ensure_ascii используется стандартный рендерер.
+    """
+
+    default = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or indent is not None or self.ensure_ascii:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        ret = orjson.dumps(data, default=self.default, option=ORJSON_OPTIONS)
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
@@ -1,12 +1,21 @@
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
 from django.db.models import F
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
-from recipes.models import (FavoritesList, Follow, Ingredient,
-                            IngredientRecipe, Recipe, ShoppingList, Tag)
+from jobs.models import Job
+from recipes.models import (FavoritesList, Follow, FollowSuggestion,
+                            ImageUpload, Ingredient, IngredientRecipe, Recipe,
+                            ShoppingList, Tag)
+from recipes.snapshots import compact_snapshot, expand_snapshot, save_snapshots
+from recipes.uploads import UPLOAD_PREFIX, finish_upload, open_upload
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 from users.models import User
 
+from .fast_serializers import RECIPE_EXPANDABLE_FIELDS, recipe_simple_rows
+
 
 class IngredientSerializer(serializers.ModelSerializer):
 
@@ -37,6 +46,11 @@ class CustomUserSerializer(UserSerializer):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
+        # Списки пользователей аннотируют подписку в основном запросе.
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        if obj.id == request.user.id:
+            return False
         return Follow.objects.filter(
             user__id=request.user.id, author__id=obj.id
         ).exists()
@@ -84,10 +98,50 @@ class RecipeListSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
         )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        expand = self.context.get('expand', RECIPE_EXPANDABLE_FIELDS)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        compact_fields = {
+            'tags': serializers.PrimaryKeyRelatedField(
+                many=True, read_only=True
+            ),
+            'author': serializers.PrimaryKeyRelatedField(read_only=True),
+            'ingredients': serializers.SerializerMethodField(
+                method_name='get_ingredient_amounts'
+            ),
+        }
+        for name, field in compact_fields.items():
+            if name in self.fields and name not in expand:
+                self.fields[name] = field
+
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
     def get_ingredients(self, obj):
-        ingredients = IngredientRecipe.objects.filter(recipe=obj)
+        if obj.ingredients_snapshot is not None:
+            return expand_snapshot(obj.ingredients_snapshot)
+        ingredients = IngredientRecipe.objects.filter(
+            recipe=obj
+        ).select_related('ingredient')
         return IngredientRecipeSerializer(ingredients, many=True).data
 
+    def get_ingredient_amounts(self, obj):
+        if obj.ingredients_snapshot is not None:
+            return compact_snapshot(obj.ingredients_snapshot)
+        amounts = IngredientRecipe.objects.filter(recipe=obj).values_list(
+            'ingredient', 'amount'
+        )
+        return [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in amounts
+        ]
+
     def get_is_favorited(self, obj):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
@@ -105,12 +159,33 @@ class RecipeListSerializer(serializers.ModelSerializer):
         ).exists()
 
 
+class RecipeImageField(Base64ImageField):
+    """
+    Изображение в base64, файл из multipart/form-data или ссылка
+    'upload:<id>' на завершенную загрузку по частям.
+    """
+
+    default_error_messages = {
+        'invalid_upload': 'Загрузка не найдена или еще не завершена.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            return serializers.ImageField.to_internal_value(self, data)
+        if isinstance(data, str) and data.startswith(UPLOAD_PREFIX):
+            upload = open_upload(self.context['request'].user, data)
+            if upload is None:
+                self.fail('invalid_upload')
+            return serializers.ImageField.to_internal_value(self, upload)
+        return super().to_internal_value(data)
+
+
 class RecipeCreateSerializer(serializers.ModelSerializer):
     author = CustomUserSerializer(read_only=True)
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True)
     ingredients = AddIngredientSerializer(many=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
     cooking_time = serializers.IntegerField()
 
     class Meta:
@@ -125,13 +200,12 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             )
         return value
 
-    def validate_ingredients(self, value):
-        ingredients = self.initial_data.get('ingredients')
+    def validate_ingredients(self, ingredients):
         if not ingredients:
             raise serializers.ValidationError('Укажите ингредиенты!')
         ingredients_set = []
         for ingredient in ingredients:
-            if int(ingredient['amount']) <= 0:
+            if ingredient['amount'] <= 0:
                 raise serializers.ValidationError(
                     'Количество ингредиентов должно быть больше 0'
                 )
@@ -141,15 +215,14 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 )
             else:
                 ingredients_set.append(ingredient['id'])
-        return value
+        return ingredients
 
-    def validate_tags(self, value):
-        tags = self.initial_data.get('tags')
+    def validate_tags(self, tags):
         if len(tags) > len(set(tags)):
             raise serializers.ValidationError(
                 'Повторяющихся тегов в одном рецепе быть не должно!'
             )
-        return value
+        return tags
 
     def to_representation(self, instance):
         serializer = RecipeListSerializer(instance)
@@ -167,15 +240,22 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 defaults={'amount': amount}
             )
 
+    def save_ingredients_snapshot(self, recipe):
+        recipe.ingredients_snapshot = save_snapshots([recipe.pk])[recipe.pk]
+
+    @transaction.atomic
     def create(self, validated_data):
         image = validated_data.pop('image')
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(image=image, **validated_data)
+        finish_upload(image)
         recipe.tags.set(tags)
         self.add_ingredients_in_recipe(recipe, ingredients)
+        self.save_ingredients_snapshot(recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instanse, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -183,6 +263,8 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         self.add_ingredients_in_recipe(instanse, ingredients)
         instanse.tags.set(tags)
         super().update(instanse, validated_data)
+        self.save_ingredients_snapshot(instanse)
+        finish_upload(validated_data.get('image'))
         return instanse
 
 
@@ -251,7 +333,7 @@ class RecipeSimpleSerializer(serializers.ModelSerializer):
 
 class UserFollowerSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
-    recipes = RecipeSimpleSerializer(many=True, read_only=True)
+    recipes = serializers.SerializerMethodField()
     recipes_count = serializers.SerializerMethodField()
 
     class Meta:
@@ -268,5 +350,59 @@ class UserFollowerSerializer(serializers.ModelSerializer):
             return False
         return Follow.objects.filter(user=obj, author=request.user).exists()
 
+    def get_recipes(self, obj):
+        request = self.context.get('request')
+        if not settings.FAST_LIST_RENDERING:
+            return RecipeSimpleSerializer(
+                obj.recipes.all(), many=True, context=self.context
+            ).data
+        return recipe_simple_rows(obj.recipes.all(), request)
+
     def get_recipes_count(self, obj):
         return obj.recipes.count()
+
+
+class JobSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Job
+        fields = (
+            'id', 'name', 'status', 'attempts', 'result', 'error',
+            'created', 'updated'
+        )
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = ImageUpload
+        fields = ('id', 'filename', 'size', 'offset')
+        read_only_fields = ('offset',)
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                'Размер файла должен быть от 1 до '
+                f'{settings.IMAGE_UPLOAD_MAX_SIZE} байт.'
+            )
+        return value
+
+
+class FollowSuggestionSerializer(serializers.ModelSerializer):
+    email = serializers.ReadOnlyField(source='author.email')
+    id = serializers.ReadOnlyField(source='author.id')
+    username = serializers.ReadOnlyField(source='author.username')
+    first_name = serializers.ReadOnlyField(source='author.first_name')
+    last_name = serializers.ReadOnlyField(source='author.last_name')
+    is_subscribed = serializers.SerializerMethodField()
+
+    class Meta:
+        model = FollowSuggestion
+        fields = (
+            'email', 'id', 'username', 'first_name', 'last_name',
+            'is_subscribed', 'score', 'followed_by', 'favorited_recipes'
+        )
+
+    def get_is_subscribed(self, obj):
+        # Авторы, на которых пользователь уже подписан, не рекомендуются.
+        return False
@@ -0,0 +1,60 @@
+import gzip
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from foodgram import compression
+from foodgram.compression import choose_encoding
+from recipes.tests.utils import create_ingredient, create_user
+from rest_framework.test import APIClient
+
+
+@mock.patch.object(compression, 'ENCODINGS', ('br', 'gzip'))
+class ChooseEncodingTests(SimpleTestCase):
+
+    def test_highest_quality_wins(self):
+        self.assertEqual(choose_encoding('br;q=0.1, gzip;q=1'), 'gzip')
+        self.assertEqual(choose_encoding('gzip;q=0.5, br;q=0.8'), 'br')
+
+    def test_ties_use_preference_order(self):
+        self.assertEqual(choose_encoding('gzip, br'), 'br')
+        self.assertEqual(choose_encoding('gzip;q=0.5, br;q=0.5'), 'br')
+        self.assertEqual(choose_encoding('*'), 'br')
+
+    def test_refused_encodings(self):
+        self.assertEqual(choose_encoding('br;q=0, gzip'), 'gzip')
+        self.assertEqual(choose_encoding('br;q=0, *'), 'gzip')
+        self.assertEqual(choose_encoding('*;q=0.5, br;q=0'), 'gzip')
+        self.assertIsNone(choose_encoding('br;q=0, gzip;q=0'))
+        self.assertIsNone(choose_encoding('identity'))
+        self.assertIsNone(choose_encoding(''))
+        self.assertIsNone(choose_encoding('identity;q=1, gzip;q=0.5'))
+        self.assertEqual(choose_encoding('identity;q=0.1, gzip;q=0.5'), 'gzip')
+
+
+class CompressionMiddlewareTests(TestCase):
+
+    def setUp(self):
+        for number in range(30):
+            create_ingredient(f'ингредиент {number}')
+        self.client = APIClient()
+
+    def test_get_is_compressed(self):
+        with self.settings(COMPRESSION_MIN_SIZE=100):
+            response = self.client.get(
+                '/api/ingredients/', HTTP_ACCEPT_ENCODING='gzip'
+            )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('ингредиент 0', gzip.decompress(
+            response.content
+        ).decode())
+
+    def test_token_login_is_not_compressed(self):
+        create_user('reader')
+        with self.settings(COMPRESSION_MIN_SIZE=1):
+            response = self.client.post('/api/auth/token/login/', {
+                'email': 'reader@example.com', 'password': 'password'
+            }, format='json', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('auth_token', response.json())
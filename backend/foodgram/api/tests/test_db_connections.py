@@ -0,0 +1,50 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from foodgram import db_connections
+from foodgram.db_connections import check_connections, mark_connections_used
+
+
+class FakeConnection:
+
+    def __init__(self, usable=True):
+        self.connection = object()
+        self.is_usable = mock.Mock(return_value=usable)
+        self.close = mock.Mock()
+
+
+class ConnectionHealthCheckTests(SimpleTestCase):
+
+    def setUp(self):
+        self.connections = [FakeConnection(), FakeConnection(usable=False)]
+        patcher = mock.patch.object(db_connections, 'connections')
+        patcher.start().all.return_value = self.connections
+        self.addCleanup(patcher.stop)
+        self.clock = 1000.0
+        patcher = mock.patch('time.monotonic', lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_recently_used_connections_are_not_checked(self):
+        with self.settings(DB_CONN_HEALTH_CHECK_IDLE=30):
+            mark_connections_used()
+            self.clock += 29
+            check_connections()
+            for connection in self.connections:
+                connection.is_usable.assert_not_called()
+                connection.close.assert_not_called()
+
+    def test_idle_connections_are_checked(self):
+        with self.settings(DB_CONN_HEALTH_CHECK_IDLE=30):
+            mark_connections_used()
+            self.clock += 30
+            check_connections()
+        healthy, broken = self.connections
+        healthy.is_usable.assert_called_once()
+        healthy.close.assert_not_called()
+        broken.close.assert_called_once()
+
+    def test_unknown_age_is_checked(self):
+        check_connections()
+        for connection in self.connections:
+            connection.is_usable.assert_called_once()
@@ -0,0 +1,86 @@
+from django.core.cache import cache
+from django.test import TestCase
+from recipes.models import FavoritesList, ShoppingList
+from recipes.tests.utils import create_recipe, create_tag, create_user
+from rest_framework.test import APIClient
+
+
+class RecipeFacetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.anna, cls.boris = create_user('anna'), create_user('boris')
+        cls.reader = create_user('reader')
+        lunch, dinner = create_tag('lunch'), create_tag('dinner')
+        first = create_recipe(cls.anna, tags=[lunch, dinner], cooking_time=10)
+        second = create_recipe(cls.anna, tags=[lunch], cooking_time=30)
+        create_recipe(cls.anna, cooking_time=50)
+        fourth = create_recipe(cls.boris, tags=[dinner], cooking_time=20)
+        for recipe in (first, fourth):
+            FavoritesList.objects.create(user=cls.reader, recipe=recipe)
+        ShoppingList.objects.create(user=cls.reader, recipe=second)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def facets(self, query='', client=None):
+        response = (client or self.client).get(
+            f'/api/recipes/?facets=1&{query}'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['facets']
+
+    def expected(self, lunch, dinner, authors, favorited, in_cart):
+        return {
+            'tags': {'lunch': lunch, 'dinner': dinner},
+            'authors': {
+                str(author.pk): count for author, count in authors
+            },
+            'is_favorited': favorited, 'is_in_shopping_cart': in_cart,
+        }
+
+    def test_unfiltered(self):
+        self.assertEqual(self.facets(), self.expected(
+            2, 2, [(self.anna, 3), (self.boris, 1)], 2, 1
+        ))
+
+    def test_counts_follow_filters(self):
+        # Рецепт с обоими тегами считается один раз.
+        self.assertEqual(self.facets('tags=lunch&tags=dinner'), self.expected(
+            2, 2, [(self.anna, 2), (self.boris, 1)], 2, 1
+        ))
+        self.assertEqual(self.facets('cooking_time_max=20'), self.expected(
+            1, 2, [(self.anna, 1), (self.boris, 1)], 2, 0
+        ))
+        self.assertEqual(
+            self.facets(f'is_favorited=1&author={self.anna.pk}'),
+            self.expected(1, 1, [(self.anna, 1)], 1, 0)
+        )
+        self.assertEqual(
+            self.facets('cooking_time_min=100'), self.expected(0, 0, [], 0, 0)
+        )
+
+    def test_anonymous_and_author_limit(self):
+        facets = self.facets(client=APIClient())
+        self.assertNotIn('is_favorited', facets)
+        self.assertNotIn('is_in_shopping_cart', facets)
+        with self.settings(RECIPE_FACET_AUTHORS=1):
+            self.assertEqual(
+                self.facets('ordering=name')['authors'], {str(self.anna.pk): 3}
+            )
+
+    def test_cached_per_user_and_filters(self):
+        self.assertEqual(self.facets()['is_favorited'], 2)
+        FavoritesList.objects.all().delete()
+        # Кеш фасетов не сбрасывается записью, а живет свой срок.
+        self.assertEqual(self.facets('ordering=name')['is_favorited'], 2)
+        self.assertEqual(self.facets('author=')['is_favorited'], 2)
+        self.assertEqual(
+            self.facets('cooking_time_min=1')['is_favorited'], 0
+        )
+        other = APIClient()
+        other.force_authenticate(self.anna)
+        self.assertEqual(self.facets(client=other)['is_favorited'], 0)
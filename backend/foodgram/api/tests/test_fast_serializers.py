@@ -0,0 +1,106 @@
+from api.fast_serializers import recipe_list_rows, recipe_simple_rows
+from api.serializers import RecipeListSerializer, RecipeSimpleSerializer
+from django.core.cache import cache
+from django.test import TestCase
+from recipes.models import FavoritesList, Follow, Recipe, ShoppingList
+from recipes.snapshots import save_snapshots
+from recipes.tests.utils import (create_ingredient, create_recipe, create_tag,
+                                 create_user)
+from rest_framework.test import APIClient, APIRequestFactory
+
+RECIPE_QUERIES = (
+    '',
+    '?limit=10',
+    '?fields=id,name,tags,author&expand=',
+    '?fields=id,ingredients,is_favorited,is_in_shopping_cart&expand=tags',
+    '?expand=author,ingredients',
+    '?is_favorited=1',
+    '?is_in_shopping_cart=1',
+    '?tags=lunch',
+)
+
+
+class FastListRenderingTests(TestCase):
+    """Сборка списков из .values() совпадает с сериализаторами DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.reader = create_user('reader')
+        lunch, dinner = create_tag('lunch'), create_tag('dinner')
+        salt, flour = create_ingredient('соль'), create_ingredient('мука')
+        cls.recipes = [
+            create_recipe(
+                cls.author, f'Рецепт {index}',
+                tags=[lunch, dinner][:index % 3],
+                ingredients=[(salt, index + 1), (flour, 100)][:index % 3 + 1],
+                cooking_time=index + 5
+            ) for index in range(5)
+        ]
+        create_recipe(cls.reader, 'Свой рецепт', tags=[dinner])
+        # Часть рецептов со снимком ингредиентов, часть без.
+        save_snapshots([recipe.pk for recipe in cls.recipes[:2]])
+        FavoritesList.objects.create(user=cls.reader, recipe=cls.recipes[0])
+        ShoppingList.objects.create(user=cls.reader, recipe=cls.recipes[1])
+        ShoppingList.objects.create(user=cls.reader, recipe=cls.recipes[2])
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.anonymous = APIClient()
+        self.authorized = APIClient()
+        self.authorized.force_authenticate(self.reader)
+
+    def get_both(self, client, path):
+        responses = []
+        for fast in (True, False):
+            cache.clear()
+            with self.settings(FAST_LIST_RENDERING=fast):
+                response = client.get(path)
+            self.assertEqual(response.status_code, 200, path)
+            responses.append(response.json())
+        return responses
+
+    def test_recipe_list(self):
+        for user, client in (
+            ('anonymous', self.anonymous), ('reader', self.authorized)
+        ):
+            for query in RECIPE_QUERIES:
+                with self.subTest(user=user, query=query):
+                    fast, slow = self.get_both(client, f'/api/recipes/{query}')
+                    self.assertEqual(fast, slow)
+                    self.assertTrue(fast['results'])
+
+    def test_ingredients_and_subscriptions(self):
+        for client, path in (
+            (self.anonymous, '/api/ingredients/'),
+            (self.authorized, '/api/users/subscriptions/'),
+            (self.authorized, '/api/users/subscriptions/?recipes_limit=2'),
+        ):
+            with self.subTest(path=path):
+                fast, slow = self.get_both(client, path)
+                self.assertEqual(fast, slow)
+
+    def test_row_builders(self):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = self.reader
+        recipes = Recipe.objects.order_by('pk')
+        context = {'request': request}
+        self.assertEqual(
+            recipe_list_rows(recipes.values_list('pk', flat=True), request),
+            RecipeListSerializer(recipes, many=True, context=context).data
+        )
+        self.assertEqual(
+            recipe_simple_rows(recipes, request),
+            RecipeSimpleSerializer(recipes, many=True, context=context).data
+        )
+
+    def test_recipe_hidden_after_page_query_is_skipped(self):
+        marked, *rest = self.recipes
+        recipe_ids = [recipe.pk for recipe in self.recipes]
+        Recipe.objects.filter(pk=marked.pk).update(
+            deletion_requested='2026-01-01T00:00:00Z'
+        )
+        rows = recipe_list_rows(recipe_ids)
+        self.assertEqual(
+            [row['id'] for row in rows], [recipe.pk for recipe in rest]
+        )
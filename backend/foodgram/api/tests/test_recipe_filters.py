@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from api.filters import RECIPE_ORDERINGS
+from django.test import TestCase
+from django.utils import timezone
+from recipes.models import Recipe
+from recipes.tests.utils import create_recipe, create_user
+from rest_framework.test import APIClient
+
+# Название, время приготовления, популярность, сдвиг даты в днях.
+RECIPES = (
+    ('Борщ', 60, 3.0, 0),
+    ('Блины', 20, 1.0, 0),
+    ('Омлет', 10, 3.0, 1),
+    ('Салат', 20, 0.0, 1),
+    ('Чай', 5, 1.0, 1),
+)
+
+
+class RecipeFilterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        now = timezone.now()
+        for name, cooking_time, popularity, days in RECIPES:
+            recipe = create_recipe(
+                author, name, cooking_time=cooking_time, popularity=popularity
+            )
+            # Одинаковые даты внутри группы проверяют добор по id.
+            Recipe.objects.filter(pk=recipe.pk).update(
+                pub_date=now - timedelta(days=days)
+            )
+        cls.recipes = list(Recipe.objects.all())
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def ids(self, query='', limit=100):
+        response = self.client.get(f'/api/recipes/?limit={limit}&{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row['id'] for row in response.json()['results']]
+
+    def expected(self, keys):
+        recipes = self.recipes
+        for key in reversed(keys):
+            field = key.lstrip('-')
+            recipes = sorted(
+                recipes, key=lambda recipe: getattr(recipe, field),
+                reverse=key.startswith('-')
+            )
+        return [recipe.pk for recipe in recipes]
+
+    def test_cooking_time_range(self):
+        def names(query):
+            return sorted(
+                Recipe.objects.get(pk=pk).name for pk in self.ids(query)
+            )
+
+        self.assertEqual(
+            names('cooking_time_min=10&cooking_time_max=20'),
+            ['Блины', 'Омлет', 'Салат']
+        )
+        self.assertEqual(names('cooking_time_min=21'), ['Борщ'])
+        self.assertEqual(names('cooking_time_max=5'), ['Чай'])
+        self.assertEqual(names('cooking_time_min=61'), [])
+
+    def test_orderings(self):
+        for value, keys in RECIPE_ORDERINGS.items():
+            with self.subTest(ordering=value):
+                self.assertEqual(
+                    self.ids(f'ordering={value}'), self.expected(keys)
+                )
+        self.assertEqual(self.ids(), self.expected(Recipe._meta.ordering))
+        self.assertEqual(Recipe._meta.ordering, RECIPE_ORDERINGS['-pub_date'])
+        self.assertEqual(
+            self.client.get('/api/recipes/?ordering=random').status_code, 400
+        )
+
+    def test_pages_do_not_overlap(self):
+        for value in (None, *RECIPE_ORDERINGS):
+            query = f'ordering={value}' if value else ''
+            with self.subTest(ordering=value):
+                pages = [
+                    self.ids(f'{query}&page={page}', limit=2)
+                    for page in (1, 2, 3)
+                ]
+                self.assertEqual(
+                    [pk for page in pages for pk in page], self.ids(query)
+                )
@@ -0,0 +1,79 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import SimpleTestCase, TestCase
+from foodgram.db_router import (ReplicaRouter, is_pinned_to_primary,
+                                replica_reads)
+from recipes.models import Recipe
+from recipes.tests.utils import create_recipe, create_user
+from rest_framework.test import APIClient
+
+REPLICAS = {'DATABASE_REPLICAS': ['replica_1'], 'CACHE_IS_SHARED': True}
+
+
+class ReplicaRouterTests(SimpleTestCase):
+
+    def router(self, healthy=True):
+        with self.settings(**REPLICAS):
+            router = ReplicaRouter()
+        patcher = mock.patch.object(
+            router.pool, 'is_healthy', return_value=healthy
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return router
+
+    def read(self, router):
+        token = replica_reads.set(True)
+        try:
+            return router.db_for_read(Recipe)
+        finally:
+            replica_reads.reset(token)
+
+    def test_reads_go_to_replica_only_when_enabled(self):
+        router = self.router()
+        self.assertEqual(router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.read(router), 'replica_1')
+        self.assertEqual(router.db_for_write(Recipe), DEFAULT_DB_ALIAS)
+
+    def test_fallback_to_primary(self):
+        self.assertEqual(self.read(self.router(healthy=False)),
+                         DEFAULT_DB_ALIAS)
+        router = self.router()
+        with mock.patch.object(
+            connections[DEFAULT_DB_ALIAS], 'in_atomic_block', True
+        ):
+            self.assertEqual(self.read(router), DEFAULT_DB_ALIAS)
+
+    def test_replicas_require_shared_cache(self):
+        with self.settings(**{**REPLICAS, 'CACHE_IS_SHARED': False}):
+            with self.assertRaises(ImproperlyConfigured):
+                ReplicaRouter()
+        with self.settings(DATABASE_REPLICAS=[], CACHE_IS_SHARED=False):
+            ReplicaRouter()
+
+
+class ReplicaPinTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.recipe = create_recipe(create_user('author'))
+        self.reader = create_user('reader')
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def test_write_pins_user_to_primary(self):
+        with self.settings(**REPLICAS, REPLICA_PIN_SECONDS=5):
+            self.client.get('/api/recipes/')
+            self.assertFalse(is_pinned_to_primary(self.reader))
+            response = self.client.get(
+                f'/api/recipes/{self.recipe.pk}/favorite/'
+            )
+            self.assertEqual(response.status_code, 201)
+            self.assertTrue(is_pinned_to_primary(self.reader))
+            with mock.patch('api.mixins.replica_reads') as reads:
+                self.client.get('/api/recipes/')
+            reads.set.assert_not_called()
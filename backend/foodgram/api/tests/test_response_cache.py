@@ -0,0 +1,32 @@
+from django.core.cache import cache
+from django.test import TestCase
+from recipes.models import Tag
+from recipes.tests.utils import create_tag
+from rest_framework.test import APIClient
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        create_tag('lunch')
+        self.client = APIClient()
+
+    def tag_names(self):
+        return [tag['name'] for tag in self.client.get('/api/tags/').json()]
+
+    def test_disabled_by_default_with_local_memory_cache(self):
+        self.assertEqual(self.tag_names(), ['Lunch'])
+        Tag.objects.update(name='Обед')
+        self.assertEqual(self.tag_names(), ['Обед'])
+
+    def test_shared_cache_is_used_and_invalidated(self):
+        with self.settings(RESPONSE_CACHE_ENABLED=True):
+            self.assertEqual(self.tag_names(), ['Lunch'])
+            # Обновление мимо сигналов не сбрасывает кеш.
+            Tag.objects.update(name='Обед')
+            self.assertEqual(self.tag_names(), ['Lunch'])
+            with self.captureOnCommitCallbacks(execute=True):
+                create_tag('dinner')
+            self.assertEqual(sorted(self.tag_names()), ['Dinner', 'Обед'])
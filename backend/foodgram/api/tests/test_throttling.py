@@ -0,0 +1,75 @@
+from unittest import mock
+
+from api.throttling import TokenBucketThrottle, acquire_slot, release_slot
+from django.core.cache import cache
+from django.test import TestCase
+from recipes.tests.utils import create_ingredient
+from rest_framework.test import APIClient
+
+URL = '/api/ingredients/'
+
+
+class ThrottlingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        create_ingredient('соль')
+        self.client = APIClient()
+        self.now = 1000.0
+        for patcher in (
+            mock.patch.object(
+                TokenBucketThrottle, 'THROTTLE_RATES',
+                {'ingredients_list': '3/min'}
+            ),
+            mock.patch.object(
+                TokenBucketThrottle, 'timer', lambda throttle: self.now
+            ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_token_bucket(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get(URL).status_code, 200)
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '20')
+        # Ведро пополняется на один запрос за 20 секунд.
+        self.now += 20
+        self.assertEqual(self.client.get(URL).status_code, 200)
+        self.assertEqual(self.client.get(URL).status_code, 429)
+        self.now += 60
+        for _ in range(3):
+            self.assertEqual(self.client.get(URL).status_code, 200)
+        # Запросы с фильтром по имени не ограничиваются.
+        self.assertEqual(self.client.get(f'{URL}?name=с').status_code, 200)
+
+    def test_concurrency_limit(self):
+        with self.settings(
+            CONCURRENCY_LIMITS={'ingredients_list': 1},
+            CONCURRENCY_RETRY_AFTER=2
+        ):
+            slot = acquire_slot('ingredients_list', 1, 60)
+            response = self.client.get(URL)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '2')
+            release_slot(slot)
+            self.assertEqual(self.client.get(URL).status_code, 200)
+            # Ответ освободил слот.
+            self.assertIsNotNone(acquire_slot('ingredients_list', 1, 60))
+
+    def test_expired_slots(self):
+        first = acquire_slot('scope', 2, 60)
+        second = acquire_slot('scope', 2, 60)
+        self.assertIsNone(acquire_slot('scope', 2, 60))
+        # Слот упавшего воркера истекает и достается новому запросу.
+        cache.delete(first[0])
+        third = acquire_slot('scope', 2, 60)
+        self.assertEqual(third[0], first[0])
+        # Поздний release истекшего слота не освобождает чужой.
+        release_slot(first)
+        self.assertIsNone(acquire_slot('scope', 2, 60))
+        release_slot(second)
+        release_slot(second)
+        self.assertIsNotNone(acquire_slot('scope', 2, 60))
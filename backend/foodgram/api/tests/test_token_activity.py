@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from recipes.retention import purge_tokens
+from recipes.tests.utils import create_user
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+class TokenActivityTests(TestCase):
+
+    def setUp(self):
+        self.user = create_user('reader')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def last_used(self):
+        return User.objects.get(pk=self.user.pk).token_last_used
+
+    def test_use_is_recorded_once_a_day(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        first = self.last_used()
+        self.assertIsNotNone(first)
+        self.client.get('/api/users/me/')
+        self.assertEqual(self.last_used(), first)
+        User.objects.update(token_last_used=first - timedelta(days=2))
+        self.client.get('/api/users/me/')
+        self.assertGreater(self.last_used(), first)
+
+    def test_purge_keeps_tokens_in_use(self):
+        old = timezone.now() - timedelta(days=400)
+        Token.objects.update(created=old)
+        User.objects.update(last_login=old)
+        self.client.get('/api/users/me/')
+        with self.settings(TOKEN_RETENTION_DAYS=180):
+            self.assertEqual(purge_tokens(batch_size=10), 0)
+            User.objects.update(token_last_used=old)
+            self.assertEqual(purge_tokens(batch_size=10), 1)
+        self.assertFalse(Token.objects.exists())
+
+    def test_purge_keeps_tokens_after_login(self):
+        old = timezone.now() - timedelta(days=400)
+        Token.objects.update(created=old)
+        User.objects.update(token_last_used=old, last_login=timezone.now())
+        with self.settings(TOKEN_RETENTION_DAYS=180):
+            self.assertEqual(purge_tokens(batch_size=10), 0)
@@ -0,0 +1,75 @@
+import uuid
+
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import ScopedRateThrottle
+
+SLOT_KEY = 'concurrency_{}_{}'
+
+
+class TokenBucketThrottle(ScopedRateThrottle):
+    """
+    Token bucket на пользователя (или IP для анонимов). Скоуп берется из
+    view.get_throttle_scope(), ставка 'N/период' из DEFAULT_THROTTLE_RATES
+    задает емкость ведра N, которое полностью пополняется за период.
+    """
+
+    cache_format = 'throttle_bucket_%(scope)s_%(ident)s'
+
+    def allow_request(self, request, view):
+        get_scope = getattr(view, 'get_throttle_scope', None)
+        self.scope = get_scope() if get_scope else None
+        if not self.scope or self.scope not in self.THROTTLE_RATES:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.get_cache_key(request, view)
+        self.now = self.timer()
+        tokens, updated = self.cache.get(
+            self.key, (self.num_requests, self.now)
+        )
+        self.tokens = min(
+            self.num_requests,
+            tokens + (self.now - updated) * self.num_requests / self.duration
+        )
+        if self.tokens < 1:
+            return self.throttle_failure()
+        self.cache.set(self.key, (self.tokens - 1, self.now), self.duration)
+        return True
+
+    def wait(self):
+        return (1 - self.tokens) * self.duration / self.num_requests
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервер перегружен, повторите запрос позже.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait):
+        super().__init__()
+        self.wait = wait
+
+
+def acquire_slot(scope, limit, timeout):
+    """
+    Занять один из limit слотов скоупа и вернуть его или None, если все
+    заняты. Каждый слот — отдельный ключ кеша со своим сроком timeout:
+    слот упавшего воркера освобождается сам, а общий счетчик не может
+    разойтись с числом выполняющихся запросов после истечения ключа.
+    """
+    keys = [SLOT_KEY.format(scope, number) for number in range(limit)]
+    busy = cache.get_many(keys)
+    token = uuid.uuid4().hex
+    for key in keys:
+        if key not in busy and cache.add(key, token, timeout):
+            return key, token
+    return None
+
+
+def release_slot(slot):
+    """Слот, истекший и занятый другим запросом, не освобождается."""
+    key, token = slot
+    if cache.get(key) == token:
+        cache.delete(key)
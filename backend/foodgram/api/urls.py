@@ -1,17 +1,21 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (FavoritesListViewSet, FollowViewSet, IngredientViewSet,
-                    RecipeViewSet, ShoppingListViewSet, TagViewSet)
+from .views import (FavoritesListViewSet, FollowViewSet, ImageUploadViewSet,
+                    IngredientViewSet, JobViewSet, RecipeViewSet,
+                    ShoppingListViewSet, SuggestView, TagViewSet)
 
 router = DefaultRouter()
 
 router.register('tags', TagViewSet, basename='tags')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('recipes', RecipeViewSet, basename='recipes')
+router.register('jobs', JobViewSet, basename='jobs')
+router.register('uploads', ImageUploadViewSet, basename='uploads')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('suggest/', SuggestView.as_view(), name='suggest'),
     path('users/subscriptions/', FollowViewSet.as_view({'get': 'list'}),
          name='subscriptions'),
     path('users/<int:author_id>/subscribe/',
@@ -1,45 +1,192 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import F, Sum
+from django.db.models import Exists, OuterRef
+from django.http import Http404
 from django.http.response import HttpResponse
-from django.shortcuts import get_object_or_404
-from recipes.models import (FavoritesList, Follow, Ingredient,
-                            IngredientRecipe, Recipe, ShoppingList, Tag)
-from rest_framework import status
+from djoser.views import UserViewSet
+from foodgram.response_cache import cached_response
+from jobs.models import Job
+from jobs.queue import enqueue
+from recipes.deletion import mark_recipes_for_deletion, mark_users_for_deletion
+from recipes.models import (FavoritesList, Follow, ImageUpload, Ingredient,
+                            Recipe, SearchEntry, ShoppingList, Tag)
+from recipes.relations import add_relation, remove_relation
+from recipes.search import suggest
+from recipes.shopping_list import shopping_list_text
+from recipes.suggestions import suggestions_for
+from recipes.uploads import UploadOffsetError, append_chunk, discard_upload
+from rest_framework import mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
+from rest_framework.viewsets import (GenericViewSet, ModelViewSet,
+                                     ReadOnlyModelViewSet)
 
+from .facets import recipe_facets
+from .fast_serializers import (RECIPE_EXPANDABLE_FIELDS, RECIPE_LIST_FIELDS,
+                               ingredient_rows, recipe_list_rows)
 from .filters import IngredientFilter, RecipeFilter
-from .mixins import RecipeInFavoritesAndShoppingListViewSet
+from .mixins import (AdmissionControlMixin,
+                     RecipeInFavoritesAndShoppingListViewSet, ReplicaReadMixin,
+                     does_not_exist)
 from .pagination import LimitPageNumberPagination
 from .permissions import IsAuthorOrAdmin
 from .serializers import (FavoritesListSerializer, FollowSerializer,
-                          IngredientSerializer, RecipeCreateSerializer,
-                          RecipeListSerializer, ShoppingListSerializer,
-                          TagSerializer, UserFollowerSerializer)
+                          FollowSuggestionSerializer, ImageUploadSerializer,
+                          IngredientSerializer, JobSerializer,
+                          RecipeCreateSerializer, RecipeListSerializer,
+                          ShoppingListSerializer, TagSerializer,
+                          UserFollowerSerializer)
 
 User = get_user_model()
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+def parse_fieldset(request, param, allowed):
+    value = request.query_params.get(param)
+    if value is None:
+        return allowed
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValidationError({
+            param: f'Неизвестные поля: {", ".join(sorted(unknown))}'
+        })
+    return tuple(name for name in allowed if name in requested)
+
+
+def annotate_is_subscribed(queryset, user, name='is_subscribed',
+                           author='pk'):
+    if user.is_anonymous:
+        return queryset
+    return queryset.annotate(**{name: Exists(
+        Follow.objects.filter(user=user, author=OuterRef(author))
+    )})
+
+
+class CustomUserViewSet(UserViewSet):
+    queryset = User.objects.filter(deletion_requested__isnull=True)
+    pagination_class = LimitPageNumberPagination
+
+    def get_queryset(self):
+        return annotate_is_subscribed(
+            super().get_queryset(), self.request.user
+        )
+
+    def perform_destroy(self, instance):
+        mark_users_for_deletion(User.objects.filter(pk=instance.pk))
+
+    @action(detail=False, permission_classes=(IsAuthenticated,),
+            serializer_class=FollowSuggestionSerializer)
+    def suggestions(self, request):
+        queryset = suggestions_for(request.user)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                self.get_serializer(page, many=True).data
+            )
+        return Response(self.get_serializer(queryset, many=True).data)
+
+
+class TagViewSet(ReplicaReadMixin, ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
+    @cached_response('tags')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(AdmissionControlMixin, ReplicaReadMixin,
+                        ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
     filterset_class = IngredientFilter
+    throttle_scopes = {'list': 'ingredients_list'}
 
+    def get_throttle_scope(self):
+        if self.request.query_params.get('name'):
+            return None
+        return super().get_throttle_scope()
 
-class RecipeViewSet(ModelViewSet):
+    @cached_response('ingredients')
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_LIST_RENDERING:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(ingredient_rows(queryset))
+
+
+class RecipeViewSet(AdmissionControlMixin, ReplicaReadMixin, ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrAdmin,)
     filterset_class = RecipeFilter
     pagination_class = LimitPageNumberPagination
+    throttle_scopes = {
+        'create': 'recipe_write',
+        'update': 'recipe_write',
+        'partial_update': 'recipe_write',
+        'download_shopping_cart': 'shopping_cart_download',
+        'export_shopping_cart': 'shopping_cart_download',
+    }
+
+    def get_fieldset(self):
+        return (
+            parse_fieldset(self.request, 'fields', RECIPE_LIST_FIELDS),
+            parse_fieldset(self.request, 'expand', RECIPE_EXPANDABLE_FIELDS),
+        )
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'retrieve' and (
+            self.action != 'list' or settings.FAST_LIST_RENDERING
+        ):
+            return queryset
+        fields, expand = self.get_fieldset()
+        if 'author' in fields and 'author' in expand:
+            queryset = annotate_is_subscribed(
+                queryset.select_related('author'), self.request.user,
+                'author_is_subscribed', 'author'
+            )
+        if 'tags' in fields:
+            queryset = queryset.prefetch_related('tags')
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve'):
+            context['fields'], context['expand'] = self.get_fieldset()
+        return context
+
+    @cached_response('recipes')
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_LIST_RENDERING:
+            return super().list(request, *args, **kwargs)
+        fields, expand = self.get_fieldset()
+        queryset = self.filter_queryset(self.get_queryset())
+        recipe_ids = queryset.values_list('id', flat=True)
+        page = self.paginate_queryset(recipe_ids)
+        if page is not None:
+            return self.get_paginated_response(
+                recipe_list_rows(page, request, fields, expand)
+            )
+        return Response(recipe_list_rows(recipe_ids, request, fields, expand))
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.request.query_params.get('facets') in ('1', 'true'):
+            filterset = self.filterset_class(
+                self.request.query_params, super().get_queryset(),
+                request=self.request
+            )
+            response.data['facets'] = recipe_facets(
+                filterset, self.request.user
+            )
+        return response
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -47,6 +194,9 @@ class RecipeViewSet(ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        mark_recipes_for_deletion(Recipe.objects.filter(pk=instance.pk))
+
     def get_serializer_class(self):
         if self.action in ['list', 'retrieve']:
             return RecipeListSerializer
@@ -55,29 +205,34 @@ class RecipeViewSet(ModelViewSet):
     @action(detail=False, methods=['get'],
             permission_classes=(IsAuthenticated,))
     def download_shopping_cart(self, request):
-        shop_list = IngredientRecipe.objects.filter(
-            recipe__shopping_cart__user=request.user).values(
-                name=F('ingredient__name'),
-                measurement_unit=F('ingredient__measurement_unit')
-        ).annotate(amount=Sum('amount'))
-
-        text = '\n'.join([
-            f"{item['name']} ({item['measurement_unit']}) - {item['amount']}"
-            for item in shop_list
-        ])
+        text = shopping_list_text(request.user)
 
         filename = 'shopping_cart.txt'
         response = HttpResponse(text, content_type='text/plain')
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
 
+    @action(detail=False, methods=['post'],
+            permission_classes=(IsAuthenticated,))
+    def export_shopping_cart(self, request):
+        job = enqueue('export_shopping_cart', user=request.user)
+        headers = {'Location': reverse(
+            'jobs-detail', args=(job.pk,), request=request
+        )}
+        return Response(
+            JobSerializer(job).data, status=status.HTTP_202_ACCEPTED,
+            headers=headers
+        )
+
 
-class FollowViewSet(ModelViewSet):
+class FollowViewSet(ReplicaReadMixin, ModelViewSet):
     permission_classes = (IsAuthenticated,)
     pagination_class = LimitPageNumberPagination
 
     def get_queryset(self):
-        return User.objects.filter(following__user=self.request.user)
+        return User.objects.filter(
+            following__user=self.request.user, deletion_requested__isnull=True
+        )
 
     def get_serializer_class(self):
         if self.action in ['list']:
@@ -85,22 +240,26 @@ class FollowViewSet(ModelViewSet):
         return FollowSerializer
 
     def create(self, request, *args, **kwargs):
-        data = request.data
-        data['user'] = request.user.id
-        data['author'] = kwargs.get('author_id')
-        serializer = self.get_serializer(data=data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
+        author_id = kwargs.get('author_id')
+        if author_id == request.user.id:
+            raise ValidationError(
+                {'author': ['Вы не можете подписаться сами на себя!']}
+            )
+        created = add_relation(Follow, request.user.id, 'author', author_id)
+        if not created and not User.objects.filter(
+            pk=author_id, deletion_requested__isnull=True
+        ).exists():
+            raise does_not_exist('author', author_id)
         return Response(
-            serializer.data, status=status.HTTP_201_CREATED, headers=headers
+            {'user': request.user.id, 'author': author_id},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
         )
 
     def destroy(self, request, *args, **kwargs):
-        instance = get_object_or_404(
-            Follow, user=request.user.id, author=kwargs.get('author_id')
-        )
-        self.perform_destroy(instance)
+        if not remove_relation(
+            Follow, request.user.id, 'author', kwargs.get('author_id')
+        ):
+            raise Http404
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -113,6 +272,87 @@ class FavoritesListViewSet(RecipeInFavoritesAndShoppingListViewSet):
         model = FavoritesList
 
 
+class JobViewSet(ReadOnlyModelViewSet):
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = LimitPageNumberPagination
+
+    def get_queryset(self):
+        if self.request.user.is_staff:
+            return Job.objects.all()
+        return Job.objects.filter(user=self.request.user)
+
+
+class ImageUploadViewSet(mixins.CreateModelMixin,
+                         mixins.RetrieveModelMixin,
+                         mixins.DestroyModelMixin,
+                         GenericViewSet):
+    serializer_class = ImageUploadSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return ImageUpload.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        discard_upload(instance)
+
+    def partial_update(self, request, *args, **kwargs):
+        upload = self.get_object()
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            raise ValidationError(
+                'Нужны заголовки Upload-Offset и Content-Length.'
+            )
+        if length > settings.IMAGE_UPLOAD_CHUNK_SIZE:
+            raise ValidationError(
+                'Кусок больше '
+                f'{settings.IMAGE_UPLOAD_CHUNK_SIZE} байт.'
+            )
+        if offset + length > upload.size:
+            raise ValidationError('Кусок выходит за размер файла.')
+        try:
+            upload = append_chunk(upload, request.stream, offset, length)
+        except UploadOffsetError as error:
+            return Response(
+                {'offset': error.offset}, status=status.HTTP_409_CONFLICT
+            )
+        return Response(self.get_serializer(upload).data)
+
+
+class SuggestView(APIView):
+    # Ключ ответа, категория индекса и имя поля с текстом.
+    categories = (
+        ('recipes', SearchEntry.RECIPE, 'name'),
+        ('ingredients', SearchEntry.INGREDIENT, 'name'),
+        ('authors', SearchEntry.AUTHOR, 'username'),
+    )
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get(
+                'limit', settings.SUGGEST_LIMIT
+            ))
+        except ValueError:
+            raise ValidationError({'limit': 'Нужно целое число.'})
+        limit = max(1, min(limit, settings.SUGGEST_MAX_LIMIT))
+        results = suggest(
+            request.query_params.get('q', ''),
+            {category: limit for _, category, _ in self.categories}
+        )
+        return Response({
+            key: [
+                {'id': object_id, field: label}
+                for object_id, label in results[category]
+            ]
+            for key, category, field in self.categories
+        })
+
+
 class ShoppingListViewSet(RecipeInFavoritesAndShoppingListViewSet):
     queryset = ShoppingList.objects.order_by('-created')
     serializer_class = ShoppingListSerializer
@@ -0,0 +1,100 @@
+"""
+Прогрев процесса после старта: импорт тяжелых модулей, построение
+полей сериализаторов и фильтров, соединения с БД, кеш ответов для
+анонимных пользователей (если он включен) и индекс подсказок в памяти.
+"""
+import importlib
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import RequestFactory
+from django.urls import get_resolver
+
+WARM_MODULES = (
+    'djoser.views',
+    'djoser.serializers',
+    'django_filters.rest_framework',
+    'drf_extra_fields.fields',
+    'rest_framework.authtoken.views',
+    'PIL.Image',
+    'api.views',
+)
+RECIPE_ORDERINGS = ('', 'popular')
+
+
+def import_modules():
+    for name in WARM_MODULES:
+        importlib.import_module(name)
+    get_resolver().url_patterns
+
+
+def build_serializers():
+    from recipes.models import Recipe
+
+    from .filters import IngredientFilter, RecipeFilter
+    from .serializers import (CustomUserSerializer, RecipeCreateSerializer,
+                              RecipeListSerializer, UserFollowerSerializer)
+
+    for serializer in (
+        CustomUserSerializer, RecipeCreateSerializer, RecipeListSerializer,
+        UserFollowerSerializer,
+    ):
+        serializer().fields
+    for filterset in (IngredientFilter, RecipeFilter):
+        filterset(queryset=Recipe.objects.none()).form
+
+
+def connect_databases():
+    from foodgram.db_connections import warm_up_connections
+
+    warm_up_connections()
+
+
+def warm_paths(pages):
+    paths = ['/api/tags/', '/api/ingredients/']
+    for ordering in RECIPE_ORDERINGS:
+        for page in range(1, pages + 1):
+            query = f'page={page}'
+            if ordering:
+                query += f'&ordering={ordering}'
+            paths.append(f'/api/recipes/?{query}')
+    return paths
+
+
+def fill_response_cache(pages):
+    handler = WSGIHandler()
+    factory = RequestFactory(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+    for path in warm_paths(pages):
+        response = handler(
+            factory.get(path).environ, lambda status, headers: None
+        )
+        b''.join(response)
+        response.close()
+
+
+def build_search_index():
+    from recipes.models import SearchEntry
+    from recipes.search import suggest
+
+    suggest('а', {category: 1 for category, _ in SearchEntry.CATEGORIES})
+
+
+def warm_up(pages=None):
+    """Выполнить все шаги прогрева, вернуть [(шаг, секунды)]."""
+    if pages is None:
+        pages = settings.WARM_RECIPE_PAGES
+    steps = [
+        ('импорт модулей', import_modules),
+        ('сериализаторы и фильтры', build_serializers),
+        ('соединения с БД', connect_databases),
+        ('индекс подсказок', build_search_index),
+    ]
+    if settings.RESPONSE_CACHE_ENABLED:
+        steps.insert(3, ('кеш ответов', lambda: fill_response_cache(pages)))
+    timings = []
+    for name, step in steps:
+        start = time.perf_counter()
+        step()
+        timings.append((name, time.perf_counter() - start))
+    return timings
@@ -0,0 +1,82 @@
+"""
+Сжатие ответов API в brotli или gzip.
+
+Ответы из кеша (foodgram.response_cache) хранят сжатые варианты рядом
+с исходным телом и отдаются без повторного сжатия; остальные ответы
+сжимаются на лету с более быстрыми настройками.
+"""
+import gzip
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Порядок предпочтения, если клиент принимает несколько вариантов.
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+# Уровни для сжатия на лету и для вариантов, которые кладутся в кеш.
+FAST_LEVELS = {'br': 4, 'gzip': 6}
+BEST_LEVELS = {'br': 9, 'gzip': 9}
+
+
+def compress(content, encoding, best=False):
+    level = (BEST_LEVELS if best else FAST_LEVELS)[encoding]
+    if encoding == 'br':
+        return brotli.compress(content, quality=level)
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+def is_compressible(content, content_type):
+    return (
+        len(content) >= settings.COMPRESSION_MIN_SIZE
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+    )
+
+
+def compressed_variants(content, content_type):
+    """Сжатые варианты тела для кеша: {кодировка: байты}."""
+    if not is_compressible(content, content_type):
+        return {}
+    return {
+        encoding: compress(content, encoding, best=True)
+        for encoding in ENCODINGS
+    }
+
+
+def accepted_encodings(header):
+    """{кодировка: q} из Accept-Encoding, включая явные q=0."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        accepted[coding] = quality
+    return accepted
+
+
+def choose_encoding(header):
+    """
+    Кодировка с наибольшим q; при равных q — по порядку ENCODINGS.
+    None, если клиент не принимает сжатие или явно предпочитает identity.
+    """
+    accepted = accepted_encodings(header)
+    wildcard = accepted.get('*', 0)
+    chosen, chosen_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, wildcard)
+        if quality > chosen_quality:
+            chosen, chosen_quality = encoding, quality
+    if accepted.get('identity', 0) > chosen_quality:
+        return None
+    return chosen
@@ -0,0 +1,45 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+
+def check_connections(**kwargs):
+    """
+    Проверить SELECT 1 только соединения, простаивавшие дольше
+    DB_CONN_HEALTH_CHECK_IDLE: недавно использованное соединение почти
+    всегда живо, а после ошибки на нем Django закроет его в конце запроса.
+    """
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        last_used = getattr(connection, 'last_used', None)
+        if (last_used is not None
+                and now - last_used < settings.DB_CONN_HEALTH_CHECK_IDLE):
+            continue
+        if not connection.is_usable():
+            connection.close()
+
+
+def mark_connections_used(**kwargs):
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.last_used = now
+
+
+def warm_up_connections():
+    for connection in connections.all():
+        pool = getattr(connection, 'pool', None)
+        try:
+            if pool is not None:
+                with connection.wrap_database_errors:
+                    pool.warm_up()
+            else:
+                connection.ensure_connection()
+        except DatabaseError:
+            logger.warning('Не удалось подключиться к БД %s', connection.alias)
@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import deque
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+from api.metrics import DB_POOL_CONNECTIONS, DB_POOL_OPENED, DB_POOL_WAIT
+from django.db.backends.postgresql import base
+
+Database = base.Database
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений psycopg2 для одного alias БД.
+    Простаивающие дольше health_check_interval соединения перед выдачей
+    проверяются запросом SELECT 1.
+    """
+
+    def __init__(self, alias, conn_params, min_size, max_size, timeout,
+                 health_check_interval):
+        self.alias = alias
+        self.conn_params = conn_params
+        self.min_size = min_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle_gauge = DB_POOL_CONNECTIONS.labels(alias, 'idle')
+        self._in_use_gauge = DB_POOL_CONNECTIONS.labels(alias, 'in_use')
+
+    def _open(self):
+        connection = Database.connect(**self.conn_params)
+        DB_POOL_OPENED.labels(self.alias).inc()
+        return connection
+
+    def _is_healthy(self, connection, returned_at):
+        if connection.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_interval:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Database.Error:
+            return False
+        return True
+
+    def getconn(self):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            raise Database.OperationalError(
+                f'Пул соединений {self.alias} исчерпан'
+            )
+        DB_POOL_WAIT.labels(self.alias).observe(time.perf_counter() - start)
+        try:
+            connection = None
+            while connection is None:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    candidate, returned_at = self._idle.pop()
+                self._idle_gauge.dec()
+                if self._is_healthy(candidate, returned_at):
+                    connection = candidate
+                else:
+                    candidate.close()
+            if connection is None:
+                connection = self._open()
+        except Exception:
+            self._slots.release()
+            raise
+        self._in_use_gauge.inc()
+        return connection
+
+    def putconn(self, connection, discard=False):
+        try:
+            if not connection.closed and not discard:
+                status = connection.get_transaction_status()
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+                with self._lock:
+                    self._idle.append((connection, time.monotonic()))
+                self._idle_gauge.inc()
+            else:
+                connection.close()
+        except Database.Error:
+            connection.close()
+        finally:
+            self._in_use_gauge.dec()
+            self._slots.release()
+
+    def warm_up(self):
+        with self._lock:
+            missing = self.min_size - len(self._idle)
+        for _ in range(missing):
+            connection = self._open()
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+            self._idle_gauge.inc()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL с пулом соединений внутри процесса: close() возвращает
+    соединение в пул, поэтому CONN_MAX_AGE для этого backend должен быть 0.
+    """
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        with self._pools_lock:
+            if self.alias not in self._pools:
+                options = self.settings_dict.get('POOL', {})
+                self._pools[self.alias] = ConnectionPool(
+                    self.alias,
+                    self.get_connection_params(),
+                    min_size=options.get('MIN_SIZE', 1),
+                    max_size=options.get('MAX_SIZE', 10),
+                    timeout=options.get('TIMEOUT', 10),
+                    health_check_interval=options.get(
+                        'HEALTH_CHECK_INTERVAL', 30
+                    ),
+                )
+            return self._pools[self.alias]
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.getconn()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(
+                    self.connection, discard=self.errors_occurred
+                )
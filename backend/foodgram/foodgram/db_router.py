@@ -0,0 +1,96 @@
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+replica_reads = ContextVar('replica_reads', default=False)
+primary_writes = ContextVar('primary_writes', default=None)
+
+PIN_KEY = 'replica-pin:{}'
+
+
+def pin_to_primary(user):
+    if settings.DATABASE_REPLICAS and settings.REPLICA_PIN_SECONDS:
+        cache.set(PIN_KEY.format(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(user):
+    if not user.is_authenticated:
+        return False
+    return cache.get(PIN_KEY.format(user.pk), False)
+
+
+class ReplicaPool:
+
+    def __init__(self, aliases, check_interval):
+        self.aliases = tuple(aliases)
+        self.check_interval = check_interval
+        self._cycle = itertools.cycle(self.aliases)
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        healthy, checked_at = self._checked.get(alias, (True, None))
+        if checked_at is not None and now - checked_at < self.check_interval:
+            return healthy
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+            healthy = connection.is_usable()
+        except DatabaseError:
+            healthy = False
+        self._checked[alias] = (healthy, now)
+        return healthy
+
+    def next_alias(self):
+        for _ in range(len(self.aliases)):
+            with self._lock:
+                alias = next(self._cycle)
+            if self.is_healthy(alias):
+                return alias
+        return DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    """
+    Направляет чтение на реплики только при включенном replica_reads,
+    все остальные запросы идут в основную базу.
+    """
+
+    def __init__(self):
+        # Привязка к основной БД после записи хранится в кеше: с кешем
+        # в памяти процесса следующий запрос пользователя попал бы
+        # в другой воркер без привязки и прочитал отстающую реплику.
+        if settings.DATABASE_REPLICAS and not settings.CACHE_IS_SHARED:
+            raise ImproperlyConfigured(
+                'DB_REPLICAS требует общего для всех процессов '
+                'CACHE_BACKEND (Redis, Memcached, DatabaseCache).'
+            )
+        self.pool = ReplicaPool(
+            settings.DATABASE_REPLICAS, settings.REPLICA_HEALTH_CHECK_INTERVAL
+        )
+
+    def db_for_read(self, model, **hints):
+        if not self.pool.aliases or not replica_reads.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return self.pool.next_alias()
+
+    def db_for_write(self, model, **hints):
+        writes = primary_writes.get()
+        if writes is not None:
+            writes.add(model._meta.label)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,45 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Для запросов без фильтров на PostgreSQL берет число строк из
+    статистики pg_class вместо COUNT(*) по всей таблице.
+    """
+
+    exact_count_threshold = 10000
+
+    def is_unfiltered(self):
+        """
+        Фильтр менеджера по умолчанию (Recipe.objects скрывает рецепты,
+        помеченные на удаление) не считается: таких строк немного,
+        и оценка по таблице остается близкой.
+        """
+        query = self.object_list.query
+        if query.distinct:
+            return False
+        if not query.where:
+            return True
+        model = self.object_list.model
+        return query.where == model._default_manager.all().query.where
+
+    def estimate_count(self):
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql' or not self.is_unfiltered():
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [self.object_list.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row else None
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate_count()
+        if estimate is None or estimate < self.exact_count_threshold:
+            return super().count
+        return estimate
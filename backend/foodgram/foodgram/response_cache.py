@@ -0,0 +1,103 @@
+"""
+Кеш готовых ответов API для анонимных пользователей.
+
+Ответы хранятся по группам (tags, ingredients, recipes). В ключ входит
+версия группы: изменение данных меняет версию, и старые ответы больше
+не читаются, а истекают сами через RESPONSE_CACHE_TIMEOUT. Вместе
+с телом хранятся его сжатые варианты (foodgram.compression), поэтому
+сжатие выполняется один раз при заполнении кеша.
+
+Кеш нужен общий для всех процессов: с LocMemCache (RESPONSE_CACHE_ENABLED
+выключен) ответы не кешируются, а invalidate ничего не делает.
+"""
+import hashlib
+import uuid
+from functools import wraps
+from urllib.parse import urlencode
+
+from api.metrics import observe_cache
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+from .compression import compressed_variants
+
+VERSION_KEY = 'response_cache_version:{}'
+RESPONSE_KEY = 'response_cache:{}:{}:{}'
+
+
+def group_version(group):
+    key = VERSION_KEY.format(group)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate(*groups):
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return
+
+    def bump():
+        cache.set_many(
+            {VERSION_KEY.format(group): uuid.uuid4().hex for group in groups},
+            None
+        )
+
+    transaction.on_commit(bump)
+
+
+def response_key(group, request):
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    digest = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+    return RESPONSE_KEY.format(group, group_version(group), digest)
+
+
+def is_cacheable(request):
+    return (
+        settings.RESPONSE_CACHE_ENABLED
+        and request.method == 'GET' and request.user.is_anonymous
+        and request.accepted_renderer.format == 'json'
+    )
+
+
+def cached_response(group):
+    """Кешировать ответ метода вьюсета для анонимных GET-запросов."""
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if not is_cacheable(request):
+                return method(view, request, *args, **kwargs)
+            key = response_key(group, request)
+            cached = cache.get(key)
+            observe_cache(f'response_{group}', cached is not None)
+            if cached is not None:
+                content, content_type, variants = cached
+                response = HttpResponse(content, content_type=content_type)
+                response.compressed_variants = variants
+                return response
+            response = method(view, request, *args, **kwargs)
+
+            def store(rendered):
+                content_type = rendered['Content-Type']
+                rendered.compressed_variants = compressed_variants(
+                    rendered.content, content_type
+                )
+                cache.set(
+                    key, (
+                        rendered.content, content_type,
+                        rendered.compressed_variants
+                    ),
+                    settings.RESPONSE_CACHE_TIMEOUT
+                )
+
+            if response.status_code == 200:
+                response.add_post_render_callback(store)
+            return response
+
+        return wrapper
+
+    return decorator
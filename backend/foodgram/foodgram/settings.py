@@ -25,17 +25,21 @@ INSTALLED_APPS = [
     'django_filters',
     'recipes',
     'users',
+    'jobs',
     'api',
 ]
 
 AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -67,10 +71,72 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
     }
 }
 
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', default='True') == 'True'
+# Соединение, простаивавшее дольше стольких секунд, проверяется перед
+# запросом; остальные используются без лишнего SELECT 1.
+DB_CONN_HEALTH_CHECK_IDLE = int(
+    os.getenv('DB_CONN_HEALTH_CHECK_IDLE', default=30)
+)
+
+# Пул соединений внутри процесса (например, для ASGI): соединение
+# возвращается в пул в конце каждого запроса.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', default=0))
+if DB_POOL_SIZE and DATABASES['default']['ENGINE'].endswith('postgresql'):
+    DATABASES['default'].update({
+        'ENGINE': 'foodgram.db_pool',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', default=1)),
+            'MAX_SIZE': DB_POOL_SIZE,
+            'TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT', default=10)),
+        },
+    })
+
+# Реплики перечисляются через запятую: хосты для PostgreSQL
+# или пути к файлам для SQLite.
+DATABASE_REPLICAS = []
+_replica_key = (
+    'NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3') else 'HOST'
+)
+for _index, _replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1
+):
+    _alias = f'replica_{_index}'
+    DATABASES[_alias] = {
+        **DATABASES['default'],
+        _replica_key: _replica.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ['foodgram.db_router.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', default=5))
+REPLICA_HEALTH_CHECK_INTERVAL = int(
+    os.getenv('REPLICA_HEALTH_CHECK_INTERVAL', default=10)
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+# Общий ли кеш для всех процессов (Redis, Memcached, DatabaseCache).
+# У LocMemCache свой кеш в каждом процессе: на нем не работают привязка
+# к основной БД после записи (DB_REPLICAS) и кеш ответов.
+CACHE_IS_SHARED = not CACHES['default']['BACKEND'].endswith(
+    ('LocMemCache', 'DummyCache')
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -92,12 +158,126 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.TokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.TokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'recipe_write': os.getenv('THROTTLE_RECIPE_WRITE', default='30/hour'),
+        'shopping_cart_download': os.getenv(
+            'THROTTLE_SHOPPING_CART_DOWNLOAD', default='10/min'
+        ),
+        'ingredients_list': os.getenv(
+            'THROTTLE_INGREDIENTS_LIST', default='30/min'
+        ),
+    },
+    'NUM_PROXIES': 1,
+}
+
+# Сколько тяжелых запросов каждого скоупа может выполняться одновременно
+# (по всем воркерам, если кеш общий). Сверх лимита отвечаем 503.
+CONCURRENCY_LIMITS = {
+    'recipe_write': int(os.getenv('CONCURRENCY_RECIPE_WRITE', default=4)),
+    'shopping_cart_download': int(
+        os.getenv('CONCURRENCY_SHOPPING_CART_DOWNLOAD', default=4)
+    ),
+    'ingredients_list': int(
+        os.getenv('CONCURRENCY_INGREDIENTS_LIST', default=8)
+    ),
 }
+CONCURRENCY_RETRY_AFTER = 2
+# Через столько секунд слот освобождается сам (например, если воркер упал
+# посреди запроса); должно быть больше времени самого долгого запроса.
+CONCURRENCY_SLOT_TIMEOUT = 60
+
+# Списки рецептов и ингредиентов собираются из .values() без сериализаторов.
+FAST_LIST_RENDERING = os.getenv('FAST_LIST_RENDERING', default='True') == 'True'
+
+# Популярность рецепта: добавления в избранное и в список покупок
+# за последние POPULARITY_WINDOW_DAYS дней, вес события убывает вдвое
+# каждые POPULARITY_HALF_LIFE_HOURS часов.
+POPULARITY_WINDOW_DAYS = int(os.getenv('POPULARITY_WINDOW_DAYS', default=30))
+POPULARITY_HALF_LIFE_HOURS = float(
+    os.getenv('POPULARITY_HALF_LIFE_HOURS', default=72)
+)
+
+# Рекомендации авторов для подписки: очки за каждого, на кого подписан
+# пользователь и кто подписан на автора, и за каждый рецепт автора
+# в избранном пользователя. Хранятся SUGGESTIONS_PER_USER лучших.
+SUGGESTION_FOLLOW_WEIGHT = float(
+    os.getenv('SUGGESTION_FOLLOW_WEIGHT', default=1.0)
+)
+SUGGESTION_FAVORITE_WEIGHT = float(
+    os.getenv('SUGGESTION_FAVORITE_WEIGHT', default=0.5)
+)
+SUGGESTIONS_PER_USER = int(os.getenv('SUGGESTIONS_PER_USER', default=20))
+
+# Очередь фоновых задач в БД (команда run_worker).
+JOB_WORKER_PROCESSES = int(os.getenv('JOB_WORKER_PROCESSES', default=1))
+JOB_WORKER_THREADS = int(os.getenv('JOB_WORKER_THREADS', default=4))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', default=1))
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 10
+JOB_LOCK_TIMEOUT = 600
+
+# Счетчики фасетов списка рецептов (?facets=1): срок жизни в кеше, сек,
+# и сколько авторов с наибольшим числом рецептов возвращать.
+RECIPE_FACETS_CACHE_TIMEOUT = int(
+    os.getenv('RECIPE_FACETS_CACHE_TIMEOUT', default=60)
+)
+RECIPE_FACET_AUTHORS = 20
+
+# Кеш ответов API для анонимных пользователей (теги, ингредиенты,
+# страницы рецептов), сек. Сбрасывается при изменении данных.
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=300))
+# Кеш ответов работает только с общим кешем: с LocMemCache сброс после
+# записи в одном процессе не доходит до других, и они отдавали бы
+# устаревшие ответы.
+RESPONSE_CACHE_ENABLED = CACHE_IS_SHARED
+
+# Ответы на GET больше COMPRESSION_MIN_SIZE байт сжимаются в brotli или gzip.
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', default=1024))
+
+# Сроки хранения для команды purge_stale (0 — не удалять): строки
+# списков покупок и события журнала изменений по дате создания, токены
+# по последнему использованию или входу пользователя, загрузки по частям
+# и файлы изображений без ссылок по времени создания.
+CART_RETENTION_DAYS = int(os.getenv('CART_RETENTION_DAYS', default=90))
+TOKEN_RETENTION_DAYS = int(os.getenv('TOKEN_RETENTION_DAYS', default=180))
+CHANGE_EVENT_RETENTION_DAYS = int(
+    os.getenv('CHANGE_EVENT_RETENTION_DAYS', default=30)
+)
+IMAGE_UPLOAD_RETENTION_HOURS = 24
+ORPHANED_IMAGE_GRACE_HOURS = 24
+
+# Прогрев кешей (команда warm_caches): сколько первых страниц рецептов
+# запрашивать для каждой сортировки и прогревать ли каждый воркер
+# gunicorn при старте.
+WARM_RECIPE_PAGES = int(os.getenv('WARM_RECIPE_PAGES', default=3))
+WARM_CACHES_ON_START = (
+    os.getenv('WARM_CACHES_ON_START', default='False') == 'True'
+)
+
+# Подсказки поиска (/api/suggest/): записей в категории по умолчанию
+# и максимум, время на запрос к БД в PostgreSQL и срок жизни индекса
+# в памяти процесса для остальных БД.
+SUGGEST_LIMIT = 5
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_TIMEOUT_MS = int(os.getenv('SUGGEST_TIMEOUT_MS', default=100))
+SUGGEST_INDEX_TTL = int(os.getenv('SUGGEST_INDEX_TTL', default=60))
 
 DJOSER = {
     'LOGIN_FIELD': 'email',
@@ -140,4 +320,20 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/mediafiles/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'mediafiles')
 
+# Файлы больше FILE_UPLOAD_MAX_MEMORY_SIZE из multipart пишутся на диск
+# по частям, а не держатся в памяти воркера.
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(
+    os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', default=2621440)
+)
+# Загрузка изображений по частям (/api/uploads/).
+IMAGE_UPLOAD_DIR = os.getenv(
+    'IMAGE_UPLOAD_DIR', default=os.path.join(BASE_DIR, 'uploads')
+)
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.getenv('IMAGE_UPLOAD_MAX_SIZE', default=20 * 1024 * 1024)
+)
+IMAGE_UPLOAD_CHUNK_SIZE = int(
+    os.getenv('IMAGE_UPLOAD_CHUNK_SIZE', default=5 * 1024 * 1024)
+)
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -1,3 +1,4 @@
+from api.metrics import metrics_view
 from django.contrib import admin
 from django.urls import include, path
 
@@ -5,4 +6,5 @@ urlpatterns = [
     path('api/', include('api.urls')),
     path('api/', include('users.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
 ]
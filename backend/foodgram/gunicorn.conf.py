@@ -0,0 +1,30 @@
+import os
+import shutil
+
+bind = '0.0.0.0:8000'
+
+
+def on_starting(server):
+    metrics_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+    from foodgram.db_connections import warm_up_connections
+    if not settings.WARM_CACHES_ON_START:
+        warm_up_connections()
+        return
+    from api.warmup import warm_up
+    timings = warm_up()
+    worker.log.info('Прогрев воркера: %s', ', '.join(
+        f'{name} {seconds * 1000:.0f} мс' for name, seconds in timings
+    ))
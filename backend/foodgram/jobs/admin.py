@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'status', 'attempts', 'run_after', 'created'
+    )
+    list_filter = ('status', 'name')
+    raw_id_fields = ('user',)
+    readonly_fields = ('created', 'updated', 'locked_at')
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,74 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from jobs.queue import work
+
+
+def run_threads(threads, poll_interval, burst):
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: stop.set())
+    workers = [
+        threading.Thread(
+            target=work, args=(stop, poll_interval, burst), daemon=True
+        )
+        for _ in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        # join с таймаутом, чтобы главный поток получал сигналы.
+        while worker.is_alive():
+            worker.join(1)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Выполнять задачи из очереди в нескольких процессах и потоках'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=settings.JOB_WORKER_PROCESSES
+        )
+        parser.add_argument(
+            '--threads', type=int, default=settings.JOB_WORKER_THREADS
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.JOB_POLL_INTERVAL,
+            help='пауза при пустой очереди, сек'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='завершиться, когда очередь опустеет'
+        )
+
+    def handle(self, *args, **options):
+        worker_args = (
+            options['threads'], options['poll_interval'], options['burst']
+        )
+        if options['processes'] <= 1:
+            run_threads(*worker_args)
+            return
+        # Соединения с БД не должны переходить в дочерние процессы.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=run_threads, args=worker_args)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+
+        def stop(*args):
+            for process in processes:
+                process.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for process in processes:
+            process.join()
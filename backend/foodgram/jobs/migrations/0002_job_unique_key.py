@@ -0,0 +1,22 @@
+# Generated by Django 3.2.9 on 2026-10-19 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='unique_key',
+            field=models.CharField(blank=True, help_text='с одним ключом в очереди стоит и выполняется не больше одной задачи', max_length=100, verbose_name='Ключ уникальности'),
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'queued'), models.Q(('unique_key', ''), _negated=True)), fields=('unique_key',), name='unique_active_job'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=100)
+    unique_key = models.CharField(
+        'Ключ уникальности', max_length=100, blank=True,
+        help_text='с одним ключом в очереди стоит и выполняется не больше '
+                  'одной задачи'
+    )
+    payload = models.JSONField('Параметры', default=dict, blank=True)
+    status = models.CharField(
+        'Статус', max_length=16, choices=STATUSES, default=QUEUED
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='jobs', verbose_name='Пользователь'
+    )
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Максимум попыток', default=5)
+    run_after = models.DateTimeField('Запустить после', default=timezone.now)
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    result = models.JSONField('Результат', null=True, blank=True)
+    error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    updated = models.DateTimeField('Изменена', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=('status', 'run_after'), name='job_queue_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=('unique_key',), name='unique_active_job',
+                condition=models.Q(status='queued') & ~models.Q(
+                    unique_key=''
+                )
+            ),
+        ]
+
+    # Задача выставляет True, если сделала часть работы: тогда эта же
+    # строка снова встает в очередь, а не создается новая задача.
+    requeue = False
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}: {self.get_status_display()}'
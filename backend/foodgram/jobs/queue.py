@@ -0,0 +1,129 @@
+"""
+Очередь задач в таблице Job.
+
+Воркер забирает задачу через SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+несколько процессов и потоков не получают одну и ту же задачу и не ждут
+друг друга. Упавшая задача перезапускается с экспоненциальной задержкой,
+задача зависшего воркера снова выдается после JOB_LOCK_TIMEOUT.
+Задач с одним unique_key в очереди не больше одной (частичный
+уникальный индекс), и она не выдается, пока такая же выполняется: так
+повторные постановки не запускают параллельные цепочки и не теряются.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (DatabaseError, IntegrityError, close_old_connections,
+                       transaction)
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name):
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, payload=None, user=None, delay=0, max_attempts=None,
+            unique_key=''):
+    """Поставить задачу; с unique_key вернуть ждущую, если она уже есть."""
+    if name not in TASKS:
+        raise LookupError(f'Неизвестная задача: {name}')
+    job = Job(
+        name=name, payload=payload or {}, user=user, unique_key=unique_key,
+        run_after=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS
+    )
+    if not unique_key:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        return Job.objects.filter(
+            unique_key=unique_key, status=Job.QUEUED
+        ).first()
+    return job
+
+
+def claim_job():
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=stale,
+        attempts__gte=F('max_attempts')
+    ).update(status=Job.FAILED, error='Превышено время выполнения')
+    running_keys = Job.objects.filter(
+        status=Job.RUNNING, locked_at__gte=stale
+    ).exclude(unique_key='').values('unique_key')
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            Q(status=Job.QUEUED, run_after__lte=now)
+            & ~Q(unique_key__in=running_keys)
+            | Q(status=Job.RUNNING, locked_at__lt=stale)
+        ).order_by('run_after', 'pk').first()
+        if job is None:
+            return None
+        job.status, job.locked_at = Job.RUNNING, now
+        job.attempts += 1
+        job.save(update_fields=('status', 'locked_at', 'attempts', 'updated'))
+    return job
+
+
+def run_job(job):
+    try:
+        func = TASKS.get(job.name)
+        if func is None:
+            raise LookupError(f'Неизвестная задача: {job.name}')
+        job.result = func(job)
+    except Exception as error:
+        logger.exception('Задача %s #%s упала', job.name, job.pk)
+        job.error = f'{type(error).__name__}: {error}'
+        finished = Job.FAILED
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_after = timezone.now() + timedelta(
+                seconds=settings.JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = Job.FAILED
+    else:
+        job.status = finished = Job.DONE
+        if job.requeue:
+            job.status, job.attempts = Job.QUEUED, 0
+            job.run_after = timezone.now()
+    job.locked_at = None
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        # Такая же задача уже ждет в очереди и сделает оставшееся.
+        job.status = finished
+        job.save()
+
+
+def work(stop, poll_interval, burst=False):
+    """Цикл одного потока воркера; burst — выйти, когда очередь пуста."""
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            job = claim_job()
+        except DatabaseError:
+            logger.exception('Не удалось взять задачу из очереди')
+            stop.wait(poll_interval)
+            continue
+        if job is not None:
+            run_job(job)
+        elif burst:
+            return
+        else:
+            stop.wait(poll_interval)
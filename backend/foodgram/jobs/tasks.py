@@ -0,0 +1,42 @@
+from recipes.deletion import purge_marked
+from recipes.popularity import refresh_popularity
+from recipes.shopping_list import shopping_list_text
+from recipes.snapshots import fill_snapshots
+from recipes.suggestions import refresh_suggestions
+
+from .queue import task
+
+DELETION_BATCH_SIZE = 500
+
+
+@task('purge_deleted')
+def purge_deleted(job):
+    recipes, users = purge_marked(
+        job.payload.get('batch_size', DELETION_BATCH_SIZE)
+    )
+    # Пока есть что удалять, эта же задача снова встает в очередь.
+    job.requeue = bool(recipes or users)
+    return {'recipes': recipes, 'users': users}
+
+
+@task('refresh_popularity')
+def refresh_popularity_task(job):
+    return {'changed': refresh_popularity(job.payload.get('full', False))}
+
+
+@task('export_shopping_cart')
+def export_shopping_cart(job):
+    return {
+        'filename': 'shopping_cart.txt',
+        'text': shopping_list_text(job.user),
+    }
+
+
+@task('fill_ingredient_snapshots')
+def fill_ingredient_snapshots(job):
+    return {'saved': fill_snapshots()}
+
+
+@task('refresh_suggestions')
+def refresh_suggestions_task(job):
+    return {'saved': refresh_suggestions()}
@@ -0,0 +1,62 @@
+import threading
+
+from django.test import TestCase
+from jobs.models import Job
+from jobs.queue import claim_job, enqueue, run_job, work
+from recipes.deletion import mark_recipes_for_deletion
+from recipes.models import Recipe
+from recipes.tests.utils import create_recipe, create_user
+
+
+class QueueTests(TestCase):
+
+    def setUp(self):
+        self.author = create_user('author')
+
+    def test_unknown_task(self):
+        with self.assertRaises(LookupError):
+            enqueue('missing')
+
+    def test_unique_key_keeps_one_queued_job(self):
+        first = enqueue('purge_deleted', unique_key='purge_deleted')
+        second = enqueue('purge_deleted', unique_key='purge_deleted')
+        self.assertEqual(first, second)
+        enqueue('purge_deleted')
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_marking_does_not_start_parallel_chains(self):
+        for number in range(3):
+            recipe = create_recipe(self.author, name=f'Рецепт {number}')
+            mark_recipes_for_deletion(Recipe.objects.filter(pk=recipe.pk))
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_queued_job_waits_for_running_one(self):
+        running = enqueue('purge_deleted', unique_key='purge_deleted')
+        self.assertEqual(claim_job(), running)
+        queued = enqueue('purge_deleted', unique_key='purge_deleted')
+        self.assertNotEqual(queued, running)
+        self.assertIsNone(claim_job())
+        run_job(running)
+        self.assertEqual(claim_job(), queued)
+
+    def test_requeue_yields_to_waiting_job(self):
+        create_recipe(self.author)
+        mark_recipes_for_deletion(Recipe.objects.all())
+        running = claim_job()
+        queued = enqueue('purge_deleted', unique_key='purge_deleted')
+        run_job(running)
+        running.refresh_from_db()
+        self.assertEqual(running.status, Job.DONE)
+        self.assertEqual(running.result, {'recipes': 1, 'users': 0})
+        self.assertEqual(claim_job(), queued)
+
+    def test_chain_requeues_same_job(self):
+        for number in range(3):
+            create_recipe(self.author, name=f'Рецепт {number}')
+        mark_recipes_for_deletion(Recipe.objects.all())
+        Job.objects.update(payload={'batch_size': 1})
+        work(threading.Event(), 0, burst=True)
+        self.assertFalse(Recipe.all_objects.exists())
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.result, {'recipes': 0, 'users': 0})
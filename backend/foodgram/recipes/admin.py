@@ -1,29 +1,125 @@
 from django.contrib import admin
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from foodgram.paginators import EstimatedCountPaginator
 
-from .models import Ingredient, IngredientRecipe, Recipe, Tag
+from .deletion import mark_recipes_for_deletion
+from .models import (ChangeEvent, FavoritesList, Ingredient, IngredientRecipe,
+                     Recipe, Tag)
+from .snapshots import save_snapshots
+
+
+class DeferredDeletionMixin:
+    """
+    Удаление из админки только помечает объекты, строки удаляет
+    команда process_deletions. Страница подтверждения не собирает
+    все связанные объекты.
+    """
+
+    mark_for_deletion = None
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        return (
+            [str(obj) for obj in objs],
+            {self.model._meta.verbose_name_plural: len(objs)},
+            set(), []
+        )
+
+    def delete_model(self, request, obj):
+        self.mark_for_deletion(self.model.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        self.mark_for_deletion(queryset)
 
 
 class RecipeIngredientInline(admin.TabularInline):
     model = Recipe.ingredients.through
     extra = 1
+    autocomplete_fields = ('ingredient',)
 
 
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(DeferredDeletionMixin, admin.ModelAdmin):
     inlines = (RecipeIngredientInline,)
-    list_display = ('author', 'name')
-    list_filter = ('author', 'name', 'tags')
+    list_display = ('author', 'name', 'is_favorite')
+    list_filter = ('tags',)
+    list_select_related = ('author',)
+    search_fields = (
+        'name__startswith', 'author__email__exact', 'author__username__exact'
+    )
+    raw_id_fields = ('author',)
+    readonly_fields = ('is_favorite',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
+    mark_for_deletion = staticmethod(mark_recipes_for_deletion)
+
+    def get_queryset(self, request):
+        favorites_count = FavoritesList.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(count=Count('pk'))
+        return super().get_queryset(request).annotate(
+            favorites_count=Coalesce(
+                Subquery(favorites_count.values('count')), 0,
+                output_field=IntegerField()
+            )
+        )
 
+    @admin.display(description='В избранном', ordering='favorites_count')
     def is_favorite(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        save_snapshots([form.instance.pk])
 
 
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit')
-    list_filter = ('name',)
+    search_fields = ('name__startswith',)
+    ordering = ('name',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class IngredientRecipeAdmin(admin.ModelAdmin):
+    list_display = ('recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
+    raw_id_fields = ('recipe',)
+    autocomplete_fields = ('ingredient',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        save_snapshots([obj.recipe_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        save_snapshots([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        save_snapshots(recipe_ids)
+
+
+class ChangeEventAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'model', 'object_id', 'action', 'created')
+    list_filter = ('model', 'action')
+    search_fields = ('object_id__exact',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
+admin.site.register(ChangeEvent, ChangeEventAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Recipe, RecipeAdmin)
-admin.site.register(IngredientRecipe)
+admin.site.register(IngredientRecipe, IngredientRecipeAdmin)
 admin.site.register(Tag)
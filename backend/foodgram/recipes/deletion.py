@@ -0,0 +1,169 @@
+"""
+Отложенное удаление пользователей и рецептов.
+
+Запрос только помечает объект (deletion_requested) и скрывает его,
+а строки удаляет фоновая задача purge_deleted (или команда
+process_deletions) порциями ограниченного размера: сначала зависимые
+таблицы через DELETE ... IN без загрузки объектов в память, затем сами
+рецепты и пользователи. Удаление идет мимо сигналов post_delete, поэтому
+события журнала изменений и снятие ссылок на изображения записываются
+здесь же, одним запросом на порцию.
+"""
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from foodgram.response_cache import invalidate
+from jobs.queue import enqueue
+
+from .models import ChangeEvent, Recipe, SearchEntry
+from .outbox import TRACKED_MODELS, make_event, record_many
+from .search import unindex_objects
+from .signals import remove_image_references
+
+User = get_user_model()
+
+
+def record_recipe_deletions(recipe_ids):
+    record_many([
+        make_event(Recipe, recipe_id, ChangeEvent.DELETE)
+        for recipe_id in recipe_ids
+    ])
+
+
+def mark_recipes_for_deletion(queryset):
+    with transaction.atomic():
+        recipe_ids = list(queryset.filter(
+            deletion_requested__isnull=True
+        ).values_list('id', flat=True))
+        Recipe.objects.filter(id__in=recipe_ids).update(
+            deletion_requested=timezone.now()
+        )
+        if recipe_ids:
+            unindex_objects(SearchEntry.RECIPE, recipe_ids)
+            record_recipe_deletions(recipe_ids)
+            invalidate('recipes')
+            enqueue('purge_deleted', unique_key='purge_deleted')
+    return len(recipe_ids)
+
+
+def mark_users_for_deletion(queryset):
+    now = timezone.now()
+    with transaction.atomic():
+        user_ids = list(queryset.filter(
+            deletion_requested__isnull=True
+        ).values_list('id', flat=True))
+        User.objects.filter(id__in=user_ids).update(
+            deletion_requested=now, is_active=False
+        )
+        recipe_ids = list(Recipe.objects.filter(
+            author_id__in=user_ids
+        ).values_list('id', flat=True))
+        Recipe.objects.filter(id__in=recipe_ids).update(
+            deletion_requested=now
+        )
+        if user_ids:
+            unindex_objects(SearchEntry.AUTHOR, user_ids)
+            unindex_objects(SearchEntry.RECIPE, recipe_ids)
+            record_recipe_deletions(recipe_ids)
+            invalidate('recipes')
+            enqueue('purge_deleted', unique_key='purge_deleted')
+    return len(user_ids)
+
+
+def cascade_relations(model, exclude=()):
+    """Обратные связи с on_delete=CASCADE, включая скрытые таблицы M2M."""
+    return [
+        (relation.related_model, relation.field.name)
+        for relation in model._meta.get_fields(include_hidden=True)
+        if relation.auto_created and not relation.concrete
+        and (relation.one_to_many or relation.one_to_one)
+        and relation.on_delete is models.CASCADE
+        and relation.related_model not in exclude
+    ]
+
+
+def raw_delete(queryset):
+    """DELETE одним запросом: без загрузки объектов, каскада и сигналов."""
+    return queryset._raw_delete(queryset.db)
+
+
+def delete_in_batches(queryset, batch_size, pause=0):
+    model = queryset.model
+    manager = model._base_manager
+    fields = TRACKED_MODELS.get(model, (None, ()))[1]
+    columns = [f'{field}_id' for field in fields]
+    deleted = 0
+    while True:
+        rows = list(queryset.values_list('pk', *columns)[:batch_size])
+        if not rows:
+            return deleted
+        with transaction.atomic(using=manager.db):
+            deleted += raw_delete(manager.filter(pk__in=[
+                row[0] for row in rows
+            ]))
+            if model in TRACKED_MODELS:
+                record_many([
+                    make_event(
+                        model, pk, ChangeEvent.DELETE, dict(zip(fields, ids))
+                    ) for pk, *ids in rows
+                ])
+        if pause:
+            time.sleep(pause)
+
+
+def delete_related(model, ids, batch_size, pause=0, exclude=()):
+    deleted = 0
+    for related_model, field_name in cascade_relations(model, exclude):
+        deleted += delete_in_batches(
+            related_model._base_manager.filter(**{f'{field_name}__in': ids}),
+            batch_size, pause
+        )
+    return deleted
+
+
+def purge_recipes(batch_size, pause=0):
+    recipe_ids = list(Recipe.all_objects.filter(
+        deletion_requested__isnull=False
+    ).order_by('deletion_requested').values_list('id', flat=True)[
+        :batch_size
+    ])
+    if not recipe_ids:
+        return 0
+    delete_related(Recipe, recipe_ids, batch_size, pause)
+    # События удаления рецептов записаны при пометке, поисковые записи
+    # тогда же удалены; остается снять ссылки на файлы изображений.
+    with transaction.atomic():
+        recipes = Recipe.all_objects.filter(id__in=recipe_ids)
+        images = Counter(recipes.exclude(image='').values_list(
+            'image', flat=True
+        ))
+        raw_delete(recipes)
+        remove_image_references(images)
+    return len(recipe_ids)
+
+
+def purge_users(batch_size, pause=0):
+    user_ids = list(User.objects.filter(
+        deletion_requested__isnull=False
+    ).exclude(
+        Exists(Recipe.all_objects.filter(author=OuterRef('pk')))
+    ).order_by('deletion_requested').values_list('id', flat=True)[
+        :batch_size
+    ])
+    if not user_ids:
+        return 0
+    delete_related(User, user_ids, batch_size, pause, exclude=(Recipe,))
+    raw_delete(User.objects.filter(id__in=user_ids))
+    return len(user_ids)
+
+
+def purge_marked(batch_size, pause=0):
+    """Одна порция: не более batch_size рецептов и пользователей."""
+    return (
+        purge_recipes(batch_size, pause),
+        purge_users(batch_size, pause),
+    )
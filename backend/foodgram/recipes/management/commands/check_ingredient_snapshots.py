@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from recipes.snapshots import find_stale_snapshots, save_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить снимки ингредиентов рецептов с таблицей '
+        'ингредиентов рецепта'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='пересобрать расходящиеся снимки'
+        )
+
+    def handle(self, *args, **options):
+        stale = list(find_stale_snapshots(options['batch_size']))
+        for recipe_id in stale:
+            self.stdout.write(f'Снимок рецепта {recipe_id} устарел')
+        if not stale:
+            self.stdout.write('Снимки совпадают с таблицей')
+            return
+        if not options['fix']:
+            raise CommandError(f'Устаревших снимков: {len(stale)}')
+        batch_size = options['batch_size']
+        for start in range(0, len(stale), batch_size):
+            save_snapshots(stale[start:start + batch_size])
+        self.stdout.write(f'Пересобрано снимков: {len(stale)}')
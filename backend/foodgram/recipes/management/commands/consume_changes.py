@@ -0,0 +1,66 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.outbox import consume, read_changes
+
+
+class Command(BaseCommand):
+    help = (
+        'Вывести события журнала изменений в формате JSON Lines '
+        'после позиции потребителя и сдвинуть ее'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--consumer',
+            help='имя потребителя, позиция которого хранится в БД'
+        )
+        parser.add_argument(
+            '--after', type=int, default=0,
+            help='без --consumer: вывести события после этого id'
+        )
+        parser.add_argument(
+            '--after-txid', type=int, default=0,
+            help='PostgreSQL: txid события --after'
+        )
+        parser.add_argument('--limit', type=int, default=500)
+        parser.add_argument(
+            '--follow', action='store_true',
+            help='ждать новых событий, опрашивая журнал каждые --interval с'
+        )
+        parser.add_argument('--interval', type=float, default=1)
+
+    def write_events(self, events):
+        for event in events:
+            self.stdout.write(json.dumps({
+                'id': event.pk,
+                'model': event.model,
+                'object_id': event.object_id,
+                'action': event.action,
+                'data': event.data,
+                'created': event.created.isoformat(),
+                'txid': getattr(event, 'txid', None),
+            }, ensure_ascii=False))
+
+    def read_batch(self, options, after):
+        """Вывести порцию, вернуть ее размер и позицию (id, txid)."""
+        if options['consumer']:
+            return consume(
+                options['consumer'], self.write_events, options['limit']
+            ), after
+        events = read_changes(after[0], options['limit'], after[1])
+        self.write_events(events)
+        if not events:
+            return 0, after
+        return len(events), (events[-1].pk, getattr(events[-1], 'txid', 0))
+
+    def handle(self, *args, **options):
+        after = (options['after'], options['after_txid'])
+        while True:
+            count, after = self.read_batch(options, after)
+            if count == options['limit']:
+                continue
+            if not options['follow']:
+                return
+            time.sleep(options['interval'])
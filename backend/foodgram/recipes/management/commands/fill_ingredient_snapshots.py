@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from recipes.snapshots import fill_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Записать снимки ингредиентов рецептам, у которых их нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='пересобрать снимки всех рецептов'
+        )
+
+    def handle(self, *args, **options):
+        saved = fill_snapshots(options['batch_size'], options['rebuild'])
+        self.stdout.write(f'Записано снимков: {saved}')
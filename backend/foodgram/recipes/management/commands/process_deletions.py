@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.deletion import purge_marked
+
+
+class Command(BaseCommand):
+    help = (
+        'Удалить помеченные на удаление рецепты и пользователей '
+        'порциями ограниченного размера'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--pause', type=float, default=0.1,
+            help='пауза между порциями в секундах'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='работать постоянно, проверяя очередь каждые --interval с'
+        )
+        parser.add_argument('--interval', type=float, default=30)
+
+    def handle(self, *args, **options):
+        batch_size, pause = options['batch_size'], options['pause']
+        while True:
+            recipes = users = 0
+            while True:
+                batch = purge_marked(batch_size, pause)
+                if not any(batch):
+                    break
+                recipes, users = recipes + batch[0], users + batch[1]
+                time.sleep(pause)
+            if recipes or users:
+                self.stdout.write(
+                    f'Удалено рецептов: {recipes}, пользователей: {users}'
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.retention import purge_stale
+
+
+class Command(BaseCommand):
+    help = (
+        'Удалить устаревшие строки списков покупок, токены, загрузки, '
+        'файлы изображений без ссылок и старые события журнала изменений'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--pause', type=float, default=0.1,
+            help='пауза между порциями в секундах'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='повторять очистку каждые --interval с'
+        )
+        parser.add_argument('--interval', type=float, default=3600)
+
+    def handle(self, *args, **options):
+        while True:
+            for name, count in purge_stale(
+                options['batch_size'], options['pause']
+            ):
+                self.stdout.write(f'Удалено {name}: {count}')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from recipes.models import Recipe, StoredImage
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать ссылки рецептов на файлы изображений'
+
+    def handle(self, *args, **options):
+        counts = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).order_by().values('image').annotate(references=Count('id'))
+        with transaction.atomic():
+            StoredImage.objects.all().delete()
+            StoredImage.objects.bulk_create(
+                StoredImage(name=row['image'], references=row['references'])
+                for row in counts
+            )
+        self.stdout.write(f'Учтено файлов: {StoredImage.objects.count()}')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from recipes.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново заполнить индекс подсказок поиска по рецептам, '
+        'ингредиентам и авторам'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = rebuild_index(options['batch_size'])
+        self.stdout.write(f'Записей в индексе: {count}')
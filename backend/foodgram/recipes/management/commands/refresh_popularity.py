@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.popularity import refresh_popularity
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитать рейтинг популярности рецептов по избранному '
+        'и спискам покупок за скользящее окно'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='перенести опорный момент и пересчитать все рецепты'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='пересчитывать постоянно каждые --interval с'
+        )
+        parser.add_argument('--interval', type=float, default=300)
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            changed = refresh_popularity(full, options['batch_size'])
+            self.stdout.write(f'Обновлено рецептов: {changed}')
+            if not options['loop']:
+                return
+            full = False
+            time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.suggestions import refresh_suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитать рекомендации авторов для подписки по подпискам '
+        'и избранному пользователей'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='пересчитывать постоянно каждые --interval с'
+        )
+        parser.add_argument('--interval', type=float, default=3600)
+
+    def handle(self, *args, **options):
+        while True:
+            saved = refresh_suggestions(options['batch_size'])
+            self.stdout.write(f'Сохранено рекомендаций: {saved}')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
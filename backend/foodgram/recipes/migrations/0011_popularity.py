@@ -0,0 +1,46 @@
+# Generated by Django 3.2.9 on 2026-10-19 12:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_deletion_requested'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularityState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anchor', models.DateTimeField(verbose_name='Опорный момент')),
+                ('refreshed_at', models.DateTimeField(verbose_name='Последний пересчет')),
+            ],
+            options={
+                'verbose_name': 'Состояние рейтинга популярности',
+                'verbose_name_plural': 'Состояние рейтинга популярности',
+            },
+        ),
+        migrations.AddField(
+            model_name='favoriteslist',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность'),
+        ),
+        migrations.AlterField(
+            model_name='shoppinglist',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата добавления'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-popularity', '-pub_date'], name='recipe_popularity_idx'),
+        ),
+    ]
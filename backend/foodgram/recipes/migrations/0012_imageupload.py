@@ -0,0 +1,32 @@
+# Generated by Django 3.2.9 on 2026-10-19 13:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0011_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=100, verbose_name='Имя файла')),
+                ('size', models.PositiveIntegerField(verbose_name='Размер файла')),
+                ('offset', models.PositiveIntegerField(default=0, verbose_name='Загружено байт')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Начало загрузки')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_uploads', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Загрузка изображения',
+                'verbose_name_plural': 'Загрузки изображений',
+            },
+        ),
+    ]
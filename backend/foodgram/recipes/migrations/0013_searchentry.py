@@ -0,0 +1,79 @@
+from django.db import migrations, models
+
+
+def normalize(text):
+    return ' '.join(text.lower().replace('ё', 'е').split())
+
+
+def fill_index(apps, schema_editor):
+    SearchEntry = apps.get_model('recipes', 'SearchEntry')
+    User = apps.get_model('users', 'User')
+    sources = (
+        ('recipe', apps.get_model('recipes', 'Recipe').objects.filter(
+            deletion_requested__isnull=True
+        ), 'name'),
+        ('ingredient', apps.get_model('recipes', 'Ingredient').objects.all(),
+         'name'),
+        ('author', User.objects.filter(
+            is_active=True, deletion_requested__isnull=True
+        ), 'username'),
+    )
+    for category, queryset, field in sources:
+        SearchEntry.objects.bulk_create(
+            (
+                SearchEntry(
+                    category=category, object_id=object_id, label=label,
+                    normalized=normalize(label)
+                )
+                for object_id, label in queryset.values_list(
+                    'id', field
+                ).iterator()
+            ),
+            batch_size=1000
+        )
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS search_entry_trgm_idx '
+        'ON recipes_searchentry USING gin (normalized gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS search_entry_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_deletion_requested'),
+        ('recipes', '0012_imageupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('recipe', 'Рецепт'), ('ingredient', 'Ингредиент'), ('author', 'Автор')], max_length=16, verbose_name='Категория')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='id объекта')),
+                ('label', models.CharField(max_length=256, verbose_name='Текст')),
+                ('normalized', models.CharField(db_index=True, max_length=256, verbose_name='Текст для поиска')),
+            ],
+            options={
+                'verbose_name': 'Запись поискового индекса',
+                'verbose_name_plural': 'Поисковый индекс',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchentry',
+            constraint=models.UniqueConstraint(fields=('category', 'object_id'), name='unique_search_entry'),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(fill_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_searchentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients_snapshot',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Снимок ингредиентов'),
+        ),
+    ]
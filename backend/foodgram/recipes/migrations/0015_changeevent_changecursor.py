@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_recipe_ingredients_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=32, verbose_name='Модель')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='id объекта')),
+                ('action', models.CharField(choices=[('create', 'Создание'), ('update', 'Изменение'), ('delete', 'Удаление')], max_length=8, verbose_name='Действие')),
+                ('data', models.JSONField(blank=True, default=dict, verbose_name='Связанные объекты')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Время')),
+            ],
+            options={
+                'verbose_name': 'Событие изменения',
+                'verbose_name_plural': 'Журнал изменений',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ChangeCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consumer', models.CharField(max_length=64, unique=True, verbose_name='Потребитель')),
+                ('position', models.PositiveBigIntegerField(default=0, verbose_name='Последнее событие')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Обновлен')),
+            ],
+            options={
+                'verbose_name': 'Позиция потребителя журнала',
+                'verbose_name_plural': 'Позиции потребителей журнала',
+            },
+        ),
+    ]
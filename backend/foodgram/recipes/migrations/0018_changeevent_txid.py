@@ -0,0 +1,45 @@
+# Generated by Django 3.2.9 on 2026-10-19 21:40
+
+from django.db import migrations, models
+
+
+def add_txid_column(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Столбца нет в модели: ORM не передает его в INSERT, и значение
+    # всегда берется из DEFAULT, в том числе для bulk_create и raw SQL.
+    schema_editor.execute(
+        'ALTER TABLE recipes_changeevent '
+        'ADD COLUMN txid bigint NOT NULL DEFAULT txid_current()'
+    )
+    schema_editor.execute(
+        'CREATE INDEX change_event_txid_idx ON recipes_changeevent (txid, id)'
+    )
+    # Существующие события получили txid этой миграции; позиции
+    # потребителей переносятся в него, чтобы события не читались повторно.
+    schema_editor.execute(
+        'UPDATE recipes_changecursor SET txid = txid_current()'
+    )
+
+
+def drop_txid_column(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE recipes_changeevent DROP COLUMN txid'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_followsuggestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='changecursor',
+            name='txid',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='Транзакция последнего события'),
+        ),
+        migrations.RunPython(add_txid_column, drop_txid_column),
+    ]
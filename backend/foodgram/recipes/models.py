@@ -1,11 +1,15 @@
+import uuid
+
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
 class Ingredient(models.Model):
-    name = models.CharField('Название', max_length=256)
+    name = models.CharField('Название', max_length=256, db_index=True)
     measurement_unit = models.CharField('Единица измерения', max_length=64)
 
     class Meta:
@@ -29,15 +33,23 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(deletion_requested__isnull=True)
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='recipes',
         verbose_name='Автор'
     )
-    name = models.CharField('Название', max_length=200)
+    name = models.CharField('Название', max_length=200, db_index=True)
     text = models.TextField('Описание рецепта')
     cooking_time = models.PositiveIntegerField('Время приготовления в мин')
-    image = models.ImageField('Фото рецепта', upload_to='recipes/images/')
+    image = models.ImageField(
+        'Фото рецепта', upload_to='recipes/images/',
+        storage=ContentAddressedStorage()
+    )
     ingredients = models.ManyToManyField(
         Ingredient, through='IngredientRecipe',
         verbose_name='Ингредиенты'
@@ -46,11 +58,45 @@ class Recipe(models.Model):
         Tag, verbose_name='Теги', related_name='recipes'
     )
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    deletion_requested = models.DateTimeField(
+        'Удаление запрошено', null=True, blank=True, editable=False,
+        db_index=True
+    )
+    popularity = models.FloatField(
+        'Популярность', default=0, editable=False
+    )
+    ingredients_snapshot = models.JSONField(
+        'Снимок ингредиентов', null=True, blank=True, editable=False
+    )
+
+    objects = RecipeManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'), name='recipe_pub_date_idx'
+            ),
+            models.Index(
+                fields=('-popularity', '-pub_date', '-id'),
+                name='recipe_popularity_idx'
+            ),
+            models.Index(
+                fields=('cooking_time', '-pub_date', '-id'),
+                name='recipe_cooking_time_idx'
+            ),
+            models.Index(
+                fields=('author', 'cooking_time'),
+                name='recipe_author_cooking_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -118,6 +164,9 @@ class FavoritesList(models.Model):
         User, on_delete=models.CASCADE, related_name='favorites',
         verbose_name='Пользователь'
     )
+    created = models.DateTimeField(
+        'Дата добавления', auto_now_add=True, db_index=True
+    )
 
     class Meta:
         verbose_name = 'Избранное'
@@ -141,7 +190,9 @@ class ShoppingList(models.Model):
         User, on_delete=models.CASCADE, related_name='shopping_cart',
         verbose_name='Пользователь'
     )
-    created = models.DateTimeField('Дата добавления', auto_now_add=True)
+    created = models.DateTimeField(
+        'Дата добавления', auto_now_add=True, db_index=True
+    )
 
     class Meta:
         constraints = [
@@ -155,3 +206,167 @@ class ShoppingList(models.Model):
 
     def __str__(self):
         return f'Список покупок: {self.recipe}'
+
+
+class FollowSuggestion(models.Model):
+    """
+    Автор, на которого стоит подписаться, с очками из recipes.suggestions.
+    Пересчитывается периодически, endpoint только читает по индексу.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='follow_suggestions',
+        verbose_name='Пользователь'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='suggested_to',
+        verbose_name='Автор'
+    )
+    score = models.FloatField('Очки')
+    followed_by = models.PositiveIntegerField(
+        'Подписаны из подписок пользователя'
+    )
+    favorited_recipes = models.PositiveIntegerField(
+        'Рецептов автора в избранном пользователя'
+    )
+
+    class Meta:
+        verbose_name = 'Рекомендация автора'
+        verbose_name_plural = 'Рекомендации авторов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow_suggestion'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-score'), name='follow_suggestion_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.author} для {self.user}'
+
+
+class PopularityState(models.Model):
+    """
+    Очки популярности хранятся относительно опорного момента anchor
+    и поэтому не требуют пересчета со временем: затухание одинаково
+    для всех рецептов и не меняет их порядок.
+    """
+
+    anchor = models.DateTimeField('Опорный момент')
+    refreshed_at = models.DateTimeField('Последний пересчет')
+
+    class Meta:
+        verbose_name = 'Состояние рейтинга популярности'
+        verbose_name_plural = 'Состояние рейтинга популярности'
+
+    def __str__(self):
+        return f'Пересчет от {self.refreshed_at}'
+
+
+class ImageUpload(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='image_uploads',
+        verbose_name='Пользователь'
+    )
+    filename = models.CharField('Имя файла', max_length=100)
+    size = models.PositiveIntegerField('Размер файла')
+    offset = models.PositiveIntegerField('Загружено байт', default=0)
+    created = models.DateTimeField('Начало загрузки', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Загрузка изображения'
+        verbose_name_plural = 'Загрузки изображений'
+
+    def __str__(self):
+        return f'{self.filename}: {self.offset} из {self.size} байт'
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
+
+
+class SearchEntry(models.Model):
+    RECIPE = 'recipe'
+    INGREDIENT = 'ingredient'
+    AUTHOR = 'author'
+    CATEGORIES = (
+        (RECIPE, 'Рецепт'),
+        (INGREDIENT, 'Ингредиент'),
+        (AUTHOR, 'Автор'),
+    )
+
+    category = models.CharField('Категория', max_length=16, choices=CATEGORIES)
+    object_id = models.PositiveBigIntegerField('id объекта')
+    label = models.CharField('Текст', max_length=256)
+    normalized = models.CharField(
+        'Текст для поиска', max_length=256, db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Запись поискового индекса'
+        verbose_name_plural = 'Поисковый индекс'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('category', 'object_id'), name='unique_search_entry'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.get_category_display()}: {self.label}'
+
+
+class StoredImage(models.Model):
+    name = models.CharField('Путь к файлу', max_length=100, unique=True)
+    references = models.IntegerField('Количество ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл изображения'
+        verbose_name_plural = 'Файлы изображений'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
+
+
+class ChangeEvent(models.Model):
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    ACTIONS = (
+        (CREATE, 'Создание'),
+        (UPDATE, 'Изменение'),
+        (DELETE, 'Удаление'),
+    )
+
+    model = models.CharField('Модель', max_length=32)
+    object_id = models.PositiveBigIntegerField('id объекта')
+    action = models.CharField('Действие', max_length=8, choices=ACTIONS)
+    data = models.JSONField('Связанные объекты', default=dict, blank=True)
+    created = models.DateTimeField('Время', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Событие изменения'
+        verbose_name_plural = 'Журнал изменений'
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'#{self.pk} {self.model} {self.object_id}: {self.action}'
+
+
+class ChangeCursor(models.Model):
+    consumer = models.CharField('Потребитель', max_length=64, unique=True)
+    position = models.PositiveBigIntegerField('Последнее событие', default=0)
+    txid = models.PositiveBigIntegerField(
+        'Транзакция последнего события', default=0
+    )
+    updated = models.DateTimeField('Обновлен', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Позиция потребителя журнала'
+        verbose_name_plural = 'Позиции потребителей журнала'
+
+    def __str__(self):
+        return f'{self.consumer}: {self.position}'
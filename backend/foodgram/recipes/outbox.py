@@ -0,0 +1,124 @@
+"""
+Журнал изменений (outbox) рецептов, тегов, ингредиентов, избранного,
+списков покупок и подписок.
+
+Событие пишется в той же транзакции, что и изменение: сигналами для
+сохранения и удаления через ORM и явно там, где запись идет мимо
+сигналов (raw SQL в relations, queryset.update в deletion). Событие
+компактное — модель, id, действие и id связанных объектов; потребитель
+сам читает актуальное состояние.
+
+Id выдаются до фиксации транзакции, поэтому событие с меньшим id может
+стать видимым позже большего. В PostgreSQL у события есть столбец txid
+(номер транзакции, DEFAULT txid_current()), и потребитель читает события
+по возрастанию (txid, id) только из транзакций с номером меньше xmin
+текущего снимка: все они уже завершены, и событие с меньшей позицией
+появиться не может. Долгая транзакция задерживает доставку, но события
+не теряются. Позиция потребителя — пара (txid, id). В SQLite запись
+сериализована, id видны в порядке фиксации, и позиция — id события.
+События доставляются хотя бы один раз, обработчики должны быть
+идемпотентными.
+"""
+from django.db import connections, router, transaction
+from django.db.models import BigIntegerField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import (ChangeCursor, ChangeEvent, FavoritesList, Follow,
+                     Ingredient, IngredientRecipe, Recipe, ShoppingList, Tag)
+
+# Модель: (имя в журнале, поля со связанными объектами).
+TRACKED_MODELS = {
+    Recipe: ('recipe', ('author',)),
+    IngredientRecipe: ('ingredient_recipe', ('recipe', 'ingredient')),
+    Tag: ('tag', ()),
+    Ingredient: ('ingredient', ()),
+    FavoritesList: ('favorite', ('user', 'recipe')),
+    ShoppingList: ('shopping_cart', ('user', 'recipe')),
+    Follow: ('follow', ('user', 'author')),
+}
+
+
+def make_event(model, object_id, action, data=None):
+    return ChangeEvent(
+        model=TRACKED_MODELS[model][0], object_id=object_id, action=action,
+        data=data or {}
+    )
+
+
+def instance_event(instance, action):
+    _, fields = TRACKED_MODELS[type(instance)]
+    return make_event(
+        type(instance), instance.pk, action,
+        {field: getattr(instance, f'{field}_id') for field in fields}
+    )
+
+
+def record(instance, action):
+    instance_event(instance, action).save()
+
+
+def record_many(events):
+    ChangeEvent.objects.bulk_create(events)
+
+
+def has_txid():
+    alias = router.db_for_read(ChangeEvent)
+    return connections[alias].vendor == 'postgresql'
+
+
+def with_txid(events):
+    return events.annotate(txid=RawSQL(
+        'recipes_changeevent.txid', (), output_field=BigIntegerField()
+    ))
+
+
+def read_changes(after=0, limit=500, after_txid=0):
+    """
+    События после позиции (after_txid, after); в PostgreSQL у событий
+    есть атрибут txid.
+    """
+    events = ChangeEvent.objects.all()
+    if not has_txid():
+        return list(events.filter(pk__gt=after).order_by('pk')[:limit])
+    return list(with_txid(events).filter(
+        Q(txid__gt=after_txid) | Q(txid=after_txid, pk__gt=after),
+        txid__lt=RawSQL('txid_snapshot_xmin(txid_current_snapshot())', ())
+    ).order_by('txid', 'pk')[:limit])
+
+
+def slowest_consumer():
+    return ChangeCursor.objects.order_by('txid', 'position').first()
+
+
+def read_by_all_consumers():
+    """События, которые прочитали все потребители с позицией в БД."""
+    events = ChangeEvent.objects.all()
+    slowest = slowest_consumer()
+    if slowest is None:
+        return events
+    if not has_txid():
+        return events.filter(pk__lte=slowest.position)
+    return with_txid(events).filter(
+        Q(txid__lt=slowest.txid)
+        | Q(txid=slowest.txid, pk__lte=slowest.position)
+    )
+
+
+def consume(consumer, handler, limit=500):
+    """
+    Передать handler очередную порцию событий потребителя и сдвинуть
+    его позицию. Позиция сохраняется только если handler не упал.
+    Вернуть количество обработанных событий.
+    """
+    with transaction.atomic():
+        cursor, _ = ChangeCursor.objects.select_for_update().get_or_create(
+            consumer=consumer
+        )
+        events = read_changes(cursor.position, limit, cursor.txid)
+        if not events:
+            return 0
+        handler(events)
+        cursor.position = events[-1].pk
+        cursor.txid = getattr(events[-1], 'txid', 0)
+        cursor.save(update_fields=('position', 'txid', 'updated'))
+    return len(events)
@@ -0,0 +1,129 @@
+"""
+Рейтинг популярности рецептов для ordering=popular.
+
+Каждое добавление в избранное или в список покупок за последние
+POPULARITY_WINDOW_DAYS дней дает рецепту 2 ** ((created - anchor) / T)
+очков, где T — период полураспада. Настоящий затухший рейтинг отличается
+от этого числа общим для всех рецептов множителем 2 ** ((anchor - now) / T),
+поэтому порядок рецептов совпадает, а очки меняются только у рецептов
+с новыми, удаленными или вышедшими из окна событиями. Обычный пересчет
+находит такие рецепты по событиям после прошлого пересчета, вышедшим
+из окна с тех пор событиям и удалениям из журнала изменений, и считает
+очки только для них; --full пересчитывает все рецепты.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from foodgram.response_cache import invalidate
+
+from .models import (ChangeEvent, FavoritesList, PopularityState, Recipe,
+                     ShoppingList)
+
+EVENT_WEIGHTS = ((FavoritesList, 1.0), (ShoppingList, 1.0))
+# Имена тех же событий в журнале изменений.
+EVENT_NAMES = ('favorite', 'shopping_cart')
+# Строка могла получить created раньше прошлого пересчета, а стать видимой
+# позже: такие события тоже попадают в следующий пересчет. Очки рецепта
+# считаются заново целиком, поэтому повторный просмотр ничего не удваивает.
+REFRESH_OVERLAP = timedelta(minutes=10)
+# Сколько id рецептов передавать в одном IN.
+ID_BATCH_SIZE = 500
+# Когда показатель степени подходит к пределам float, опорный момент
+# переносится на текущее время и рейтинг пересчитывается целиком.
+MAX_EXPONENT = 512
+
+
+def id_batches(recipe_ids):
+    recipe_ids = sorted(recipe_ids)
+    for start in range(0, len(recipe_ids), ID_BATCH_SIZE):
+        yield recipe_ids[start:start + ID_BATCH_SIZE]
+
+
+def compute_scores(since, anchor, half_life, recipe_ids=None):
+    """Очки всех рецептов или только recipe_ids."""
+    scores = defaultdict(float)
+    batches = [None] if recipe_ids is None else id_batches(recipe_ids)
+    for batch in batches:
+        for model, weight in EVENT_WEIGHTS:
+            events = model.objects.filter(created__gte=since)
+            if batch is not None:
+                events = events.filter(recipe_id__in=batch)
+            events = events.values_list('recipe_id', 'created')
+            for recipe_id, created in events.iterator(chunk_size=2000):
+                exponent = (created - anchor).total_seconds() / half_life
+                scores[recipe_id] += weight * 2 ** exponent
+    return scores
+
+
+def changed_recipes(since, now, window):
+    """
+    Рецепты, у которых после since появились или удалены события
+    или события вышли из окна.
+    """
+    recipe_ids = set()
+    for model, _ in EVENT_WEIGHTS:
+        recipe_ids.update(model.objects.filter(
+            Q(created__gte=since)
+            | Q(created__gte=since - window, created__lt=now - window)
+        ).values_list('recipe_id', flat=True).distinct())
+    recipe_ids.update(ChangeEvent.objects.filter(
+        model__in=EVENT_NAMES, action=ChangeEvent.DELETE, created__gte=since
+    ).values_list('data__recipe', flat=True))
+    recipe_ids.discard(None)
+    return recipe_ids
+
+
+def current_scores(recipe_ids=None):
+    if recipe_ids is None:
+        return dict(Recipe.all_objects.exclude(popularity=0).values_list(
+            'id', 'popularity'
+        ))
+    current = {}
+    for batch in id_batches(recipe_ids):
+        current.update(Recipe.all_objects.filter(id__in=batch).values_list(
+            'id', 'popularity'
+        ))
+    return current
+
+
+def refresh_popularity(full=False, batch_size=1000):
+    """Пересчитать очки, записывая только изменившиеся строки."""
+    now = timezone.now()
+    window = timedelta(days=settings.POPULARITY_WINDOW_DAYS)
+    half_life = settings.POPULARITY_HALF_LIFE_HOURS * 3600
+    state = PopularityState.objects.first()
+    if state is None:
+        state = PopularityState(anchor=now)
+        full = True
+    if full or (now - state.anchor).total_seconds() / half_life > MAX_EXPONENT:
+        state.anchor = now
+        full = True
+    recipe_ids = None
+    if not full:
+        recipe_ids = changed_recipes(
+            state.refreshed_at - REFRESH_OVERLAP, now, window
+        )
+    current = current_scores(recipe_ids)
+    scores = compute_scores(now - window, state.anchor, half_life, recipe_ids)
+    changed = [
+        Recipe(id=recipe_id, popularity=scores.get(recipe_id, 0.0))
+        for recipe_id in current.keys() | scores.keys()
+        if not math.isclose(
+            current.get(recipe_id, 0.0), scores.get(recipe_id, 0.0),
+            rel_tol=1e-9
+        )
+    ]
+    with transaction.atomic():
+        Recipe.all_objects.bulk_update(
+            changed, ['popularity'], batch_size=batch_size
+        )
+        state.refreshed_at = now
+        state.save()
+        if changed:
+            invalidate('recipes')
+    return len(changed)
@@ -0,0 +1,83 @@
+"""
+Добавление и удаление связей пользователя (избранное, список покупок,
+подписки) одним запросом к БД.
+
+INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING поддерживают
+PostgreSQL и SQLite 3.35+. Повторное добавление не падает на уникальном
+ограничении, а одновременные запросы не создают дублей. Запросы идут
+мимо сигналов, поэтому событие журнала изменений пишется здесь же,
+в той же транзакции.
+"""
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .models import ChangeEvent
+from .outbox import make_event
+
+
+def add_relation(model, user_id, field_name, target_id):
+    """
+    Вернуть True, если связь создана, и False, если она уже была
+    или объект field_name не существует (или помечен на удаление).
+    """
+    field = model._meta.get_field(field_name)
+    target = field.related_model._meta
+    alias = router.db_for_write(model)
+    quote = connections[alias].ops.quote_name
+    columns = [model._meta.get_field('user').column, field.column]
+    values = ['%s', quote(target.pk.column)]
+    params = [user_id]
+    if any(f.name == 'created' for f in model._meta.concrete_fields):
+        columns.append(model._meta.get_field('created').column)
+        values.append('%s')
+        params.append(timezone.now())
+    where = f'{quote(target.pk.column)} = %s'
+    params.append(target_id)
+    if any(f.name == 'deletion_requested' for f in target.concrete_fields):
+        where += f' AND {quote("deletion_requested")} IS NULL'
+    sql = (
+        f'INSERT INTO {quote(model._meta.db_table)} '
+        f'({", ".join(map(quote, columns))}) '
+        f'SELECT {", ".join(values)} FROM {quote(target.db_table)} '
+        f'WHERE {where} '
+        f'ON CONFLICT DO NOTHING RETURNING {quote(model._meta.pk.column)}'
+    )
+    with transaction.atomic(using=alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        if row is not None:
+            record_relation(
+                model, row[0], ChangeEvent.CREATE, user_id, field_name,
+                target_id, alias
+            )
+    return row is not None
+
+
+def remove_relation(model, user_id, field_name, target_id):
+    """Вернуть True, если связь была и удалена."""
+    alias = router.db_for_write(model)
+    quote = connections[alias].ops.quote_name
+    sql = (
+        f'DELETE FROM {quote(model._meta.db_table)} '
+        f'WHERE {quote(model._meta.get_field("user").column)} = %s '
+        f'AND {quote(model._meta.get_field(field_name).column)} = %s '
+        f'RETURNING {quote(model._meta.pk.column)}'
+    )
+    with transaction.atomic(using=alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(sql, [user_id, target_id])
+            row = cursor.fetchone()
+        if row is not None:
+            record_relation(
+                model, row[0], ChangeEvent.DELETE, user_id, field_name,
+                target_id, alias
+            )
+    return row is not None
+
+
+def record_relation(model, pk, action, user_id, field_name, target_id,
+                    alias):
+    make_event(
+        model, pk, action, {'user': user_id, field_name: target_id}
+    ).save(using=alias)
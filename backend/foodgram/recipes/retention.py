@@ -0,0 +1,190 @@
+"""
+Очистка данных, которые иначе копятся бесконечно: старые строки
+списков покупок, токены неактивных пользователей, файлы изображений
+без ссылок, брошенные загрузки по частям и старые события журнала
+изменений.
+
+Строки удаляются порциями по batch_size, каждая в своей транзакции,
+с паузой между порциями, чтобы не держать блокировки и не нагружать
+БД и диск.
+"""
+import logging
+import os
+import posixpath
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .deletion import delete_in_batches
+from .models import ChangeEvent, ImageUpload, Recipe, ShoppingList, StoredImage
+from .outbox import read_by_all_consumers, slowest_consumer
+from .uploads import discard_upload
+
+logger = logging.getLogger(__name__)
+
+IMAGE_DIRECTORY = 'recipes/images'
+
+
+def days_ago(days):
+    return timezone.now() - timedelta(days=days)
+
+
+def purge_cart_rows(batch_size, pause=0):
+    if not settings.CART_RETENTION_DAYS:
+        return 0
+    return delete_in_batches(
+        ShoppingList.objects.filter(
+            created__lt=days_ago(settings.CART_RETENTION_DAYS)
+        ).order_by('created'),
+        batch_size, pause
+    )
+
+
+def purge_tokens(batch_size, pause=0):
+    """
+    Токены неактивных пользователей и токены, которыми не пользовались
+    и не входили TOKEN_RETENTION_DAYS.
+    """
+    dead = Q(user__is_active=False)
+    if settings.TOKEN_RETENTION_DAYS:
+        dead |= Q(last_seen__lt=days_ago(settings.TOKEN_RETENTION_DAYS))
+    return delete_in_batches(
+        Token.objects.alias(last_seen=Greatest(
+            'created', Coalesce('user__last_login', 'created'),
+            Coalesce('user__token_last_used', 'created')
+        )).filter(dead),
+        batch_size, pause
+    )
+
+
+def purge_change_events(batch_size, pause=0):
+    """Старые события, которые уже прочитали все потребители."""
+    if not settings.CHANGE_EVENT_RETENTION_DAYS:
+        return 0
+    cutoff = days_ago(settings.CHANGE_EVENT_RETENTION_DAYS)
+    deleted = delete_in_batches(
+        read_by_all_consumers().filter(created__lt=cutoff).order_by('pk'),
+        batch_size, pause
+    )
+    slowest = slowest_consumer()
+    if slowest and ChangeEvent.objects.filter(created__lt=cutoff).exists():
+        logger.warning(
+            'Потребитель журнала изменений %s отстает: события старше '
+            '%s дн. не удалены', slowest.consumer,
+            settings.CHANGE_EVENT_RETENTION_DAYS
+        )
+    return deleted
+
+
+def purge_uploads(batch_size, pause=0):
+    """Незавершенные и неиспользованные загрузки старше срока хранения."""
+    cutoff = timezone.now() - timedelta(
+        hours=settings.IMAGE_UPLOAD_RETENTION_HOURS
+    )
+    deleted = 0
+    while True:
+        uploads = list(
+            ImageUpload.objects.filter(created__lt=cutoff)[:batch_size]
+        )
+        for upload in uploads:
+            discard_upload(upload)
+        deleted += len(uploads)
+        if len(uploads) < batch_size:
+            break
+        time.sleep(pause)
+    known = {
+        f'{upload_id}.part'
+        for upload_id in ImageUpload.objects.values_list('id', flat=True)
+    }
+    return deleted + remove_old_files(
+        settings.IMAGE_UPLOAD_DIR, cutoff.timestamp(),
+        lambda name: name not in known
+    )
+
+
+def remove_old_files(directory, before, is_orphan):
+    removed = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) < before and is_orphan(name):
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def iter_image_names(storage, directory=IMAGE_DIRECTORY):
+    try:
+        directories, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in files:
+        yield posixpath.join(directory, name)
+    for subdirectory in directories:
+        yield from iter_image_names(
+            storage, posixpath.join(directory, subdirectory)
+        )
+
+
+def referenced_images(names):
+    return set(StoredImage.objects.filter(
+        name__in=names, references__gt=0
+    ).values_list('name', flat=True)) | set(Recipe.all_objects.filter(
+        image__in=names
+    ).values_list('image', flat=True))
+
+
+def purge_orphaned_images(batch_size, pause=0):
+    """
+    Удалить файлы в recipes/images/, на которые не ссылается ни один
+    рецепт. Файлы моложе ORPHANED_IMAGE_GRACE_HOURS не трогаются: они
+    могут принадлежать рецепту, транзакция которого еще не завершилась.
+    """
+    storage = Recipe._meta.get_field('image').storage
+    before = timezone.now() - timedelta(
+        hours=settings.ORPHANED_IMAGE_GRACE_HOURS
+    )
+    names = iter_image_names(storage)
+    removed = 0
+    while True:
+        batch = [name for _, name in zip(range(batch_size), names)]
+        if not batch:
+            return removed
+        referenced = referenced_images(batch)
+        for name in batch:
+            if name in referenced:
+                continue
+            try:
+                if storage.get_modified_time(name) > before:
+                    continue
+            except FileNotFoundError:
+                # Файл уже удалили (например, delete_unreferenced_images).
+                continue
+            storage.delete(name)
+            StoredImage.objects.filter(name=name).delete()
+            removed += 1
+        time.sleep(pause)
+
+
+PURGE_STEPS = (
+    ('строк списков покупок', purge_cart_rows),
+    ('токенов', purge_tokens),
+    ('загрузок по частям', purge_uploads),
+    ('файлов изображений', purge_orphaned_images),
+    ('событий журнала изменений', purge_change_events),
+)
+
+
+def purge_stale(batch_size=500, pause=0.1):
+    """Выполнить все шаги очистки, вернуть [(что удалено, количество)]."""
+    return [
+        (name, step(batch_size, pause)) for name, step in PURGE_STEPS
+    ]
@@ -0,0 +1,200 @@
+"""
+Подсказки поиска по названиям рецептов, ингредиентов и именам авторов.
+
+Таблица SearchEntry хранит нормализованный текст каждого объекта и
+обновляется сигналами при сохранении и удалении. В PostgreSQL поиск
+идет по ней с триграммным GIN-индексом (начало текста или начало любого
+слова), в остальных БД — по словарю префиксов в памяти процесса, который
+перестраивается, когда индекс меняется.
+"""
+import re
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Length
+
+from .models import Ingredient, Recipe, SearchEntry
+
+User = get_user_model()
+
+VERSION_KEY = 'search_index_version'
+# Короче этой длины запрос ищется только с начала текста: для
+# поиска с начала слова триграммному индексу нужно хотя бы 3 символа.
+WORD_SEARCH_MIN_LENGTH = 3
+MAX_PREFIX_LENGTH = 12
+
+
+def normalize(text):
+    return re.sub(r'\s+', ' ', text.lower().replace('ё', 'е')).strip()
+
+
+def bump_version():
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid.uuid4().hex))
+
+
+def index_object(category, object_id, label):
+    SearchEntry.objects.update_or_create(
+        category=category, object_id=object_id,
+        defaults={'label': label, 'normalized': normalize(label)}
+    )
+    bump_version()
+
+
+def unindex_objects(category, object_ids):
+    SearchEntry.objects.filter(
+        category=category, object_id__in=object_ids
+    ).delete()
+    bump_version()
+
+
+def indexed_querysets():
+    return (
+        (SearchEntry.RECIPE, Recipe.objects.values_list('id', 'name')),
+        (
+            SearchEntry.INGREDIENT,
+            Ingredient.objects.values_list('id', 'name'),
+        ),
+        (
+            SearchEntry.AUTHOR,
+            User.objects.filter(
+                is_active=True, deletion_requested__isnull=True
+            ).values_list('id', 'username'),
+        ),
+    )
+
+
+def rebuild_index(batch_size=1000):
+    with transaction.atomic():
+        SearchEntry.objects.all().delete()
+        for category, rows in indexed_querysets():
+            SearchEntry.objects.bulk_create(
+                (
+                    SearchEntry(
+                        category=category, object_id=object_id, label=label,
+                        normalized=normalize(label)
+                    )
+                    for object_id, label in rows.iterator()
+                ),
+                batch_size=batch_size
+            )
+        bump_version()
+    return SearchEntry.objects.count()
+
+
+def sort_key(query):
+    return lambda entry: (
+        not entry[0].startswith(query), len(entry[0]), entry[0]
+    )
+
+
+class PrefixIndex:
+    """Словарь префиксов текста и каждого его слова для БД без триграмм."""
+
+    def __init__(self):
+        self.version = None
+        self.built_at = 0
+        self.prefixes = {}
+
+    def is_stale(self, version):
+        return (
+            version != self.version
+            or time.monotonic() - self.built_at > settings.SUGGEST_INDEX_TTL
+        )
+
+    def build(self, version):
+        prefixes = defaultdict(lambda: defaultdict(set))
+        rows = SearchEntry.objects.values_list(
+            'category', 'normalized', 'label', 'object_id'
+        )
+        for category, normalized, label, object_id in rows.iterator():
+            entry = (normalized, label, object_id)
+            starts = [0] + [
+                match.end() for match in re.finditer(' ', normalized)
+            ]
+            for start in starts:
+                word = normalized[start:start + MAX_PREFIX_LENGTH]
+                for length in range(1, len(word) + 1):
+                    prefixes[category][word[:length]].add(entry)
+        self.prefixes = prefixes
+        self.version, self.built_at = version, time.monotonic()
+
+    def search(self, category, query, limit):
+        version = cache.get(VERSION_KEY)
+        if self.is_stale(version):
+            self.build(version)
+        candidates = self.prefixes.get(category, {}).get(
+            query[:MAX_PREFIX_LENGTH], ()
+        )
+        if len(query) < WORD_SEARCH_MIN_LENGTH:
+            candidates = (e for e in candidates if e[0].startswith(query))
+        elif len(query) > MAX_PREFIX_LENGTH:
+            candidates = (
+                e for e in candidates
+                if e[0].startswith(query) or f' {query}' in e[0]
+            )
+        return [
+            (object_id, label)
+            for _, label, object_id in sorted(
+                candidates, key=sort_key(query)
+            )[:limit]
+        ]
+
+
+prefix_index = PrefixIndex()
+
+
+def search_database(alias, category, query, limit):
+    condition = Q(normalized__startswith=query)
+    if len(query) >= WORD_SEARCH_MIN_LENGTH:
+        condition |= Q(normalized__contains=f' {query}')
+    return list(
+        SearchEntry.objects.using(alias).filter(
+            condition, category=category
+        ).annotate(
+            word_match=Case(
+                When(normalized__startswith=query, then=Value(0)),
+                default=Value(1), output_field=IntegerField()
+            )
+        ).order_by(
+            'word_match', Length('normalized'), 'normalized'
+        ).values_list('object_id', 'label')[:limit]
+    )
+
+
+def suggest(query, limits):
+    """
+    Вернуть {категория: [(id, текст)]} не более limits[категория]
+    записей. В PostgreSQL запросы ограничены SUGGEST_TIMEOUT_MS:
+    категория, не уложившаяся во время, возвращается пустой.
+    """
+    query = normalize(query)
+    results = {category: [] for category in limits}
+    if not query:
+        return results
+    alias = router.db_for_read(SearchEntry)
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        for category, limit in limits.items():
+            results[category] = prefix_index.search(category, query, limit)
+        return results
+    with transaction.atomic(using=alias):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SET LOCAL statement_timeout = %s',
+                [settings.SUGGEST_TIMEOUT_MS]
+            )
+        for category, limit in limits.items():
+            try:
+                with transaction.atomic(using=alias):
+                    results[category] = search_database(
+                        alias, category, query, limit
+                    )
+            except DatabaseError:
+                pass
+    return results
@@ -0,0 +1,17 @@
+from django.db.models import F, Sum
+
+from .models import IngredientRecipe
+
+
+def shopping_list_text(user):
+    shop_list = IngredientRecipe.objects.filter(
+        recipe__shopping_cart__user=user,
+        recipe__deletion_requested__isnull=True).values(
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit')
+    ).annotate(amount=Sum('amount'))
+
+    return '\n'.join([
+        f"{item['name']} ({item['measurement_unit']}) - {item['amount']}"
+        for item in shop_list
+    ])
@@ -0,0 +1,212 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+from foodgram.response_cache import invalidate
+
+from .models import (ChangeEvent, Ingredient, IngredientRecipe, Recipe,
+                     SearchEntry, StoredImage, Tag)
+from .outbox import TRACKED_MODELS, make_event, record, record_many
+from .search import index_object, unindex_objects
+from .snapshots import invalidate_snapshots
+
+User = get_user_model()
+
+
+def add_image_reference(name):
+    with transaction.atomic():
+        image, created = StoredImage.objects.select_for_update(
+        ).get_or_create(name=name, defaults={'references': 1})
+        if not created:
+            StoredImage.objects.filter(pk=image.pk).update(
+                references=F('references') + 1
+            )
+
+
+def delete_unreferenced_images(names):
+    """
+    Строки без ссылок удаляются под блокировкой, как и повторное
+    использование файла в ContentAddressedStorage.save. Файлы моложе
+    ORPHANED_IMAGE_GRACE_HOURS остаются: их могли только что выбрать
+    для нового рецепта, и без ссылок их позже удалит purge_stale.
+    """
+    storage = Recipe._meta.get_field('image').storage
+    before = timezone.now() - timedelta(
+        hours=settings.ORPHANED_IMAGE_GRACE_HOURS
+    )
+    with transaction.atomic():
+        images = StoredImage.objects.select_for_update().filter(
+            name__in=names, references__lte=0
+        )
+        for name in images.values_list('name', flat=True):
+            try:
+                if storage.get_modified_time(name) < before:
+                    storage.delete(name)
+            except FileNotFoundError:
+                pass
+        images.delete()
+
+
+def remove_image_references(counts):
+    """counts — сколько ссылок снять с каждого файла, одним UPDATE."""
+    if not counts:
+        return
+    StoredImage.objects.filter(name__in=counts).update(
+        references=F('references') - Case(
+            *(When(name=name, then=Value(count))
+              for name, count in counts.items()),
+            output_field=IntegerField()
+        )
+    )
+    names = list(counts)
+    transaction.on_commit(lambda: delete_unreferenced_images(names))
+
+
+def remove_image_reference(name):
+    remove_image_references({name: 1})
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_previous_image(sender, instance, **kwargs):
+    instance.previous_image = None
+    if instance.pk:
+        instance.previous_image = Recipe.all_objects.filter(
+            pk=instance.pk
+        ).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=Recipe)
+def update_image_references(sender, instance, **kwargs):
+    previous, current = instance.previous_image, instance.image.name
+    if previous == current:
+        return
+    if current:
+        add_image_reference(current)
+    if previous:
+        remove_image_reference(previous)
+
+
+@receiver(post_delete, sender=Recipe)
+def release_image(sender, instance, **kwargs):
+    if instance.image.name:
+        remove_image_reference(instance.image.name)
+
+
+@receiver(pre_save, sender=Ingredient)
+def remember_previous_ingredient(sender, instance, **kwargs):
+    instance.previous_fields = None
+    if instance.pk:
+        instance.previous_fields = Ingredient.objects.filter(
+            pk=instance.pk
+        ).values_list('name', 'measurement_unit').first()
+
+
+@receiver(post_save, sender=Ingredient)
+def refresh_ingredient_snapshots(sender, instance, created, **kwargs):
+    previous = instance.previous_fields
+    if previous and previous != (instance.name, instance.measurement_unit):
+        invalidate_snapshots(instance.pk)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def drop_ingredient_snapshots(sender, instance, **kwargs):
+    invalidate_snapshots(instance.pk)
+
+
+SEARCH_LABELS = {
+    Recipe: (SearchEntry.RECIPE, 'name'),
+    Ingredient: (SearchEntry.INGREDIENT, 'name'),
+    User: (SearchEntry.AUTHOR, 'username'),
+}
+
+
+def is_hidden(instance):
+    return (
+        not getattr(instance, 'is_active', True)
+        or getattr(instance, 'deletion_requested', None) is not None
+    )
+
+
+def update_search_entry(sender, instance, update_fields=None, **kwargs):
+    category, label_field = SEARCH_LABELS[sender]
+    if update_fields is not None and not (
+        {label_field, 'is_active', 'deletion_requested'} & set(update_fields)
+    ):
+        return
+    if is_hidden(instance):
+        unindex_objects(category, [instance.pk])
+    else:
+        index_object(category, instance.pk, getattr(instance, label_field))
+
+
+def delete_search_entry(sender, instance, **kwargs):
+    unindex_objects(SEARCH_LABELS[sender][0], [instance.pk])
+
+
+for model in SEARCH_LABELS:
+    post_save.connect(update_search_entry, sender=model)
+    post_delete.connect(delete_search_entry, sender=model)
+
+
+# Группы кеша ответов, в которых показываются данные модели.
+RESPONSE_CACHE_GROUPS = {
+    Tag: ('tags', 'recipes'),
+    Ingredient: ('ingredients', 'recipes'),
+    Recipe: ('recipes',),
+    IngredientRecipe: ('recipes',),
+    User: ('recipes',),
+}
+# Поля пользователя, которые видны в рецептах.
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+def invalidate_responses(sender, update_fields=None, **kwargs):
+    if sender is User and update_fields is not None and not (
+        AUTHOR_FIELDS & set(update_fields)
+    ):
+        return
+    invalidate(*RESPONSE_CACHE_GROUPS[sender])
+
+
+for model in RESPONSE_CACHE_GROUPS:
+    post_save.connect(invalidate_responses, sender=model)
+    post_delete.connect(invalidate_responses, sender=model)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate('recipes')
+
+
+def record_save(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        record(instance, ChangeEvent.CREATE if created else ChangeEvent.UPDATE)
+
+
+def record_delete(sender, instance, **kwargs):
+    record(instance, ChangeEvent.DELETE)
+
+
+for model in TRACKED_MODELS:
+    post_save.connect(record_save, sender=model)
+    post_delete.connect(record_delete, sender=model)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def record_recipe_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        record(instance, ChangeEvent.UPDATE)
+    elif pk_set:
+        record_many([
+            make_event(Recipe, recipe_id, ChangeEvent.UPDATE)
+            for recipe_id in pk_set
+        ])
@@ -0,0 +1,100 @@
+"""
+Снимок ингредиентов рецепта в столбце Recipe.ingredients_snapshot.
+
+Снимок — список строк [id, name, measurement_unit, amount] в порядке
+добавления ингредиентов. Списком, а не словарями, потому что jsonb
+в PostgreSQL не сохраняет порядок ключей, а ответ API должен совпадать
+с ответом сериализаторов. NULL означает, что снимка нет, и ингредиенты
+читаются из IngredientRecipe.
+"""
+from django.db import transaction
+from jobs.queue import enqueue
+
+from .models import IngredientRecipe, Recipe
+
+SNAPSHOT_FIELDS = ('id', 'name', 'measurement_unit', 'amount')
+SNAPSHOT_COLUMNS = (
+    'ingredient_id', 'ingredient__name', 'ingredient__measurement_unit',
+    'amount',
+)
+
+
+def expand_snapshot(snapshot):
+    return [dict(zip(SNAPSHOT_FIELDS, row)) for row in snapshot]
+
+
+def compact_snapshot(snapshot):
+    return [{'id': row[0], 'amount': row[3]} for row in snapshot]
+
+
+def build_snapshots(recipe_ids):
+    snapshots = {recipe_id: [] for recipe_id in recipe_ids}
+    rows = IngredientRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('id').values_list('recipe_id', *SNAPSHOT_COLUMNS)
+    for recipe_id, *row in rows:
+        snapshots[recipe_id].append(row)
+    return snapshots
+
+
+def save_snapshots(recipe_ids):
+    """Пересобрать и записать снимки рецептов, вернуть {id: снимок}."""
+    snapshots = build_snapshots(recipe_ids)
+    recipes = [
+        Recipe(pk=recipe_id, ingredients_snapshot=snapshot)
+        for recipe_id, snapshot in snapshots.items()
+    ]
+    Recipe.all_objects.bulk_update(recipes, ('ingredients_snapshot',))
+    return snapshots
+
+
+def invalidate_snapshots(ingredient_id):
+    """
+    Сбросить снимки рецептов с ингредиентом: до пересборки они читаются
+    из IngredientRecipe. Пересборку выполняет фоновая задача.
+    """
+    if Recipe.all_objects.filter(
+        recipe_ingredient__ingredient_id=ingredient_id,
+        ingredients_snapshot__isnull=False
+    ).update(ingredients_snapshot=None):
+        enqueue(
+            'fill_ingredient_snapshots',
+            unique_key='fill_ingredient_snapshots'
+        )
+
+
+def fill_snapshots(batch_size=500, rebuild=False):
+    """Записать снимки рецептов без снимка (или всех при rebuild)."""
+    queryset = Recipe.all_objects.order_by('pk')
+    if not rebuild:
+        queryset = queryset.filter(ingredients_snapshot__isnull=True)
+    saved, last_id = 0, 0
+    while True:
+        recipe_ids = list(queryset.filter(pk__gt=last_id).values_list(
+            'pk', flat=True
+        )[:batch_size])
+        if not recipe_ids:
+            return saved
+        with transaction.atomic():
+            save_snapshots(recipe_ids)
+        saved += len(recipe_ids)
+        last_id = recipe_ids[-1]
+
+
+def find_stale_snapshots(batch_size=500):
+    """Сгенерировать id рецептов, чей снимок не совпадает с таблицей."""
+    queryset = Recipe.all_objects.filter(
+        ingredients_snapshot__isnull=False
+    ).order_by('pk')
+    last_id = 0
+    while True:
+        stored = dict(queryset.filter(pk__gt=last_id).values_list(
+            'pk', 'ingredients_snapshot'
+        )[:batch_size])
+        if not stored:
+            return
+        actual = build_snapshots(list(stored))
+        for recipe_id, snapshot in stored.items():
+            if [list(row) for row in actual[recipe_id]] != snapshot:
+                yield recipe_id
+        last_id = max(stored)
@@ -0,0 +1,45 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файл сохраняется под sha256 своего содержимого: одинаковые
+    изображения хранятся один раз, а содержимое по имени никогда
+    не меняется, поэтому его можно кешировать навсегда.
+    """
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, hexdigest[:2], hexdigest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        from .models import StoredImage
+        with transaction.atomic():
+            # Блокировка строки StoredImage дожидается удаления файла без
+            # ссылок (delete_unreferenced_images): если файл успели
+            # удалить, он записывается заново.
+            StoredImage.objects.select_for_update().filter(name=name).first()
+            if self.exists(name):
+                # Повторно использованный файл считается новым: пока рецепт
+                # не сохранен, его не удаляют ни очистка по ссылкам, ни
+                # purge_stale.
+                os.utime(self.path(name))
+                return name
+            return super().save(name, content, max_length)
@@ -0,0 +1,102 @@
+"""
+Рекомендации авторов для подписки.
+
+Для пары (пользователь, автор) считаются два сигнала: сколько людей из
+подписок пользователя подписаны на автора (друзья друзей) и сколько
+рецептов автора лежит в избранном пользователя. Пользователи берутся
+порциями по batch_size; оба сигнала для порции считаются двумя
+агрегирующими запросами в БД, а сохраняются только SUGGESTIONS_PER_USER
+лучших авторов каждого пользователя.
+"""
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count
+
+from .models import FavoritesList, Follow, FollowSuggestion
+
+User = get_user_model()
+
+
+def follow_counts(user_ids):
+    """{(пользователь, автор): сколько его подписок подписаны на автора}."""
+    rows = Follow.objects.filter(
+        user__following__user__in=user_ids,
+        author__is_active=True, author__deletion_requested__isnull=True
+    ).order_by().values_list('user__following__user', 'author').annotate(
+        count=Count('pk')
+    )
+    return {(user_id, author_id): count for user_id, author_id, count in rows}
+
+
+def favorite_counts(user_ids):
+    """{(пользователь, автор): сколько рецептов автора в избранном}."""
+    rows = FavoritesList.objects.filter(
+        user__in=user_ids, recipe__deletion_requested__isnull=True,
+        recipe__author__is_active=True,
+        recipe__author__deletion_requested__isnull=True
+    ).order_by().values_list('user', 'recipe__author').annotate(
+        count=Count('pk')
+    )
+    return {(user_id, author_id): count for user_id, author_id, count in rows}
+
+
+def build_suggestions(user_ids):
+    follows = follow_counts(user_ids)
+    favorites = favorite_counts(user_ids)
+    followed = set(Follow.objects.filter(user__in=user_ids).values_list(
+        'user', 'author'
+    ))
+    candidates = defaultdict(list)
+    for user_id, author_id in follows.keys() | favorites.keys():
+        if user_id == author_id or (user_id, author_id) in followed:
+            continue
+        followed_by = follows.get((user_id, author_id), 0)
+        favorited = favorites.get((user_id, author_id), 0)
+        candidates[user_id].append(FollowSuggestion(
+            user_id=user_id, author_id=author_id,
+            score=(
+                settings.SUGGESTION_FOLLOW_WEIGHT * followed_by
+                + settings.SUGGESTION_FAVORITE_WEIGHT * favorited
+            ),
+            followed_by=followed_by, favorited_recipes=favorited
+        ))
+    return [
+        suggestion for suggestions in candidates.values()
+        for suggestion in heapq.nlargest(
+            settings.SUGGESTIONS_PER_USER, suggestions,
+            key=lambda suggestion: (suggestion.score, -suggestion.author_id)
+        )
+    ]
+
+
+def refresh_suggestions(batch_size=500):
+    """Пересчитать рекомендации всех пользователей, вернуть их количество."""
+    users = User.objects.filter(
+        is_active=True, deletion_requested__isnull=True
+    ).order_by('pk')
+    saved, last_id = 0, 0
+    while True:
+        user_ids = list(users.filter(pk__gt=last_id).values_list(
+            'pk', flat=True
+        )[:batch_size])
+        if not user_ids:
+            return saved
+        suggestions = build_suggestions(user_ids)
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user__in=user_ids).delete()
+            FollowSuggestion.objects.bulk_create(suggestions)
+        saved += len(suggestions)
+        last_id = user_ids[-1]
+
+
+def suggestions_for(user):
+    """Рекомендации пользователя: один запрос по индексу (user, -score)."""
+    return FollowSuggestion.objects.filter(
+        user=user, author__deletion_requested__isnull=True
+    ).exclude(
+        author__following__user=user
+    ).select_related('author').order_by('-score', 'author_id')
@@ -0,0 +1,133 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from jobs.models import Job
+from jobs.queue import work
+from recipes.deletion import (mark_recipes_for_deletion,
+                              mark_users_for_deletion, purge_marked,
+                              purge_recipes)
+from recipes.models import (ChangeEvent, FavoritesList, Follow,
+                            IngredientRecipe, Recipe, ShoppingList,
+                            StoredImage)
+from rest_framework.test import APIClient
+
+from .utils import (IMAGE_NAME, create_ingredient, create_recipe, create_tag,
+                    create_user)
+
+User = get_user_model()
+
+
+class DeletionTests(TestCase):
+
+    def setUp(self):
+        self.author = create_user('author')
+        self.reader = create_user('reader')
+        ingredient = create_ingredient('мука')
+        self.recipe = create_recipe(
+            self.author, tags=[create_tag('lunch')],
+            ingredients=[(ingredient, 100)]
+        )
+        FavoritesList.objects.create(user=self.reader, recipe=self.recipe)
+        ShoppingList.objects.create(user=self.reader, recipe=self.recipe)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def assert_recipe_rows(self, count):
+        """Сколько строк рецепта из setUp осталось в каждой таблице."""
+        recipe = self.recipe.pk
+        self.assertEqual(Recipe.all_objects.filter(pk=recipe).count(), count)
+        for model in (
+            IngredientRecipe, FavoritesList, ShoppingList, Recipe.tags.through
+        ):
+            self.assertEqual(
+                model.objects.filter(recipe=recipe).count(), count,
+                model.__name__
+            )
+
+    def test_delete_recipe_marks_and_hides(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.delete(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Recipe.objects.exists())
+        self.assert_recipe_rows(1)
+        self.assertEqual(
+            client.get(f'/api/recipes/{self.recipe.pk}/').status_code, 404
+        )
+        self.assertEqual(
+            list(Job.objects.values_list('name', 'status')),
+            [('purge_deleted', Job.QUEUED)]
+        )
+
+    def test_mark_twice_counts_once(self):
+        queryset = Recipe.objects.filter(pk=self.recipe.pk)
+        self.assertEqual(mark_recipes_for_deletion(queryset), 1)
+        self.assertEqual(mark_recipes_for_deletion(
+            Recipe.all_objects.filter(pk=self.recipe.pk)
+        ), 0)
+
+    def test_purge_marked_removes_rows_and_relations(self):
+        other = create_recipe(self.author, name='Другой')
+        mark_recipes_for_deletion(Recipe.objects.filter(pk=self.recipe.pk))
+        self.assertEqual(purge_marked(batch_size=10), (1, 0))
+        self.assertEqual(list(Recipe.all_objects.all()), [other])
+        self.assert_recipe_rows(0)
+        self.assertEqual(purge_marked(batch_size=10), (0, 0))
+
+    def test_purge_user_with_recipes(self):
+        self.assertEqual(mark_users_for_deletion(
+            User.objects.filter(pk=self.author.pk)
+        ), 1)
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        self.assertFalse(Recipe.objects.exists())
+        # Рецепты удаляются раньше автора в той же порции.
+        self.assertEqual(purge_marked(batch_size=10), (1, 1))
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assert_recipe_rows(0)
+
+    def test_worker_runs_purge_job(self):
+        mark_users_for_deletion(User.objects.filter(pk=self.author.pk))
+        work(threading.Event(), 0, burst=True)
+        self.assertEqual(list(User.objects.all()), [self.reader])
+        self.assert_recipe_rows(0)
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+
+    def purge_queries(self, count):
+        """Сколько запросов уходит на очистку count рецептов."""
+        recipes = [
+            create_recipe(
+                self.author, tags=[self.recipe.tags.get()],
+                ingredients=[(self.recipe.ingredients.get(), 1)]
+            ) for _ in range(count)
+        ]
+        for recipe in recipes:
+            FavoritesList.objects.create(user=self.reader, recipe=recipe)
+        mark_recipes_for_deletion(
+            Recipe.objects.filter(pk__in=[recipe.pk for recipe in recipes])
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(purge_recipes(batch_size=10), count)
+        return len(queries)
+
+    def test_purge_is_bulk_and_records_events(self):
+        self.assertEqual(self.purge_queries(1), self.purge_queries(5))
+        self.assertEqual(
+            StoredImage.objects.get(name=IMAGE_NAME).references, 1
+        )
+        mark_recipes_for_deletion(Recipe.objects.all())
+        with self.captureOnCommitCallbacks(execute=True):
+            purge_recipes(batch_size=10)
+        self.assertFalse(StoredImage.objects.exists())
+        self.assertEqual(ChangeEvent.objects.filter(
+            model='favorite', action=ChangeEvent.DELETE
+        ).count(), 7)
+        self.assertEqual(
+            list(ChangeEvent.objects.filter(
+                model='favorite', action=ChangeEvent.DELETE
+            ).values_list('data', flat=True))[-1],
+            {'user': self.reader.pk, 'recipe': self.recipe.pk}
+        )
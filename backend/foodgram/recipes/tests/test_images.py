@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.files.base import ContentFile
+from django.test import TestCase
+from recipes.deletion import mark_recipes_for_deletion
+from recipes.models import Recipe, StoredImage
+from recipes.signals import delete_unreferenced_images
+
+from .utils import create_recipe, create_user
+
+STORAGE = Recipe._meta.get_field('image').storage
+DAY = 24 * 60 * 60
+
+
+class ImageReferenceTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings = self.settings(MEDIA_ROOT=media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.author = create_user('author')
+
+    def save(self, content=b'image'):
+        return STORAGE.save('recipes/images/dish.PNG', ContentFile(content))
+
+    def references(self, name):
+        image = StoredImage.objects.filter(name=name).first()
+        return image and image.references
+
+    def age(self, name, days):
+        old = time.time() - days * DAY
+        os.utime(STORAGE.path(name), (old, old))
+
+    def test_same_content_is_stored_once(self):
+        name = self.save()
+        self.assertEqual(self.save(), name)
+        self.assertNotEqual(self.save(b'other'), name)
+        directory, filename = os.path.split(name)
+        self.assertTrue(filename.endswith('.png'))
+        self.assertEqual(os.listdir(STORAGE.path(directory)), [filename])
+
+    def test_references_are_counted(self):
+        name, other = self.save(), self.save(b'other')
+        first = create_recipe(self.author, image=name)
+        second = create_recipe(self.author, image=name)
+        self.assertEqual(self.references(name), 2)
+        self.age(name, days=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.references(name), 1)
+        second.image = other
+        with self.captureOnCommitCallbacks(execute=True):
+            second.save()
+        self.assertIsNone(self.references(name))
+        self.assertFalse(STORAGE.exists(name))
+        self.assertEqual(self.references(other), 1)
+
+    def test_fresh_file_is_left_for_purge_stale(self):
+        name = self.save()
+        recipe = create_recipe(self.author, image=name)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.assertIsNone(self.references(name))
+        self.assertTrue(STORAGE.exists(name))
+
+    def test_marked_recipe_save_keeps_count(self):
+        name = self.save()
+        recipe = create_recipe(self.author, image=name)
+        mark_recipes_for_deletion(Recipe.objects.filter(pk=recipe.pk))
+        recipe = Recipe.all_objects.get(pk=recipe.pk)
+        recipe.save()
+        self.assertEqual(self.references(name), 1)
+
+    def test_reuse_wins_over_pending_delete(self):
+        name = self.save()
+        StoredImage.objects.create(name=name, references=0)
+        self.age(name, days=2)
+        # Файл выбран для нового рецепта до удаления без ссылок.
+        self.assertEqual(self.save(), name)
+        delete_unreferenced_images([name])
+        self.assertTrue(STORAGE.exists(name))
+        # Удаленный раньше повторного использования файл пишется заново.
+        STORAGE.delete(name)
+        self.assertEqual(self.save(), name)
+        with STORAGE.open(name) as image:
+            self.assertEqual(image.read(), b'image')
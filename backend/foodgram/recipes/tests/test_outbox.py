@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+from django.test import TransactionTestCase
+from django.utils import timezone
+from recipes.models import ChangeCursor, ChangeEvent
+from recipes.outbox import consume, read_changes
+from recipes.retention import purge_change_events
+
+from .utils import create_tag
+
+
+# События читаются только из завершенных транзакций, поэтому тесты
+# не оборачиваются в транзакцию.
+class OutboxTests(TransactionTestCase):
+
+    def setUp(self):
+        self.tags = [create_tag(f'tag{number}') for number in range(3)]
+
+    def test_events_are_recorded(self):
+        first, second, third = (tag.pk for tag in self.tags)
+        self.tags[0].delete()
+        self.assertEqual([
+            (event.model, event.object_id, event.action)
+            for event in read_changes()
+        ], [
+            ('tag', first, ChangeEvent.CREATE),
+            ('tag', second, ChangeEvent.CREATE),
+            ('tag', third, ChangeEvent.CREATE),
+            ('tag', first, ChangeEvent.DELETE),
+        ])
+
+    def test_read_after_position(self):
+        first, *rest = read_changes()
+        self.assertEqual(
+            read_changes(first.pk, 10, getattr(first, 'txid', 0)), rest
+        )
+        self.assertEqual(read_changes(limit=1), [first])
+
+    def test_consume_moves_cursor(self):
+        batches = []
+        self.assertEqual(consume('test', batches.append, limit=2), 2)
+        self.assertEqual(consume('test', batches.append, limit=2), 1)
+        self.assertEqual(consume('test', batches.append, limit=2), 0)
+        self.assertEqual(
+            [event.object_id for batch in batches for event in batch],
+            [tag.pk for tag in self.tags]
+        )
+        self.assertEqual(
+            ChangeCursor.objects.get(consumer='test').position,
+            ChangeEvent.objects.latest('pk').pk
+        )
+
+    def test_failed_handler_keeps_position(self):
+        def fail(events):
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            consume('test', fail)
+        self.assertFalse(ChangeCursor.objects.exists())
+        self.assertEqual(consume('test', lambda events: None), 3)
+
+    def test_purge_keeps_unread_events(self):
+        ChangeEvent.objects.update(
+            created=timezone.now() - timedelta(days=31)
+        )
+        consume('fast', lambda events: None)
+        consume('slow', lambda events: None, limit=2)
+        with self.settings(CHANGE_EVENT_RETENTION_DAYS=30):
+            with self.assertLogs('recipes.retention', 'WARNING') as logs:
+                self.assertEqual(purge_change_events(batch_size=1), 2)
+            self.assertIn('slow', logs.output[0])
+            self.assertEqual(
+                list(ChangeEvent.objects.values_list('object_id', flat=True)),
+                [self.tags[2].pk]
+            )
+            ChangeCursor.objects.filter(consumer='slow').delete()
+            self.assertEqual(purge_change_events(batch_size=1), 1)
@@ -0,0 +1,46 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from foodgram.paginators import EstimatedCountPaginator
+from recipes.models import Recipe
+
+from .utils import create_recipe, create_user
+
+
+class EstimatedCountPaginatorTests(TestCase):
+
+    def setUp(self):
+        create_recipe(create_user('author'))
+
+    def paginator(self, queryset):
+        return EstimatedCountPaginator(queryset.order_by('pk'), 10)
+
+    def test_default_manager_filter_counts_as_unfiltered(self):
+        self.assertTrue(self.paginator(Recipe.objects.all()).is_unfiltered())
+        self.assertTrue(
+            self.paginator(Recipe.all_objects.all()).is_unfiltered()
+        )
+        self.assertFalse(
+            self.paginator(Recipe.objects.filter(name='x')).is_unfiltered()
+        )
+        self.assertFalse(
+            self.paginator(Recipe.all_objects.filter(
+                deletion_requested__isnull=False
+            )).is_unfiltered()
+        )
+        self.assertFalse(
+            self.paginator(Recipe.objects.distinct()).is_unfiltered()
+        )
+
+    def test_large_table_uses_estimate(self):
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.fetchone.return_value = (50000.0,)
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                mock.patch.object(connection, 'cursor', return_value=cursor):
+            self.assertEqual(self.paginator(Recipe.objects.all()).count, 50000)
+        # С фильтром и на других БД считается точно.
+        self.assertEqual(
+            self.paginator(Recipe.objects.filter(name='x')).count, 0
+        )
+        self.assertEqual(self.paginator(Recipe.objects.all()).count, 1)
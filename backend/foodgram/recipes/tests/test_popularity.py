@@ -0,0 +1,100 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from recipes import popularity
+from recipes.models import FavoritesList, PopularityState, Recipe, ShoppingList
+from recipes.popularity import refresh_popularity
+from recipes.relations import add_relation, remove_relation
+
+from .utils import create_recipe, create_user
+
+POPULARITY = {'POPULARITY_WINDOW_DAYS': 30, 'POPULARITY_HALF_LIFE_HOURS': 24}
+
+
+class PopularityTests(TestCase):
+
+    def setUp(self):
+        settings = self.settings(**POPULARITY)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        author = create_user('author')
+        self.readers = [create_user(f'reader{number}') for number in range(3)]
+        self.first = create_recipe(author, 'Первый')
+        self.second = create_recipe(author, 'Второй')
+
+    def favorite(self, recipe, reader, days_ago=0):
+        favorite = FavoritesList.objects.create(user=reader, recipe=recipe)
+        FavoritesList.objects.filter(pk=favorite.pk).update(
+            created=timezone.now() - timedelta(days=days_ago)
+        )
+
+    def scores(self):
+        return dict(Recipe.all_objects.values_list('name', 'popularity'))
+
+    def test_older_events_decay(self):
+        self.favorite(self.first, self.readers[0], days_ago=1)
+        self.favorite(self.second, self.readers[0], days_ago=3)
+        ShoppingList.objects.create(user=self.readers[1], recipe=self.second)
+        self.assertEqual(refresh_popularity(full=True), 2)
+        scores = self.scores()
+        # Сутки — один период полураспада.
+        self.assertAlmostEqual(
+            scores['Второй'] - 1, scores['Первый'] / 4, places=3
+        )
+        self.assertEqual(
+            [row['name'] for row in self.client.get(
+                '/api/recipes/?ordering=popular'
+            ).json()['results']],
+            ['Второй', 'Первый']
+        )
+
+    def test_refresh_updates_only_changed_recipes(self):
+        self.favorite(self.first, self.readers[0], days_ago=1)
+        self.favorite(self.second, self.readers[0], days_ago=1)
+        refresh_popularity(full=True)
+        self.assertEqual(refresh_popularity(), 0)
+        before = self.scores()
+        self.favorite(self.first, self.readers[1])
+        with mock.patch.object(
+            popularity, 'compute_scores', wraps=popularity.compute_scores
+        ) as compute:
+            self.assertEqual(refresh_popularity(), 1)
+        # Очки считаются только для рецепта с новым событием.
+        self.assertEqual(compute.call_args.args[3], {self.first.pk})
+        after = self.scores()
+        self.assertAlmostEqual(after['Первый'] - before['Первый'], 1, places=3)
+        self.assertEqual(after['Второй'], before['Второй'])
+
+    def test_removed_and_expired_events(self):
+        self.assertTrue(add_relation(
+            FavoritesList, self.readers[0].id, 'recipe', self.first.id
+        ))
+        self.favorite(self.second, self.readers[0], days_ago=29)
+        refresh_popularity(full=True)
+        self.assertTrue(remove_relation(
+            FavoritesList, self.readers[0].id, 'recipe', self.first.id
+        ))
+        self.assertEqual(refresh_popularity(), 1)
+        self.assertEqual(self.scores()['Первый'], 0)
+        # Через двое суток событие второго рецепта выходит из окна.
+        PopularityState.objects.update(
+            refreshed_at=timezone.now() - timedelta(days=2)
+        )
+        FavoritesList.objects.update(
+            created=timezone.now() - timedelta(days=31)
+        )
+        self.assertEqual(refresh_popularity(), 1)
+        self.assertEqual(self.scores(), {'Первый': 0, 'Второй': 0})
+
+    def test_late_visible_event_is_counted(self):
+        refresh_popularity(full=True)
+        # Событие с created до прошлого пересчета, зафиксированное позже.
+        self.favorite(self.first, self.readers[0])
+        FavoritesList.objects.update(
+            created=PopularityState.objects.get().refreshed_at
+            - timedelta(minutes=1)
+        )
+        self.assertEqual(refresh_popularity(), 1)
+        self.assertGreater(self.scores()['Первый'], 0)
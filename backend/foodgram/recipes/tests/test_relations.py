@@ -0,0 +1,81 @@
+from django.test import TestCase
+from recipes.models import ChangeEvent, FavoritesList, Follow, Recipe
+from recipes.relations import add_relation, remove_relation
+from rest_framework.test import APIClient
+
+from .utils import create_recipe, create_user
+
+
+class RelationTests(TestCase):
+
+    def setUp(self):
+        self.author = create_user('author')
+        self.reader = create_user('reader')
+        self.recipe = create_recipe(self.author)
+
+    def events(self):
+        return list(ChangeEvent.objects.filter(model='favorite').values_list(
+            'action', 'data'
+        ))
+
+    def test_add_and_remove_are_idempotent(self):
+        self.assertTrue(add_relation(
+            FavoritesList, self.reader.id, 'recipe', self.recipe.id
+        ))
+        self.assertFalse(add_relation(
+            FavoritesList, self.reader.id, 'recipe', self.recipe.id
+        ))
+        self.assertEqual(FavoritesList.objects.count(), 1)
+        self.assertTrue(remove_relation(
+            FavoritesList, self.reader.id, 'recipe', self.recipe.id
+        ))
+        self.assertFalse(remove_relation(
+            FavoritesList, self.reader.id, 'recipe', self.recipe.id
+        ))
+        self.assertFalse(FavoritesList.objects.exists())
+        data = {'user': self.reader.id, 'recipe': self.recipe.id}
+        self.assertEqual(self.events(), [
+            (ChangeEvent.CREATE, data), (ChangeEvent.DELETE, data),
+        ])
+
+    def test_missing_or_marked_target(self):
+        self.assertFalse(add_relation(
+            FavoritesList, self.reader.id, 'recipe', self.recipe.id + 1
+        ))
+        Recipe.objects.update(deletion_requested='2026-01-01T00:00:00Z')
+        self.assertFalse(add_relation(
+            FavoritesList, self.reader.id, 'recipe', self.recipe.id
+        ))
+        self.assertFalse(FavoritesList.objects.exists())
+        self.assertEqual(self.events(), [])
+
+    def test_favorite_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        url = f'/api/recipes/{self.recipe.id}/favorite/'
+        first = client.get(url)
+        self.assertEqual(first.status_code, 201)
+        second = client.get(url)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(first.json()['id'], self.recipe.id)
+        self.assertEqual(client.delete(url).status_code, 204)
+        self.assertEqual(client.delete(url).status_code, 404)
+        self.assertEqual(
+            client.get(f'/api/recipes/{self.recipe.id + 1}/favorite/')
+            .status_code, 400
+        )
+
+    def test_subscribe_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.assertEqual(client.get(url).status_code, 201)
+        self.assertEqual(client.get(url).status_code, 200)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            client.get(f'/api/users/{self.reader.id}/subscribe/')
+            .status_code, 400
+        )
+        self.assertEqual(client.delete(url).status_code, 204)
+        self.assertEqual(client.delete(url).status_code, 404)
@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import TestCase
+from django.utils import timezone
+from recipes.models import (ChangeEvent, ImageUpload, Recipe, ShoppingList,
+                            StoredImage)
+from recipes.retention import (purge_cart_rows, purge_change_events,
+                               purge_orphaned_images, purge_stale,
+                               purge_uploads)
+from recipes.uploads import upload_path
+
+from .utils import create_recipe, create_tag, create_user
+
+STORAGE = Recipe._meta.get_field('image').storage
+
+
+def make_old(path, hours):
+    old = time.time() - hours * 3600
+    os.utime(path, (old, old))
+
+
+class RetentionTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings = self.settings(
+            MEDIA_ROOT=media, IMAGE_UPLOAD_DIR=os.path.join(media, 'uploads'),
+            CART_RETENTION_DAYS=90, CHANGE_EVENT_RETENTION_DAYS=30,
+            IMAGE_UPLOAD_RETENTION_HOURS=24, ORPHANED_IMAGE_GRACE_HOURS=24
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = create_user('reader')
+        self.author = create_user('author')
+
+    def test_cart_rows(self):
+        old, fresh = (
+            ShoppingList.objects.create(
+                user=self.user, recipe=create_recipe(self.author, name)
+            ) for name in ('Старый', 'Новый')
+        )
+        ShoppingList.objects.filter(pk=old.pk).update(
+            created=timezone.now() - timedelta(days=91)
+        )
+        self.assertEqual(purge_cart_rows(batch_size=1), 1)
+        self.assertEqual(list(ShoppingList.objects.all()), [fresh])
+        self.assertEqual(
+            list(ChangeEvent.objects.filter(
+                model='shopping_cart', action=ChangeEvent.DELETE
+            ).values_list('object_id', flat=True)), [old.pk]
+        )
+        ShoppingList.objects.update(created=timezone.now() - timedelta(1000))
+        with self.settings(CART_RETENTION_DAYS=0):
+            self.assertEqual(purge_cart_rows(batch_size=10), 0)
+
+    def create_upload(self, hours):
+        upload = ImageUpload.objects.create(
+            user=self.user, filename='dish.png', size=10
+        )
+        ImageUpload.objects.filter(pk=upload.pk).update(
+            created=timezone.now() - timedelta(hours=hours)
+        )
+        os.makedirs(os.path.dirname(upload_path(upload)), exist_ok=True)
+        with open(upload_path(upload), 'wb') as part:
+            part.write(b'x')
+        return upload
+
+    def test_uploads(self):
+        old, fresh = self.create_upload(25), self.create_upload(1)
+        stray, recent = (
+            os.path.join(os.path.dirname(upload_path(old)), name)
+            for name in ('stray.part', 'recent.part')
+        )
+        for path in (stray, recent):
+            with open(path, 'wb') as part:
+                part.write(b'x')
+        make_old(stray, 25)
+        self.assertEqual(purge_uploads(batch_size=1), 2)
+        self.assertEqual(list(ImageUpload.objects.all()), [fresh])
+        self.assertEqual(
+            sorted(os.listdir(os.path.dirname(upload_path(old)))),
+            sorted(['recent.part', f'{fresh.pk}.part'])
+        )
+
+    def save_image(self, content, hours=48):
+        name = STORAGE.save('recipes/images/dish.png', ContentFile(content))
+        make_old(STORAGE.path(name), hours)
+        return name
+
+    def test_orphaned_images(self):
+        used = self.save_image(b'used')
+        create_recipe(self.author, image=used)
+        orphan = self.save_image(b'orphan')
+        StoredImage.objects.create(name=orphan, references=0)
+        fresh = self.save_image(b'fresh', hours=1)
+        self.assertEqual(purge_orphaned_images(batch_size=1), 1)
+        self.assertTrue(STORAGE.exists(used))
+        self.assertTrue(STORAGE.exists(fresh))
+        self.assertFalse(STORAGE.exists(orphan))
+        self.assertEqual(
+            list(StoredImage.objects.values_list('name', flat=True)), [used]
+        )
+
+    def test_image_deleted_during_purge(self):
+        gone, orphan = self.save_image(b'gone'), self.save_image(b'orphan')
+        modified_time = STORAGE.get_modified_time
+
+        def delete_first(name):
+            if name == gone:
+                STORAGE.delete(name)
+            return modified_time(name)
+
+        with mock.patch.object(
+            STORAGE, 'get_modified_time', side_effect=delete_first
+        ):
+            self.assertEqual(purge_orphaned_images(batch_size=10), 1)
+        self.assertFalse(STORAGE.exists(orphan))
+
+    def test_change_events(self):
+        create_tag('old')
+        ChangeEvent.objects.update(created=timezone.now() - timedelta(31))
+        fresh = create_tag('new')
+        self.assertEqual(purge_change_events(batch_size=1), 1)
+        self.assertEqual(
+            list(ChangeEvent.objects.values_list('model', 'object_id')),
+            [('tag', fresh.pk)]
+        )
+        ChangeEvent.objects.update(created=timezone.now() - timedelta(1000))
+        with self.settings(CHANGE_EVENT_RETENTION_DAYS=0):
+            self.assertEqual(purge_change_events(batch_size=10), 0)
+
+    def test_purge_stale_runs_every_step(self):
+        self.assertEqual(
+            [count for _, count in purge_stale(pause=0)], [0, 0, 0, 0, 0]
+        )
@@ -0,0 +1,106 @@
+from django.core.cache import cache
+from django.test import TestCase
+from recipes.deletion import mark_recipes_for_deletion
+from recipes.models import Recipe, SearchEntry
+from recipes.search import (prefix_index, rebuild_index, search_database,
+                            suggest)
+from rest_framework.test import APIClient
+
+from .utils import create_ingredient, create_recipe, create_user
+
+RECIPES = (
+    'Блины', 'Тонкие блинчики', 'Блинный торт', 'Ёжики в томате',
+    'Шоколадный торт с вишней', 'Торт',
+)
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.author = create_user('blinov')
+        create_user('hidden', is_active=False)
+        for name in RECIPES:
+            create_recipe(self.author, name)
+        create_ingredient('блинная мука')
+        with self.captureOnCommitCallbacks(execute=True):
+            rebuild_index()
+
+    def labels(self, query, limit=10, category=SearchEntry.RECIPE):
+        return [
+            label for _, label in suggest(query, {category: limit})[category]
+        ]
+
+    def test_prefix_of_text_and_words(self):
+        self.assertEqual(
+            self.labels('бли'),
+            ['Блины', 'Блинный торт', 'Тонкие блинчики']
+        )
+        # Сначала совпадения с начала текста, затем более короткие.
+        self.assertEqual(
+            self.labels('торт'),
+            ['Торт', 'Блинный торт', 'Шоколадный торт с вишней']
+        )
+        self.assertEqual(self.labels('ЕЖИКИ'), ['Ёжики в томате'])
+        self.assertEqual(self.labels('  тонкие   бл'), ['Тонкие блинчики'])
+        self.assertEqual(self.labels('вишня'), [])
+
+    def test_short_query_matches_text_start_only(self):
+        self.assertEqual(self.labels('бл'), ['Блины', 'Блинный торт'])
+        self.assertEqual(self.labels('т'), ['Торт', 'Тонкие блинчики'])
+
+    def test_long_query(self):
+        self.assertEqual(
+            self.labels('шоколадный торт'), ['Шоколадный торт с вишней']
+        )
+        self.assertEqual(self.labels('шоколадный кекс'), [])
+
+    def test_limit_and_categories(self):
+        self.assertEqual(self.labels('бли', limit=1), ['Блины'])
+        self.assertEqual(
+            self.labels('бли', category=SearchEntry.INGREDIENT),
+            ['блинная мука']
+        )
+        self.assertEqual(
+            self.labels('b', category=SearchEntry.AUTHOR), ['blinov']
+        )
+        self.assertEqual(self.labels('h', category=SearchEntry.AUTHOR), [])
+
+    def test_database_search_matches_prefix_index(self):
+        for query in ('бли', 'бл', 'торт', 'ежики', 'шоколадный торт', 'я'):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    search_database(
+                        'default', SearchEntry.RECIPE, query, 10
+                    ),
+                    prefix_index.search(SearchEntry.RECIPE, query, 10)
+                )
+
+    def test_index_follows_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(self.author, 'Блинчики с творогом')
+        self.assertIn('Блинчики с творогом', self.labels('бли'))
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_recipes_for_deletion(Recipe.objects.filter(pk=recipe.pk))
+        self.assertNotIn('Блинчики с творогом', self.labels('бли'))
+
+    def test_endpoint(self):
+        client = APIClient()
+        response = client.get('/api/suggest/?q=Бли&limit=2')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            [row['name'] for row in data['recipes']],
+            ['Блины', 'Блинный торт']
+        )
+        self.assertEqual(
+            [row['name'] for row in data['ingredients']], ['блинная мука']
+        )
+        self.assertEqual(data['authors'], [])
+        self.assertEqual(client.get('/api/suggest/?q=').json(), {
+            'recipes': [], 'ingredients': [], 'authors': []
+        })
+        self.assertEqual(
+            client.get('/api/suggest/?q=б&limit=x').status_code, 400
+        )
@@ -0,0 +1,87 @@
+from django.test import TestCase
+from jobs.models import Job
+from recipes.models import IngredientRecipe, Recipe
+from recipes.snapshots import (build_snapshots, expand_snapshot,
+                               fill_snapshots, find_stale_snapshots,
+                               save_snapshots)
+from rest_framework.test import APIClient
+
+from .utils import create_ingredient, create_recipe, create_tag, create_user
+
+
+class SnapshotTests(TestCase):
+
+    def setUp(self):
+        self.author = create_user('author')
+        self.flour = create_ingredient('мука')
+        self.milk = create_ingredient('молоко', 'мл')
+        self.recipe = create_recipe(
+            self.author, ingredients=[(self.milk, 300), (self.flour, 200)]
+        )
+        self.other = create_recipe(self.author, ingredients=[(self.milk, 1)])
+        save_snapshots([self.recipe.pk, self.other.pk])
+
+    def snapshot(self, recipe):
+        recipe.refresh_from_db()
+        return recipe.ingredients_snapshot
+
+    def test_snapshot_keeps_insertion_order(self):
+        self.assertEqual(expand_snapshot(self.snapshot(self.recipe)), [
+            {'id': self.milk.pk, 'name': 'молоко', 'measurement_unit': 'мл',
+             'amount': 300},
+            {'id': self.flour.pk, 'name': 'мука', 'measurement_unit': 'г',
+             'amount': 200},
+        ])
+        self.assertEqual(
+            self.snapshot(self.recipe),
+            [list(row) for row in build_snapshots([self.recipe.pk])[
+                self.recipe.pk
+            ]]
+        )
+
+    def test_rename_invalidates_and_job_refills(self):
+        self.flour.name = 'мука пшеничная'
+        self.flour.save()
+        self.assertIsNone(self.snapshot(self.recipe))
+        self.assertIsNotNone(self.snapshot(self.other))
+        self.assertEqual(
+            list(Job.objects.values_list('name', flat=True)),
+            ['fill_ingredient_snapshots']
+        )
+        self.assertEqual(fill_snapshots(), 1)
+        self.assertEqual(self.snapshot(self.recipe)[1][1], 'мука пшеничная')
+        # Сохранение без изменений снимки не трогает.
+        self.flour.save()
+        self.assertIsNotNone(self.snapshot(self.recipe))
+
+    def test_find_stale_snapshots(self):
+        self.assertEqual(list(find_stale_snapshots()), [])
+        IngredientRecipe.objects.filter(recipe=self.other).update(amount=5)
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            ingredients_snapshot=None
+        )
+        self.assertEqual(list(find_stale_snapshots(batch_size=1)), [
+            self.other.pk
+        ])
+
+    def test_api_reads_snapshot(self):
+        client = APIClient()
+        response = client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(
+            [row['name'] for row in response.json()['ingredients']],
+            ['молоко', 'мука']
+        )
+
+    def test_update_rebuilds_snapshot(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.patch(f'/api/recipes/{self.recipe.pk}/', {
+            'name': 'Блины', 'text': 'Описание', 'cooking_time': 20,
+            'tags': [create_tag('lunch').pk],
+            'ingredients': [{'id': self.flour.pk, 'amount': 150}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            self.snapshot(self.recipe), [[self.flour.pk, 'мука', 'г', 150]]
+        )
+        self.assertEqual(list(find_stale_snapshots()), [])
@@ -0,0 +1,95 @@
+from django.test import TestCase
+from recipes.models import FavoritesList, Follow, FollowSuggestion
+from recipes.suggestions import build_suggestions, refresh_suggestions
+from rest_framework.test import APIClient
+
+from .utils import create_recipe, create_user
+
+WEIGHTS = {'SUGGESTION_FOLLOW_WEIGHT': 1.0, 'SUGGESTION_FAVORITE_WEIGHT': 0.5}
+
+
+class SuggestionTests(TestCase):
+
+    def setUp(self):
+        settings = self.settings(**WEIGHTS)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.users = {
+            name: create_user(name)
+            for name in ('me', 'anna', 'boris', 'clara', 'denis', 'elena')
+        }
+        for user, author in (
+            ('me', 'anna'), ('me', 'boris'),
+            ('anna', 'clara'), ('anna', 'denis'),
+            ('boris', 'clara'), ('boris', 'anna'), ('boris', 'me'),
+        ):
+            Follow.objects.create(
+                user=self.users[user], author=self.users[author]
+            )
+        for author in ('elena', 'anna'):
+            FavoritesList.objects.create(
+                user=self.users['me'],
+                recipe=create_recipe(self.users[author])
+            )
+        self.me = self.users['me']
+
+    def rows(self, suggestions):
+        names = {user.pk: name for name, user in self.users.items()}
+        return sorted(
+            (names[suggestion.author_id], suggestion.score,
+             suggestion.followed_by, suggestion.favorited_recipes)
+            for suggestion in suggestions if suggestion.user_id == self.me.pk
+        )
+
+    def test_friends_of_friends_and_favorites(self):
+        # anna уже в подписках, сам пользователь не предлагается.
+        self.assertEqual(self.rows(build_suggestions([self.me.pk])), [
+            ('clara', 2.0, 2, 0),
+            ('denis', 1.0, 1, 0),
+            ('elena', 0.5, 0, 1),
+        ])
+
+    def test_limit_and_batches(self):
+        with self.settings(SUGGESTIONS_PER_USER=2):
+            total = refresh_suggestions(batch_size=1)
+            self.assertEqual(refresh_suggestions(batch_size=500), total)
+        self.assertEqual(
+            self.rows(FollowSuggestion.objects.all()),
+            [('clara', 2.0, 2, 0), ('denis', 1.0, 1, 0)]
+        )
+
+    def test_hidden_authors_are_skipped(self):
+        denis = self.users['denis']
+        denis.is_active = False
+        denis.save()
+        self.assertEqual(
+            [row[0] for row in self.rows(build_suggestions([self.me.pk]))],
+            ['clara', 'elena']
+        )
+
+    def test_endpoint(self):
+        refresh_suggestions()
+        client = APIClient()
+        self.assertEqual(
+            client.get('/api/users/suggestions/').status_code, 401
+        )
+        client.force_authenticate(self.me)
+        response = client.get('/api/users/suggestions/')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(
+            [row['username'] for row in results], ['clara', 'denis', 'elena']
+        )
+        self.assertEqual(results[0], {
+            'email': 'clara@example.com', 'id': self.users['clara'].pk,
+            'username': 'clara', 'first_name': 'Clara',
+            'last_name': 'Тестов', 'is_subscribed': False, 'score': 2.0,
+            'followed_by': 2, 'favorited_recipes': 0,
+        })
+        # Подписка сразу убирает автора из рекомендаций.
+        Follow.objects.create(user=self.me, author=self.users['clara'])
+        response = client.get('/api/users/suggestions/?limit=1')
+        self.assertEqual(
+            [row['username'] for row in response.json()['results']],
+            ['denis']
+        )
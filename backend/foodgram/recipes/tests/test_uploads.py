@@ -0,0 +1,128 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+from PIL import Image
+from recipes.models import ImageUpload, Recipe
+from recipes.uploads import UploadOffsetError, append_chunk, upload_path
+from rest_framework.test import APIClient
+
+from .utils import create_ingredient, create_tag, create_user
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 32), (226, 108, 45)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class ChunkedUploadTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings = self.settings(
+            MEDIA_ROOT=media, IMAGE_UPLOAD_DIR=os.path.join(media, 'uploads'),
+            IMAGE_UPLOAD_CHUNK_SIZE=100
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = create_user('author')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.image = png_bytes()
+
+    def start(self, size=None):
+        response = self.client.post('/api/uploads/', {
+            'filename': 'dish.png', 'size': size or len(self.image)
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+    def send(self, upload_id, offset, data):
+        return self.client.generic(
+            'PATCH', f'/api/uploads/{upload_id}/', data,
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def upload(self):
+        upload_id = self.start()
+        for offset in range(0, len(self.image), 100):
+            response = self.send(
+                upload_id, offset, self.image[offset:offset + 100]
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['offset'], len(self.image))
+        return upload_id
+
+    def test_chunks_are_appended(self):
+        upload_id = self.upload()
+        with open(upload_path(ImageUpload(pk=upload_id)), 'rb') as part:
+            self.assertEqual(part.read(), self.image)
+
+    def test_offset_mismatch(self):
+        upload_id = self.start()
+        self.assertEqual(self.send(upload_id, 0, b'x' * 50).status_code, 200)
+        response = self.send(upload_id, 10, b'y' * 10)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'offset': 50})
+        with self.assertRaises(UploadOffsetError) as error:
+            append_chunk(
+                ImageUpload.objects.get(pk=upload_id), io.BytesIO(b'z'), 0, 1
+            )
+        self.assertEqual(error.exception.offset, 50)
+        # Повтор с правильной позиции продолжает загрузку.
+        self.assertEqual(
+            self.send(upload_id, 50, b'y' * 10).json()['offset'], 60
+        )
+
+    def test_chunk_limits(self):
+        upload_id = self.start(size=150)
+        self.assertEqual(self.send(upload_id, 0, b'x' * 101).status_code, 400)
+        self.assertEqual(self.send(upload_id, 100, b'x' * 60).status_code, 400)
+        self.assertEqual(
+            self.client.post('/api/uploads/', {
+                'filename': 'dish.png', 'size': 0
+            }, format='json').status_code, 400
+        )
+
+    def recipe_data(self, image):
+        return {
+            'name': 'Блины', 'text': 'Описание', 'cooking_time': 20,
+            'tags': [create_tag('lunch').id],
+            'ingredients': [{'id': create_ingredient('мука').id, 'amount': 1}],
+            'image': image,
+        }
+
+    def test_recipe_from_upload(self):
+        upload_id = self.upload()
+        response = self.client.post(
+            '/api/recipes/', self.recipe_data(f'upload:{upload_id}'),
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        recipe = Recipe.objects.get()
+        with recipe.image.open('rb') as image:
+            self.assertEqual(image.read(), self.image)
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertFalse(os.path.exists(
+            upload_path(ImageUpload(pk=upload_id))
+        ))
+
+    def test_incomplete_or_foreign_upload_is_rejected(self):
+        upload_id = self.start()
+        self.send(upload_id, 0, self.image[:100])
+        response = self.client.post(
+            '/api/recipes/', self.recipe_data(f'upload:{upload_id}'),
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.json())
+        other = APIClient()
+        other.force_authenticate(create_user('other'))
+        self.assertEqual(
+            other.get(f'/api/uploads/{upload_id}/').status_code, 404
+        )
@@ -0,0 +1,39 @@
+"""Создание объектов для тестов."""
+from django.contrib.auth import get_user_model
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+
+User = get_user_model()
+
+IMAGE_NAME = 'recipes/images/test.png'
+
+
+def create_user(name, **kwargs):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name, first_name=name.title(),
+        last_name='Тестов', password='password', **kwargs
+    )
+
+
+def create_tag(slug):
+    return Tag.objects.create(name=slug.title(), slug=slug, color='#000000')
+
+
+def create_ingredient(name, measurement_unit='г'):
+    return Ingredient.objects.create(
+        name=name, measurement_unit=measurement_unit
+    )
+
+
+def create_recipe(author, name='Рецепт', tags=(), ingredients=(), **kwargs):
+    """ingredients — пары (ингредиент, количество)."""
+    kwargs.setdefault('cooking_time', 10)
+    kwargs.setdefault('image', IMAGE_NAME)
+    recipe = Recipe.objects.create(
+        author=author, name=name, text='Описание', **kwargs
+    )
+    recipe.tags.set(tags)
+    IngredientRecipe.objects.bulk_create(
+        IngredientRecipe(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient, amount in ingredients
+    )
+    return recipe
@@ -0,0 +1,95 @@
+"""
+Загрузка изображения рецепта по частям с возможностью продолжить
+после обрыва связи.
+
+Клиент создает загрузку с именем и размером файла, затем отправляет
+куски запросами PATCH с заголовком Upload-Offset. Куски дописываются
+в файл на диске потоково, поэтому память воркера не зависит от размера
+изображения. Завершенная загрузка передается в поле image рецепта как
+'upload:<id>' и переносится в хранилище без копирования.
+"""
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+
+from .models import ImageUpload
+
+UPLOAD_PREFIX = 'upload:'
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class UploadOffsetError(Exception):
+    def __init__(self, offset):
+        super().__init__(offset)
+        self.offset = offset
+
+
+class UploadedPart(File):
+    """
+    Файл завершенной загрузки. temporary_file_path позволяет проверке
+    изображения читать файл с диска, а FileSystemStorage — переместить
+    его вместо копирования.
+    """
+
+    def __init__(self, upload):
+        super().__init__(open(upload_path(upload), 'rb'), upload.filename)
+        self.upload = upload
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def upload_path(upload):
+    return os.path.join(settings.IMAGE_UPLOAD_DIR, f'{upload.pk}.part')
+
+
+def append_chunk(upload, stream, offset, length):
+    """Дописать length байт из stream, если offset совпадает с загруженным."""
+    with transaction.atomic():
+        upload = ImageUpload.objects.select_for_update().get(pk=upload.pk)
+        if offset != upload.offset:
+            raise UploadOffsetError(upload.offset)
+        os.makedirs(settings.IMAGE_UPLOAD_DIR, exist_ok=True)
+        with open(upload_path(upload), 'ab') as part:
+            part.truncate(offset)
+            remaining = length
+            while remaining > 0:
+                chunk = stream.read(min(COPY_BUFFER_SIZE, remaining))
+                if not chunk:
+                    break
+                part.write(chunk)
+                remaining -= len(chunk)
+        upload.offset = offset + length - remaining
+        upload.save(update_fields=('offset',))
+    return upload
+
+
+def open_upload(user, value):
+    """Файл завершенной загрузки пользователя по значению 'upload:<id>'."""
+    try:
+        upload_id = uuid.UUID(value[len(UPLOAD_PREFIX):])
+    except ValueError:
+        return None
+    upload = ImageUpload.objects.filter(pk=upload_id, user=user).first()
+    if upload is None or not upload.is_complete:
+        return None
+    return UploadedPart(upload)
+
+
+def discard_upload(upload):
+    try:
+        os.remove(upload_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def finish_upload(image):
+    """Удалить загрузку, из которой взято изображение рецепта."""
+    upload = getattr(image, 'upload', None)
+    if upload is not None:
+        image.close()
+        discard_upload(upload)
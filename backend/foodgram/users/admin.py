@@ -1,12 +1,18 @@
 from django.contrib import admin
+from foodgram.paginators import EstimatedCountPaginator
+from recipes.admin import DeferredDeletionMixin
+from recipes.deletion import mark_users_for_deletion
 
 from .models import User
 
 
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(DeferredDeletionMixin, admin.ModelAdmin):
     list_display = ('pk', 'username', 'email', 'first_name', 'last_name')
-    list_filter = ('email', 'username')
+    search_fields = ('email__exact', 'username__startswith')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
+    mark_for_deletion = staticmethod(mark_users_for_deletion)
 
 
 admin.site.register(User, UserAdmin)
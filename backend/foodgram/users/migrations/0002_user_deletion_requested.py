@@ -0,0 +1,18 @@
+# Generated by Django 3.2.9 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='deletion_requested',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Удаление запрошено'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.9 on 2026-10-19 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_deletion_requested'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_last_used',
+            field=models.DateTimeField(blank=True, editable=False, help_text='отмечается не чаще раза в сутки', null=True, verbose_name='Токен использован'),
+        ),
+    ]
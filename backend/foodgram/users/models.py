@@ -4,6 +4,14 @@ from django.db import models
 
 class User(AbstractUser):
     email = models.EmailField('email адрес', unique=True)
+    deletion_requested = models.DateTimeField(
+        'Удаление запрошено', null=True, blank=True, editable=False,
+        db_index=True
+    )
+    token_last_used = models.DateTimeField(
+        'Токен использован', null=True, blank=True, editable=False,
+        help_text='отмечается не чаще раза в сутки'
+    )
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 